@@ -0,0 +1,92 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+operations = [
+    migrations.CreateModel(
+        name="BeaconAlleleCount",
+        fields=[
+            (
+                "id",
+                models.AutoField(
+                    auto_created=True,
+                    primary_key=True,
+                    serialize=False,
+                    verbose_name="ID",
+                ),
+            ),
+            ("project_id", models.IntegerField()),
+            ("release", models.CharField(max_length=32)),
+            ("chromosome", models.CharField(max_length=32)),
+            ("start", models.IntegerField()),
+            ("reference", models.CharField(max_length=512)),
+            ("alternative", models.CharField(max_length=512)),
+            ("count_het", models.IntegerField()),
+            ("count_hom_alt", models.IntegerField()),
+            ("count_hemi_alt", models.IntegerField()),
+        ],
+        options={
+            "db_table": "beaconsite_beaconallelecount",
+            "managed": settings.IS_TESTING,
+        },
+    ),
+]
+
+if not settings.IS_TESTING:
+    operations.append(
+        migrations.RunSQL(
+            """
+            DROP MATERIALIZED VIEW IF EXISTS beaconsite_beaconallelecount;
+
+            CREATE MATERIALIZED VIEW beaconsite_beaconallelecount
+            AS
+                SELECT
+                    row_number() OVER (PARTITION BY true) AS id,
+                    variants_case.project_id,
+                    variants.release,
+                    variants.chromosome,
+                    variants.start,
+                    variants.reference,
+                    variants.alternative,
+                    sum(variants.num_het) AS count_het,
+                    sum(variants.num_hom_alt) AS count_hom_alt,
+                    sum(variants.num_hemi_alt) AS count_hemi_alt
+                FROM variants_smallvariant AS variants
+                JOIN variants_case ON variants.case_id = variants_case.id
+                WHERE variants_case.project_id IN (
+                    SELECT project_id FROM beaconsite_consortiumassignment
+                )
+                GROUP BY (
+                    variants_case.project_id,
+                    variants.release,
+                    variants.chromosome,
+                    variants.start,
+                    variants.reference,
+                    variants.alternative
+                )
+            WITH NO DATA;
+
+            CREATE UNIQUE INDEX beaconsite_beaconallelecount_id
+                ON beaconsite_beaconallelecount(id);
+            CREATE INDEX beaconsite_beaconallelecount_coord
+                ON beaconsite_beaconallelecount(
+                    release, chromosome, start, reference, alternative, project_id
+                )
+                INCLUDE (count_het, count_hom_alt, count_hemi_alt);
+            """,
+            """
+            DROP MATERIALIZED VIEW IF EXISTS beaconsite_beaconallelecount;
+            """,
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("beaconsite", "0004_auto_20210309_1517"),
+        ("variants", "0115_geneprioritizationscorecache"),
+    ]
+
+    operations = operations
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:32
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("beaconsite", "0005_beaconallelecount"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BeaconAlleleCountStaleProject",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("project_id", models.IntegerField(unique=True)),
+                (
+                    "date_marked",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        help_text="DateTime of last change",
+                    ),
+                ),
+            ],
+        ),
+    ]
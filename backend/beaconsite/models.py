@@ -4,11 +4,17 @@ import uuid as uuid_object
 from Crypto.PublicKey import RSA
 from cryptographic_fields.fields import EncryptedTextField
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import connection, models, transaction, utils
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.urls import reverse
+from django.utils import timezone
 from projectroles.models import Project
 
+from variants.models import Case, SmallVariantSet
+
 #: Django user model.
 AUTH_USER_MODEL = getattr(settings, "AUTH_USER_MODEL", "auth.User")
 
@@ -150,13 +156,26 @@ class Site(models.Model):
     )
 
     def get_all_projects(self):
-        # TODO: speed this up with raw SQL query
-        result = {}
-        for consortium in self.consortia.all():
-            for project in consortium.projects.all():
-                if project.pk not in result:
-                    result[project.pk] = project
-        return result.values()
+        return Project.objects.filter(pk__in=self.get_all_project_pks())
+
+    def get_all_project_pks(self):
+        """Return PKs of all projects assigned to the site's consortia.
+
+        The result is cached and invalidated when consortium memberships or project assignments
+        change.
+        """
+        cache_key = _site_project_pks_cache_key(self.pk)
+        result = cache.get(cache_key)
+        if result is None:
+            result = sorted(
+                set(
+                    ConsortiumAssignment.objects.filter(consortium__sites=self).values_list(
+                        "project_id", flat=True
+                    )
+                )
+            )
+            cache.set(cache_key, result, SITE_PROJECT_PKS_CACHE_TIMEOUT)
+        return result
 
     def public_key_fingerprints(self):
         k = RSA.import_key(self.public_key)
@@ -195,6 +214,14 @@ class Site(models.Model):
         return reverse("beaconsite:site-detail", kwargs={"site": self.sodar_uuid})
 
 
+#: Timeout for the cached project PKs of a site, in seconds.
+SITE_PROJECT_PKS_CACHE_TIMEOUT = 5 * 60
+
+
+def _site_project_pks_cache_key(site_pk):
+    return "beaconsite:site_project_pks:%d" % site_pk
+
+
 class ConsortiumMember(models.Model):
     """Site membership within a consortium."""
 
@@ -229,6 +256,20 @@ class ConsortiumAssignment(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
 
 
+@receiver(post_save, sender=ConsortiumMember)
+@receiver(post_delete, sender=ConsortiumMember)
+@receiver(post_save, sender=ConsortiumAssignment)
+@receiver(post_delete, sender=ConsortiumAssignment)
+def invalidate_site_project_pks(sender, instance, **kwargs):
+    """Signal handler for invalidating the cached project PKs of all sites."""
+    cache.delete_many(
+        [
+            _site_project_pks_cache_key(site_pk)
+            for site_pk in Site.objects.values_list("pk", flat=True)
+        ]
+    )
+
+
 class Query(models.Model):
     """Store information about an outgoing or incoming query."""
 
@@ -320,3 +361,139 @@ class Response(models.Model):
     )
     http_header = models.TextField(null=False, help_text="HTTP request header content")
     http_body = models.TextField(null=True, blank=True, help_text="HTTP request body content")
+
+
+class BeaconAlleleCount(models.Model):
+    """Allele counts of the small variants per project, used for answering beacon queries.
+
+    In the database, this is a materialized view over the projects that are assigned to any
+    consortium.  It is refreshed with ``refresh_beaconsite_beaconallelecount()``.
+    """
+
+    #: The project that the counts are for
+    project_id = models.IntegerField()
+    #: Genome build
+    release = models.CharField(max_length=32)
+    #: Variant coordinates - chromosome
+    chromosome = models.CharField(max_length=32)
+    #: Variant coordinates - 1-based start position
+    start = models.IntegerField()
+    #: Variant coordinates - reference
+    reference = models.CharField(max_length=512)
+    #: Variant coordinates - alternative
+    alternative = models.CharField(max_length=512)
+
+    #: Number of heterozygous genotypes.
+    count_het = models.IntegerField()
+    #: Number of hom. alt. genotypes.
+    count_hom_alt = models.IntegerField()
+    #: Number of hemi alt. genotypes.
+    count_hemi_alt = models.IntegerField()
+
+    class Meta:
+        managed = settings.IS_TESTING
+        db_table = "beaconsite_beaconallelecount"
+
+
+def refresh_beaconsite_beaconallelecount():
+    """Refresh the ``BeaconAlleleCount`` materialized view.
+
+    Afterwards, the projects marked as stale before the refresh started are answered from the view
+    again.
+    """
+    started = timezone.now()
+    with connection.cursor() as cursor:
+        try:
+            # This will fail if the materialized view is empty.
+            with transaction.atomic():
+                cursor.execute(
+                    "REFRESH MATERIALIZED VIEW CONCURRENTLY beaconsite_beaconallelecount"
+                )
+        except utils.NotSupportedError:
+            with transaction.atomic():
+                cursor.execute("REFRESH MATERIALIZED VIEW beaconsite_beaconallelecount")
+    BeaconAlleleCountStaleProject.objects.filter(date_marked__lt=started).delete()
+
+
+class BeaconAlleleCountStaleProject(models.Model):
+    """Project whose variants or consortium assignments changed since the last refresh of
+    ``BeaconAlleleCount``.
+
+    Beacon queries for these projects are answered from the ``SmallVariant`` table until the
+    materialized view has been refreshed.
+    """
+
+    #: The project whose allele counts are stale, not a foreign key so marking projects that are
+    #: being deleted works
+    project_id = models.IntegerField(unique=True)
+    #: DateTime of the last change
+    date_marked = models.DateTimeField(default=timezone.now, help_text="DateTime of last change")
+
+
+def mark_beacon_allele_counts_stale(project_id):
+    """Mark the allele counts of the project with ``project_id`` as stale.
+
+    A refresh of ``BeaconAlleleCount`` is scheduled after
+    ``settings.VARFISH_BEACON_ALLELE_COUNT_REFRESH_DELAY`` seconds unless the project already was
+    stale, so changes in quick succession are covered by one refresh.  Nothing is done if the
+    beacon site is disabled.
+    """
+    if not settings.VARFISH_ENABLE_BEACON_SITE:
+        return
+    _, created = BeaconAlleleCountStaleProject.objects.update_or_create(
+        project_id=project_id, defaults={"date_marked": timezone.now()}
+    )
+    if created:
+        from .tasks import refresh_beaconsite_beaconallelecount as refresh_task
+
+        transaction.on_commit(
+            lambda: refresh_task.apply_async(
+                countdown=settings.VARFISH_BEACON_ALLELE_COUNT_REFRESH_DELAY
+            )
+        )
+
+
+@receiver(post_save, sender=ConsortiumAssignment)
+@receiver(post_delete, sender=ConsortiumAssignment)
+def mark_assigned_project_stale(sender, instance, **kwargs):
+    """Signal handler for marking the allele counts of (un)assigned projects as stale."""
+    mark_beacon_allele_counts_stale(instance.project_id)
+
+
+def _mark_beacon_project_stale(project_id):
+    """Mark the allele counts of the project with ``project_id`` as stale if it is in a consortium.
+
+    Other projects are not part of ``BeaconAlleleCount``, so their changes need no refresh.
+    """
+    if (
+        settings.VARFISH_ENABLE_BEACON_SITE
+        and ConsortiumAssignment.objects.filter(project_id=project_id).exists()
+    ):
+        mark_beacon_allele_counts_stale(project_id)
+
+
+def _mark_variant_set_project_stale(variant_set):
+    if not settings.VARFISH_ENABLE_BEACON_SITE:
+        return
+    project_ids = Case.objects.filter(pk=variant_set.case_id).values_list("project_id", flat=True)
+    for project_id in project_ids:
+        _mark_beacon_project_stale(project_id)
+
+
+@receiver(post_save, sender=SmallVariantSet)
+def mark_imported_variant_set_project_stale(sender, instance, **kwargs):
+    """Signal handler for marking the allele counts of a project as stale on variant import."""
+    if instance.state == "active":
+        _mark_variant_set_project_stale(instance)
+
+
+@receiver(post_delete, sender=SmallVariantSet)
+def mark_deleted_variant_set_project_stale(sender, instance, **kwargs):
+    """Signal handler for marking the allele counts of a project as stale on variant deletion."""
+    _mark_variant_set_project_stale(instance)
+
+
+@receiver(post_delete, sender=Case)
+def mark_case_project_stale(sender, instance, **kwargs):
+    """Signal handler for marking the allele counts of a project as stale on case deletion."""
+    _mark_beacon_project_stale(instance.project_id)
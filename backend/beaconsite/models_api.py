@@ -6,6 +6,8 @@ import attr
 DEFAULT_ASSEMBLY_ID = "GRCh37"
 #: Indicated API version.
 API_VERSION = "v1.0.0"
+#: Maximal number of allele requests in one batch request.
+MAX_BATCH_SIZE = 1000
 
 
 @attr.s(frozen=True, auto_attribs=True)
@@ -47,6 +49,18 @@ class BeaconAlleleResponse:
     error: typing.Optional[Error] = None
 
 
+@attr.s(frozen=True, auto_attribs=True)
+class BeaconAlleleBatchRequest:
+    alleleRequests: typing.List[BeaconAlleleRequest]
+
+
+@attr.s(frozen=True, auto_attribs=True)
+class BeaconAlleleBatchResponse:
+    beaconId: str
+    apiVersion: str
+    alleleResponses: typing.List[BeaconAlleleResponse]
+
+
 @attr.s(frozen=True, auto_attribs=True)
 class Organisation:
     id: str
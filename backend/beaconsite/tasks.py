@@ -0,0 +1,20 @@
+from celery.schedules import crontab
+
+from config.celery import app
+
+from . import models
+
+
+@app.task(bind=True)
+def refresh_beaconsite_beaconallelecount(_self):
+    """Task to refresh the ``BeaconAlleleCount`` materialized view."""
+    models.refresh_beaconsite_beaconallelecount()
+
+
+@app.on_after_finalize.connect
+def setup_periodic_tasks(sender, **_kwargs):
+    """Register periodic tasks"""
+    # Rebuild materialized view nightly.
+    sender.add_periodic_task(
+        schedule=crontab(hour=4, minute=44), sig=refresh_beaconsite_beaconallelecount.s()
+    )
@@ -1,10 +1,24 @@
 """Test models and factories."""
 
+from unittest.mock import patch
+
 from django.core.exceptions import ValidationError
+from django.test import override_settings
 from test_plus.test import TestCase
 
-from ..models import Consortium, ConsortiumMember, Query, Response, Site
+from variants.tests.factories import CaseWithVariantSetFactory, ProjectFactory
+
+from ..models import (
+    BeaconAlleleCountStaleProject,
+    Consortium,
+    ConsortiumMember,
+    Query,
+    Response,
+    Site,
+    mark_beacon_allele_counts_stale,
+)
 from .factories import (
+    ConsortiumAssignmentFactory,
     ConsortiumFactory,
     ConsortiumMemberFactory,
     ConsortiumWithLocalAndRemoteSiteFactory,
@@ -30,6 +44,16 @@ class TestSite(TestCase):
     def test_require_public_key_for_asymmetric_encryption(self):
         pass
 
+    def test_get_all_project_pks(self):
+        consortium = ConsortiumWithLocalAndRemoteSiteFactory()
+        remote_site = Site.objects.get(role=Site.REMOTE)
+        self.assertEqual(remote_site.get_all_project_pks(), [])
+        assignment = ConsortiumAssignmentFactory(consortium=consortium, project=ProjectFactory())
+        self.assertEqual(remote_site.get_all_project_pks(), [assignment.project.pk])
+        self.assertEqual(list(remote_site.get_all_projects()), [assignment.project])
+        assignment.delete()
+        self.assertEqual(remote_site.get_all_project_pks(), [])
+
 
 class TestConsortium(TestCase):
     def test_create(self):
@@ -67,3 +91,51 @@ class TestRespnose(TestCase):
         ResponseFactory()
         self.assertEqual(Query.objects.count(), 1)
         self.assertEqual(Response.objects.count(), 1)
+
+
+class TestBeaconAlleleCountStaleProject(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.consortium = ConsortiumFactory()
+        self.project = ProjectFactory()
+
+    def _stale_project_ids(self):
+        return list(BeaconAlleleCountStaleProject.objects.values_list("project_id", flat=True))
+
+    def test_mark_on_assignment(self):
+        assignment = ConsortiumAssignmentFactory(consortium=self.consortium, project=self.project)
+        self.assertEqual(self._stale_project_ids(), [self.project.pk])
+        BeaconAlleleCountStaleProject.objects.all().delete()
+        assignment.delete()
+        self.assertEqual(self._stale_project_ids(), [self.project.pk])
+
+    def test_mark_on_import_and_delete(self):
+        ConsortiumAssignmentFactory(consortium=self.consortium, project=self.project)
+        BeaconAlleleCountStaleProject.objects.all().delete()
+        case, variant_set, _ = CaseWithVariantSetFactory.get("small", project=self.project)
+        self.assertEqual(self._stale_project_ids(), [self.project.pk])
+        BeaconAlleleCountStaleProject.objects.all().delete()
+        variant_set.delete()
+        self.assertEqual(self._stale_project_ids(), [self.project.pk])
+        BeaconAlleleCountStaleProject.objects.all().delete()
+        case.delete()
+        self.assertEqual(self._stale_project_ids(), [self.project.pk])
+
+    def test_no_mark_without_assignment(self):
+        case, variant_set, _ = CaseWithVariantSetFactory.get("small", project=self.project)
+        variant_set.delete()
+        case.delete()
+        self.assertEqual(self._stale_project_ids(), [])
+
+    @override_settings(VARFISH_ENABLE_BEACON_SITE=False)
+    def test_no_mark_beacon_site_disabled(self):
+        ConsortiumAssignmentFactory(consortium=self.consortium, project=self.project)
+        CaseWithVariantSetFactory.get("small", project=self.project)
+        self.assertEqual(self._stale_project_ids(), [])
+
+    @patch("beaconsite.tasks.refresh_beaconsite_beaconallelecount.apply_async")
+    def test_mark_schedules_refresh_once(self, mock_apply_async):
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_beacon_allele_counts_stale(self.project.pk)
+            mark_beacon_allele_counts_stale(self.project.pk)
+        mock_apply_async.assert_called_once_with(countdown=600)
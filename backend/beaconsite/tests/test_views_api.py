@@ -1,10 +1,16 @@
+import json
+
 import cattr
 from django.shortcuts import reverse
 
 from variants.tests.factories import SmallVariantFactory
 from variants.tests.helpers import ApiViewTestBase
 
-from ..models import Site
+from ..models import (
+    BeaconAlleleCount,
+    BeaconAlleleCountStaleProject,
+    Site,
+)
 from ..models_api import BeaconAlleleRequest
 from .factories import ConsortiumAssignmentFactory, ConsortiumWithLocalAndRemoteSiteFactory
 from .test_permissions_api import AcceptHeaderMixin
@@ -67,6 +73,8 @@ class TestBeaconQueryApiView(AcceptHeaderMixin, ApiViewTestBase):
             referenceBases=self.small_variant.reference,
             alternateBases=self.small_variant.alternative,
         )
+        # The project was marked stale by the setup, reset as after a refresh.
+        BeaconAlleleCountStaleProject.objects.all().delete()
 
     def test_query(self):
         url = reverse("beaconsite:beacon-api-query")
@@ -89,3 +97,129 @@ class TestBeaconQueryApiView(AcceptHeaderMixin, ApiViewTestBase):
                 "exists": False,
             },
         )
+
+    def test_query_stale(self):
+        small_variant = SmallVariantFactory(variant_set__case__project=self.project)
+        self.assertTrue(BeaconAlleleCountStaleProject.objects.filter(project_id=self.project.pk))
+        beacon_allele_request = BeaconAlleleRequest(
+            assemblyId=small_variant.release,
+            referenceName=small_variant.chromosome,
+            start=small_variant.start,
+            referenceBases=small_variant.reference,
+            alternateBases=small_variant.alternative,
+        )
+        url = reverse("beaconsite:beacon-api-query")
+        url += "?" + "&".join(
+            "%s=%s" % (k, v) for k, v in cattr.unstructure(beacon_allele_request).items()
+        )
+
+        with self.login(self.superuser):
+            extra = self.get_accept_header(None, None)
+            response = self.client.get(url, **extra)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["exists"], True)
+
+    def test_query_exists(self):
+        BeaconAlleleCount.objects.create(
+            project_id=self.project.pk,
+            release=self.small_variant.release,
+            chromosome=self.small_variant.chromosome,
+            start=self.small_variant.start,
+            reference=self.small_variant.reference,
+            alternative=self.small_variant.alternative,
+            count_het=1,
+            count_hom_alt=0,
+            count_hemi_alt=0,
+        )
+        url = reverse("beaconsite:beacon-api-query")
+        url += "?" + "&".join(
+            "%s=%s" % (k, v) for k, v in cattr.unstructure(self.beacon_allele_request).items()
+        )
+
+        with self.login(self.superuser):
+            extra = self.get_accept_header(None, None)
+            response = self.client.get(url, **extra)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["exists"], True)
+
+
+class TestBeaconBatchQueryApiView(AcceptHeaderMixin, ApiViewTestBase):
+    def setUp(self):
+        super().setUp()
+        self.consortium = ConsortiumWithLocalAndRemoteSiteFactory()
+        self.local_site = Site.objects.get(role=Site.LOCAL)
+        self.remote_site = Site.objects.get(role=Site.REMOTE)
+        ConsortiumAssignmentFactory(
+            consortium=self.consortium,
+            project=self.project,
+        )
+        self.small_variants = SmallVariantFactory.create_batch(2, case__project=self.project)
+        self.beacon_allele_requests = [
+            BeaconAlleleRequest(
+                assemblyId=small_variant.release,
+                referenceName=small_variant.chromosome,
+                start=small_variant.start,
+                referenceBases=small_variant.reference,
+                alternateBases=small_variant.alternative,
+            )
+            for small_variant in self.small_variants
+        ]
+        BeaconAlleleCount.objects.create(
+            project_id=self.project.pk,
+            release=self.small_variants[0].release,
+            chromosome=self.small_variants[0].chromosome,
+            start=self.small_variants[0].start,
+            reference=self.small_variants[0].reference,
+            alternative=self.small_variants[0].alternative,
+            count_het=0,
+            count_hom_alt=1,
+            count_hemi_alt=0,
+        )
+        # The project was marked stale by the setup, reset as after a refresh.
+        BeaconAlleleCountStaleProject.objects.all().delete()
+
+    def test_query(self):
+        url = reverse("beaconsite:beacon-api-query-batch")
+        data = {"alleleRequests": cattr.unstructure(self.beacon_allele_requests)}
+
+        with self.login(self.superuser):
+            extra = self.get_accept_header(None, None)
+            response = self.client.post(
+                url, data=json.dumps(data), content_type="application/json", **extra
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {
+                "beaconId": self.local_site.identifier,
+                "apiVersion": "v1.0.0",
+                "alleleResponses": [
+                    {
+                        "alleleRequest": cattr.unstructure(self.beacon_allele_requests[0]),
+                        "apiVersion": "v1.0.0",
+                        "beaconId": self.local_site.identifier,
+                        "datasetAlleleResponse": None,
+                        "error": None,
+                        "exists": True,
+                    },
+                    {
+                        "alleleRequest": cattr.unstructure(self.beacon_allele_requests[1]),
+                        "apiVersion": "v1.0.0",
+                        "beaconId": self.local_site.identifier,
+                        "datasetAlleleResponse": None,
+                        "error": None,
+                        "exists": False,
+                    },
+                ],
+            },
+        )
+
+    def test_query_invalid(self):
+        url = reverse("beaconsite:beacon-api-query-batch")
+
+        with self.login(self.superuser):
+            extra = self.get_accept_header(None, None)
+            response = self.client.post(
+                url, data=json.dumps({"foo": "bar"}), content_type="application/json", **extra
+            )
+        self.assertEqual(response.status_code, 400)
@@ -84,6 +84,11 @@ beacon_api_urlpatterns = [
         view=views_api.BeaconQueryApiView.as_view(),
         name="beacon-api-query",
     ),
+    path(
+        route="endpoint/query/batch/",
+        view=views_api.BeaconBatchQueryApiView.as_view(),
+        name="beacon-api-query-batch",
+    ),
 ]
 
 urlpatterns = ui_urlpatterns + ajax_urlpatterns + beacon_api_urlpatterns
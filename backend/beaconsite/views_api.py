@@ -1,6 +1,7 @@
 import re
 
 import cattr
+from cattrs.errors import BaseValidationError
 from django.utils import timezone
 from django.utils.http import parse_http_date
 from httpsig import HeaderVerifier
@@ -8,14 +9,18 @@ from rest_framework import authentication, exceptions
 from rest_framework.permissions import BasePermission
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from sqlalchemy import and_, select
+from sqlalchemy import and_, func, join, select, tuple_
+from sqlalchemy.exc import OperationalError
 
 from variants.helpers import get_engine
 from variants.models import Case, SmallVariant
 
-from .models import Site
+from .models import BeaconAlleleCount, BeaconAlleleCountStaleProject, Site
 from .models_api import (
     API_VERSION,
+    MAX_BATCH_SIZE,
+    BeaconAlleleBatchRequest,
+    BeaconAlleleBatchResponse,
     BeaconAlleleRequest,
     BeaconAlleleResponse,
     BeaconInfo,
@@ -215,36 +220,7 @@ class BeaconQueryApiView(APIView):
         """
         allele_req = cattr.structure(dict(params.items()), BeaconAlleleRequest)
         remote_site = request.user
-        # TODO: perform one large query only
-        project_pks = [p.pk for p in remote_site.get_all_projects()]
-        result = (
-            select(
-                [SmallVariant.sa.num_hom_alt, SmallVariant.sa.num_het, SmallVariant.sa.num_hemi_alt]
-            )
-            .select_from(SmallVariant.sa)
-            .where(
-                and_(
-                    SmallVariant.sa.case_id.in_(
-                        select([Case.sa.id])
-                        .select_from(Case.sa)
-                        .where(Case.sa.project_id.in_(project_pks))
-                    ),
-                    SmallVariant.sa.release == allele_req.assemblyId,
-                    SmallVariant.sa.chromosome == allele_req.referenceName,
-                    SmallVariant.sa.start == allele_req.start,
-                    SmallVariant.sa.reference == allele_req.referenceBases,
-                    SmallVariant.sa.alternative == allele_req.alternateBases,
-                )
-            )
-        )
-        sum_hom_alt = 0
-        sum_het_alt = 0
-        sum_hemi_alt = 0
-        for row in get_engine().execute(result):
-            sum_hom_alt += row.num_hom_alt
-            sum_het_alt += row.num_het
-            sum_hemi_alt += row.num_hemi_alt
-        total_alleles = sum_hom_alt * 2 + sum_het_alt + sum_hemi_alt
+        total_alleles = _count_alleles(remote_site.get_all_project_pks(), [allele_req])
 
         site = Site.objects.get(role=Site.LOCAL)
         if site.state != Site.ENABLED:
@@ -255,7 +231,166 @@ class BeaconQueryApiView(APIView):
         result = BeaconAlleleResponse(
             beaconId=site.identifier,
             apiVersion=API_VERSION,
-            exists=(total_alleles > 0),
+            exists=(total_alleles.get(_allele_key(allele_req), 0) > 0),
             alleleRequest=allele_req,
         )
         return Response(cattr.unstructure(result))
+
+
+class BeaconBatchQueryApiView(APIView):
+    """Query for many alleles with one signed request.
+
+    This is not part of the GA4GH beacon API.  The request body is a JSON object with the
+    ``alleleRequests`` list, the response contains one ``BeaconAlleleResponse`` per allele request
+    in ``alleleResponses``.
+    """
+
+    authentication_classes = (_SignedSiteAuthentication,)
+    permission_classes = (_SiteBeaconPermission, _RequestAgeAcceptable)
+    http_method_names = ("post",)
+
+    def post(self, request, *_args, **_kwargs):
+        try:
+            batch_req = cattr.structure(request.data, BeaconAlleleBatchRequest)
+        except (BaseValidationError, TypeError, ValueError, KeyError) as e:
+            raise exceptions.ParseError("Invalid batch request: %s" % e)
+        if len(batch_req.alleleRequests) > MAX_BATCH_SIZE:
+            raise exceptions.ParseError(
+                "Too many allele requests, got %d, limit is %d"
+                % (len(batch_req.alleleRequests), MAX_BATCH_SIZE)
+            )
+
+        site = Site.objects.get(role=Site.LOCAL)
+        if site.state != Site.ENABLED:
+            return Response(
+                {"detail": "The site is not enabled!"}, status=400, reason="invalid site"
+            )
+
+        remote_site = request.user
+        total_alleles = _count_alleles(remote_site.get_all_project_pks(), batch_req.alleleRequests)
+        result = BeaconAlleleBatchResponse(
+            beaconId=site.identifier,
+            apiVersion=API_VERSION,
+            alleleResponses=[
+                BeaconAlleleResponse(
+                    beaconId=site.identifier,
+                    apiVersion=API_VERSION,
+                    exists=(total_alleles.get(_allele_key(allele_req), 0) > 0),
+                    alleleRequest=allele_req,
+                )
+                for allele_req in batch_req.alleleRequests
+            ],
+        )
+        return Response(cattr.unstructure(result))
+
+
+def _allele_key(allele_req):
+    """Return the key of ``allele_req`` in the result of ``_count_alleles()``."""
+    return (
+        allele_req.assemblyId,
+        allele_req.referenceName,
+        allele_req.start,
+        allele_req.referenceBases,
+        allele_req.alternateBases,
+    )
+
+
+def _count_alleles(project_pks, allele_reqs):
+    """Return number of alternative alleles in the projects with ``project_pks``.
+
+    The result is a ``dict`` from the allele key (see ``_allele_key()``) to the allele count.  The
+    counts are obtained with one indexed lookup in the ``BeaconAlleleCount`` table.  Projects whose
+    data changed since the last refresh of the materialized view are counted from ``SmallVariant``,
+    as are all projects if the view has not been populated yet.
+    """
+    if not project_pks or not allele_reqs:
+        return {}
+    keys = list({_allele_key(allele_req) for allele_req in allele_reqs})
+    stale_pks = set(
+        BeaconAlleleCountStaleProject.objects.filter(project_id__in=project_pks).values_list(
+            "project_id", flat=True
+        )
+    )
+    fresh_pks = [pk for pk in project_pks if pk not in stale_pks]
+    result = {}
+    if fresh_pks:
+        try:
+            result = _count_alleles_impl(BeaconAlleleCount.sa, fresh_pks, keys)
+        except OperationalError:
+            stale_pks = project_pks
+    if stale_pks:
+        for key, count in _count_alleles_live(list(stale_pks), keys).items():
+            result[key] = result.get(key, 0) + count
+    return result
+
+
+def _count_alleles_impl(table, project_pks, keys):
+    stmt = (
+        select(
+            [
+                table.release,
+                table.chromosome,
+                table.start,
+                table.reference,
+                table.alternative,
+                func.sum(table.count_hom_alt * 2 + table.count_het + table.count_hemi_alt).label(
+                    "count"
+                ),
+            ]
+        )
+        .select_from(table)
+        .where(
+            and_(
+                tuple_(
+                    table.release,
+                    table.chromosome,
+                    table.start,
+                    table.reference,
+                    table.alternative,
+                ).in_(keys),
+                table.project_id.in_(project_pks),
+            )
+        )
+        .group_by(table.release, table.chromosome, table.start, table.reference, table.alternative)
+    )
+    return {tuple(row[:5]): row.count for row in get_engine().execute(stmt)}
+
+
+def _count_alleles_live(project_pks, keys):
+    stmt = (
+        select(
+            [
+                SmallVariant.sa.release,
+                SmallVariant.sa.chromosome,
+                SmallVariant.sa.start,
+                SmallVariant.sa.reference,
+                SmallVariant.sa.alternative,
+                func.sum(
+                    SmallVariant.sa.num_hom_alt * 2
+                    + SmallVariant.sa.num_het
+                    + SmallVariant.sa.num_hemi_alt
+                ).label("count"),
+            ]
+        )
+        .select_from(join(SmallVariant.sa, Case.sa, SmallVariant.sa.case_id == Case.sa.id))
+        .where(
+            and_(
+                tuple_(
+                    SmallVariant.sa.release,
+                    SmallVariant.sa.chromosome,
+                    SmallVariant.sa.start,
+                    SmallVariant.sa.reference,
+                    SmallVariant.sa.alternative,
+                ).in_(keys),
+                Case.sa.project_id.in_(project_pks),
+            )
+        )
+        .group_by(
+            SmallVariant.sa.release,
+            SmallVariant.sa.chromosome,
+            SmallVariant.sa.start,
+            SmallVariant.sa.reference,
+            SmallVariant.sa.alternative,
+        )
+    )
+    return {tuple(row[:5]): row.count for row in get_engine().execute(stmt)}
@@ -58,10 +58,9 @@ class ProjectAppPlugin(ProjectAppPluginPoint):
                 ]
             except DataError:
                 items = []
-            items.sort(key=lambda x: x.name.lower())
         elif search_type == "case":
             try:
-                items = list(cases.order_by("name"))
+                items = list(cases)
             except DataError:
                 items = []
 
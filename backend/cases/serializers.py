@@ -152,6 +152,7 @@ class CaseSerializerNg(CoreCaseSerializerMixin, SODARProjectModelSerializer):
         exclude = (
             "id",
             "search_tokens",
+            "search_text",
             "latest_variant_set",
             "latest_structural_variant_set",
         )
@@ -7,7 +7,6 @@ from django.middleware.csrf import get_token
 from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
 from modelcluster.queryset import FakeQuerySet
 from projectroles.app_settings import AppSettingAPI
-from projectroles.models import Project
 from projectroles.views_api import (
     SODARAPIBaseMixin,
     SODARAPIBaseProjectMixin,
@@ -49,6 +48,7 @@ from variants.models import (
     DeleteCaseBgJob,
     PedigreeRelatedness,
     SampleVariantStatistics,
+    get_inhouse_db_excluded_project_ids,
 )
 from variants.serializers import (
     AnnotationReleaseInfoSerializer,
@@ -89,7 +89,7 @@ class CaseCountApiView(SODARAPIBaseProjectMixin, RetrieveAPIView):
         # projects.sodar_uuid and presetset.sodar_uuid.
         qs = Case.objects.filter(project__sodar_uuid=self.kwargs["project"])
         if self.request.GET.get("q"):
-            qs = qs.filter(name__icontains=self.request.GET.get("q"))
+            qs = qs.search(self.request.GET.get("q").split())
         order_by_str = self.request.query_params.get("order_by", "")
         if order_by_str:
             order_dir = self.request.query_params.get("order_dir", "asc")
@@ -138,7 +138,7 @@ class CaseListApiView(SODARAPIBaseProjectMixin, ListAPIView):
         # projects.sodar_uuid and presetset.sodar_uuid.
         qs = Case.objects.filter(project__sodar_uuid=self.kwargs["project"])
         if self.request.GET.get("q"):
-            qs = qs.filter(name__icontains=self.request.GET.get("q"))
+            qs = qs.search(self.request.GET.get("q").split())
         order_by_str = self.request.query_params.get("order_by", "")
         if order_by_str:
             order_dir = self.request.query_params.get("order_dir", "asc")
@@ -559,18 +559,14 @@ class InhouseDbStatsApiView(RetrieveAPIView):
     def get(self, request, *args, **kwargs):
         # Calculate the number of individuals in the in-house database
         # Exclude cases from projects with exclude_from_inhouse_db setting
-        setting_api = AppSettingAPI()
-
-        # Get all cases, excluding those marked to be excluded from inhouse DB
-        excluded_project_ids = []
-        for project in Project.objects.all():
-            if setting_api.get("variants", "exclude_from_inhouse_db", project=project):
-                excluded_project_ids.append(project.id)
+        excluded_project_ids = get_inhouse_db_excluded_project_ids()
 
         # Calculate total individuals from included cases
         total_individuals = sum(
-            len(c.pedigree)
-            for c in Case.objects.exclude(project_id__in=excluded_project_ids).distinct()
+            len(pedigree)
+            for pedigree in Case.objects.exclude(project_id__in=excluded_project_ids).values_list(
+                "pedigree", flat=True
+            )
         )
 
         return Response({"count": total_individuals})
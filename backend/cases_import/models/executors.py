@@ -1,8 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import io
 import json
 import os
 import shutil
 import subprocess
 import tempfile
+import time
 import typing
 import uuid
 
@@ -40,6 +43,7 @@ from cases_qc.io import dragen as io_dragen
 from cases_qc.io import ngsbits as io_ngsbits
 from cases_qc.io import samtools as io_samtools
 from cases_qc.models import CaseQc
+from cases_qc.varfish_stats import update_varfish_stats
 from config.common import PrefilterConfig
 from seqmeta.models import TargetBedFile
 from svs.models import SvQueryResultSet
@@ -157,11 +161,19 @@ class FileImportExecutorBase:
 
 
 class DragenQcImportExecutor(FileImportExecutorBase):
-    """Helper class for importing Dragen-style QC from external files in a case."""
+    """Helper class for importing Dragen-style QC from external files in a case.
 
-    def __init__(self, case: Case):
+    With ``VARFISH_CASE_IMPORT_QC_THREADS`` greater than one, the QC files are fetched
+    concurrently before the records are created in a single transaction.
+    """
+
+    def __init__(self, case: Case, bgjob: CaseImportBackgroundJob | None = None):
         super().__init__(case.project)
         self.case = case
+        #: Optional background job for logging.
+        self.bgjob = bgjob
+        #: Contents of the prefetched external files by path.
+        self.prefetched: typing.Dict[str, str] = {}
         #: Map the extended detailed type to the handler function, per-sample.
         self.handlers_individual = {
             "x-dragen-qc-fragment-length-hist": self._import_dragen_qc_fragment_length_hist,
@@ -197,24 +209,98 @@ class DragenQcImportExecutor(FileImportExecutorBase):
     def run(self):
         caseqc = CaseQc.objects.create(case=self.case)
         pedigree = self.case.pedigree_obj
+        externalfiles: typing.List[typing.Tuple[AbstractFile, str | None, str]] = []
         for external_file in pedigree.pedigreeexternalfile_set.all():
-            self._import_externalfile(external_file, caseqc)
-        for individual in pedigree.individual_set.all():
-            for external_file in IndividualExternalFile.objects.filter(individual=individual):
-                self._import_externalfile(external_file, caseqc, individual_name=individual.name)
+            x_detailed_type = self._get_x_detailed_type(external_file)
+            if x_detailed_type:
+                externalfiles.append((external_file, None, x_detailed_type))
+        for external_file in (
+            IndividualExternalFile.objects.filter(individual__pedigree=pedigree)
+            .select_related("individual")
+            .order_by("individual_id", "pk")
+        ):
+            x_detailed_type = self._get_x_detailed_type(external_file)
+            if x_detailed_type:
+                externalfiles.append(
+                    (external_file, external_file.individual.name, x_detailed_type)
+                )
+
+        fetch_times: typing.Dict[str, float] = {}
+        if settings.VARFISH_CASE_IMPORT_QC_THREADS > 1:
+            fetch_times = self._prefetch_externalfiles(externalfiles)
+
+        load_times: typing.Dict[str, float] = {}
+        with transaction.atomic():
+            for external_file, individual_name, x_detailed_type in externalfiles:
+                start = time.monotonic()
+                self._import_externalfile(external_file, caseqc, individual_name=individual_name)
+                load_times[x_detailed_type] = (
+                    load_times.get(x_detailed_type, 0.0) + time.monotonic() - start
+                )
+        self.prefetched = {}
+        self._log_timings(externalfiles, fetch_times, load_times)
+
+        update_varfish_stats(caseqc)
         with transaction.atomic():
             caseqc.refresh_from_db()
             if caseqc.state == CaseQc.STATE_DRAFT:
                 caseqc.state = CaseQc.STATE_ACTIVE
                 caseqc.save()
 
-    def _import_externalfile(
+    def _prefetch_externalfiles(
+        self, externalfiles: typing.List[typing.Tuple[AbstractFile, str | None, str]]
+    ) -> typing.Dict[str, float]:
+        """Fetch the contents of the external files concurrently into ``self.prefetched``.
+
+        Return the summed fetch time per detailed type.
+        """
+
+        def fetch(external_file: AbstractFile) -> typing.Tuple[str, float]:
+            start = time.monotonic()
+            with self.external_fs.open(external_file.path, "rt") as inputf:
+                content = inputf.read()
+            return content, time.monotonic() - start
+
+        fetch_times: typing.Dict[str, float] = {}
+        with ThreadPoolExecutor(max_workers=settings.VARFISH_CASE_IMPORT_QC_THREADS) as executor:
+            futures = {
+                executor.submit(fetch, external_file): (external_file, x_detailed_type)
+                for external_file, _, x_detailed_type in externalfiles
+            }
+            for future in as_completed(futures):
+                external_file, x_detailed_type = futures[future]
+                content, elapsed = future.result()
+                self.prefetched[external_file.path] = content
+                fetch_times[x_detailed_type] = fetch_times.get(x_detailed_type, 0.0) + elapsed
+        return fetch_times
+
+    def _log_timings(
         self,
-        external_file: IndividualExternalFile,
-        caseqc: CaseQc,
-        individual_name: str | None = None,
+        externalfiles: typing.List[typing.Tuple[AbstractFile, str | None, str]],
+        fetch_times: typing.Dict[str, float],
+        load_times: typing.Dict[str, float],
     ):
-        """Import quality metrics from external file, if any.
+        """Write the per-type file counts and timings to the background job log, if any."""
+        if not self.bgjob:
+            return
+        counts: typing.Dict[str, int] = {}
+        for _, _, x_detailed_type in externalfiles:
+            counts[x_detailed_type] = counts.get(x_detailed_type, 0) + 1
+        for x_detailed_type, count in sorted(counts.items()):
+            self.bgjob.add_log_entry(
+                f"... {x_detailed_type}: {count} file(s), "
+                f"fetched in {fetch_times.get(x_detailed_type, 0.0):.2f}s, "
+                f"loaded in {load_times.get(x_detailed_type, 0.0):.2f}s"
+            )
+
+    def _open_externalfile(self, external_file: AbstractFile) -> typing.IO:
+        """Open the external file for reading, using the prefetched contents if available."""
+        if external_file.path in self.prefetched:
+            return io.StringIO(self.prefetched[external_file.path])
+        return self.external_fs.open(external_file.path, "rt")
+
+    def _get_x_detailed_type(self, external_file: AbstractFile) -> str | None:
+        """Return the detailed type of a QC file that can be handled, ``None`` otherwise.
 
         To be loaded as QC info, the designation must be "quality_control" and the mimetype
         must be "text/csv+{x_detailed_type}" where ``x_detailed_type`` must be one of the
@@ -222,19 +308,31 @@ class DragenQcImportExecutor(FileImportExecutorBase):
         """
         fa = external_file.file_attributes
         if fa.get("designation") != "quality_control":
-            return  # can only handle QC data here
-        file_identifier_to_individual: typing.Dict[str, str] = {
-            v: k for k, v in (external_file.identifier_map or {}).items()
-        }
+            return None  # can only handle QC data here
 
         mimetype = str(fa.get("mimetype", ""))
         if mimetype.count("+") != 1:
-            return  # no detailed type
+            return None  # no detailed type
 
         _base_mimetype, x_detailed_type = mimetype.split("+", 1)
         maps = (self.handlers_individual, self.handlers_pedigree)
         if not any(x_detailed_type in map for map in maps):
-            return  # no handler configured
+            return None  # no handler configured
+        return x_detailed_type
+
+    def _import_externalfile(
+        self,
+        external_file: IndividualExternalFile,
+        caseqc: CaseQc,
+        individual_name: str | None = None,
+    ):
+        """Import quality metrics from external file, if any."""
+        x_detailed_type = self._get_x_detailed_type(external_file)
+        if not x_detailed_type:
+            return
+        file_identifier_to_individual: typing.Dict[str, str] = {
+            v: k for k, v in (external_file.identifier_map or {}).items()
+        }
 
         if x_detailed_type in self.handlers_individual:
             self.handlers_individual[x_detailed_type](
@@ -252,7 +350,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
         caseqc: CaseQc,
         file_identifier_to_individual: typing.Dict[str, str] | None = None,
     ):
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_dragen.load_cnv_metrics(
                 input_file=inputf,
                 caseqc=caseqc,
@@ -267,7 +365,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
         file_identifier_to_individual: typing.Dict[str, str] | None = None,
     ):
         sample_name = external_file.identifier_map.get(individual_name, individual_name)
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_dragen.load_fragment_length_hist(
                 sample=sample_name,
                 input_file=inputf,
@@ -283,7 +381,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
         file_identifier_to_individual: typing.Dict[str, str] | None = None,
     ):
         sample_name = external_file.identifier_map.get(individual_name, individual_name)
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_dragen.load_mapping_metrics(
                 sample=sample_name,
                 input_file=inputf,
@@ -299,7 +397,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
         file_identifier_to_individual: typing.Dict[str, str] | None = None,
     ):
         sample_name = external_file.identifier_map.get(individual_name, individual_name)
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_dragen.load_ploidy_estimation_metrics(
                 sample=sample_name,
                 input_file=inputf,
@@ -315,7 +413,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
         file_identifier_to_individual: typing.Dict[str, str] | None = None,
     ):
         sample_name = external_file.identifier_map.get(individual_name, individual_name)
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_dragen.load_roh_metrics(
                 sample=sample_name,
                 input_file=inputf,
@@ -329,7 +427,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
         caseqc: CaseQc,
         file_identifier_to_individual: typing.Dict[str, str] | None = None,
     ):
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_dragen.load_sv_metrics(
                 input_file=inputf,
                 caseqc=caseqc,
@@ -344,7 +442,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
         file_identifier_to_individual: typing.Dict[str, str] | None = None,
     ):
         sample_name = external_file.identifier_map.get(individual_name, individual_name)
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_dragen.load_time_metrics(
                 sample=sample_name,
                 input_file=inputf,
@@ -360,7 +458,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
         file_identifier_to_individual: typing.Dict[str, str] | None = None,
     ):
         sample_name = external_file.identifier_map.get(individual_name, individual_name)
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_dragen.load_trimmer_metrics(
                 sample=sample_name,
                 input_file=inputf,
@@ -374,7 +472,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
         caseqc: CaseQc,
         file_identifier_to_individual: typing.Dict[str, str] | None = None,
     ):
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_dragen.load_vc_hethom_ratio_metrics(
                 input_file=inputf,
                 caseqc=caseqc,
@@ -387,7 +485,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
         caseqc: CaseQc,
         file_identifier_to_individual: typing.Dict[str, str] | None = None,
     ):
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_dragen.load_vc_metrics(
                 input_file=inputf,
                 caseqc=caseqc,
@@ -402,7 +500,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
         file_identifier_to_individual: typing.Dict[str, str] | None = None,
     ):
         sample_name = external_file.identifier_map.get(individual_name, individual_name)
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_dragen.load_wgs_contig_mean_cov(
                 sample=sample_name,
                 input_file=inputf,
@@ -418,7 +516,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
         file_identifier_to_individual: typing.Dict[str, str] | None = None,
     ):
         sample_name = external_file.identifier_map.get(individual_name, individual_name)
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_dragen.load_wgs_coverage_metrics(
                 sample=sample_name,
                 input_file=inputf,
@@ -434,7 +532,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
         file_identifier_to_individual: typing.Dict[str, str] | None = None,
     ):
         sample_name = external_file.identifier_map.get(individual_name, individual_name)
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_dragen.load_wgs_fine_hist(
                 sample=sample_name,
                 input_file=inputf,
@@ -450,7 +548,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
         file_identifier_to_individual: typing.Dict[str, str] | None = None,
     ):
         sample_name = external_file.identifier_map.get(individual_name, individual_name)
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_dragen.load_wgs_hist(
                 sample=sample_name,
                 input_file=inputf,
@@ -466,7 +564,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
         file_identifier_to_individual: typing.Dict[str, str] | None = None,
     ):
         sample_name = external_file.identifier_map.get(individual_name, individual_name)
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_dragen.load_wgs_overall_mean_cov(
                 sample=sample_name,
                 input_file=inputf,
@@ -483,7 +581,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
     ):
         sample_name = external_file.identifier_map.get(individual_name, individual_name)
         region_name = external_file.file_attributes.get("region_name", "UNKNOWN REGION")
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_dragen.load_region_coverage_metrics(
                 sample=sample_name,
                 region_name=region_name,
@@ -501,7 +599,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
     ):
         sample_name = external_file.identifier_map.get(individual_name, individual_name)
         region_name = external_file.file_attributes.get("region_name", "UNKNOWN REGION")
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_dragen.load_region_fine_hist(
                 sample=sample_name,
                 region_name=region_name,
@@ -519,7 +617,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
     ):
         sample_name = external_file.identifier_map.get(individual_name, individual_name)
         region_name = external_file.file_attributes.get("region_name", "UNKNOWN REGION")
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_dragen.load_region_hist(
                 sample=sample_name,
                 region_name=region_name,
@@ -537,7 +635,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
     ):
         sample_name = external_file.identifier_map.get(individual_name, individual_name)
         region_name = external_file.file_attributes.get("region_name", "UNKNOWN REGION")
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_dragen.load_region_overall_mean_cov(
                 sample=sample_name,
                 region_name=region_name,
@@ -552,7 +650,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
         caseqc: CaseQc,
         file_identifier_to_individual: typing.Dict[str, str] | None = None,
     ):
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_samtools.load_bcftools_stats(
                 input_file=inputf,
                 caseqc=caseqc,
@@ -567,7 +665,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
         file_identifier_to_individual: typing.Dict[str, str] | None = None,
     ):
         sample_name = external_file.identifier_map.get(individual_name, individual_name)
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_samtools.load_samtools_flagstat(
                 sample=sample_name,
                 input_file=inputf,
@@ -583,7 +681,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
         file_identifier_to_individual: typing.Dict[str, str] | None = None,
     ):
         sample_name = external_file.identifier_map.get(individual_name, individual_name)
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_samtools.load_samtools_idxstats(
                 sample=sample_name,
                 input_file=inputf,
@@ -599,7 +697,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
         file_identifier_to_individual: typing.Dict[str, str] | None = None,
     ):
         sample_name = external_file.identifier_map.get(individual_name, individual_name)
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_samtools.load_samtools_stats(
                 sample=sample_name,
                 input_file=inputf,
@@ -615,7 +713,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
         file_identifier_to_individual: typing.Dict[str, str] | None = None,
     ):
         sample_name = external_file.identifier_map.get(individual_name, individual_name)
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_cramino.load_cramino(
                 sample=sample_name,
                 input_file=inputf,
@@ -632,7 +730,7 @@ class DragenQcImportExecutor(FileImportExecutorBase):
     ):
         sample_name = external_file.identifier_map.get(individual_name, individual_name)
         region_name = external_file.file_attributes.get("region_name", "UNKNOWN REGION")
-        with self.external_fs.open(external_file.path, "rt") as inputf:
+        with self._open_externalfile(external_file) as inputf:
             io_ngsbits.load_mappingqc(
                 sample=sample_name,
                 region_name=region_name,
@@ -1405,7 +1503,7 @@ class CaseImportBackgroundJobExecutor:
         self.caseimportbackgroundjob.add_log_entry("running qc file import...")
 
         # perform import of Dragen-style QC files
-        dragen_importer = DragenQcImportExecutor(case)
+        dragen_importer = DragenQcImportExecutor(case, bgjob=self.caseimportbackgroundjob)
         dragen_importer.run()
 
         self.caseimportbackgroundjob.add_log_entry("... done with qc file import")
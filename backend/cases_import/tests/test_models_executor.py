@@ -5,8 +5,10 @@ This has been broken away from ``test_models.py`` for better structure.
 
 import itertools
 import os
+import tempfile
 from unittest import mock
 
+from django.test import override_settings
 from google.protobuf.json_format import ParseDict
 from phenopackets import Family
 from projectroles.app_settings import AppSettingAPI
@@ -17,9 +19,11 @@ import yaml
 from cases.models import Case
 from cases.tests.factories import IndividualFactory, PedigreeFactory
 from cases_files.models import AbstractFile, PedigreeExternalFile, PedigreeInternalFile
+from cases_files.tests.factories import IndividualExternalFileFactory, PedigreeExternalFileFactory
 from cases_import.models.base import CaseImportAction
 from cases_import.models.executors import (
     CaseImportBackgroundJobExecutor,
+    DragenQcImportExecutor,
     build_legacy_pedigree,
     release_from_family,
 )
@@ -706,6 +710,86 @@ class ImportDeleteTest(ExecutorTestMixin, TestCaseSnapshot, TestCase):
         self.assertEqual(Case.objects.count(), 0)
 
 
+class DragenQcImportExecutorTest(TestCase):
+    """Test the ``DragenQcImportExecutor`` with sequential and concurrent fetching."""
+
+    def setUp(self):
+        super().setUp()
+        self.case = CaseFactory()
+        self.individual = self.case.pedigree_obj.individual_set.first()
+        AppSettingAPI().set(
+            plugin_name="cases_import",
+            setting_name="import_data_protocol",
+            value="file",
+            project=self.case.project,
+        )
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path_sv = self._write_file("sample.sv_metrics.csv", "sv metrics")
+        self.path_mapping = self._write_file("sample.mapping_metrics.csv", "mapping metrics")
+        PedigreeExternalFileFactory(
+            case=self.case,
+            pedigree=self.case.pedigree_obj,
+            path=self.path_sv,
+            file_attributes={
+                "designation": "quality_control",
+                "mimetype": "text/csv+x-dragen-qc-sv-metrics",
+            },
+        )
+        IndividualExternalFileFactory(
+            case=self.case,
+            individual=self.individual,
+            path=self.path_mapping,
+            file_attributes={
+                "designation": "quality_control",
+                "mimetype": "text/csv+x-dragen-qc-mapping-metrics",
+            },
+        )
+        # not a QC file, must be ignored
+        IndividualExternalFileFactory(case=self.case, individual=self.individual)
+
+    def _write_file(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "wt") as outputf:
+            outputf.write(content)
+        return path
+
+    @mock.patch("cases_qc.io.dragen.load_mapping_metrics")
+    @mock.patch("cases_qc.io.dragen.load_sv_metrics")
+    def _test_run(self, mock_load_sv_metrics, mock_load_mapping_metrics):
+        contents = {}
+        mock_load_sv_metrics.side_effect = lambda input_file, **_: contents.setdefault(
+            "sv", input_file.read()
+        )
+        mock_load_mapping_metrics.side_effect = lambda input_file, **_: contents.setdefault(
+            "mapping", input_file.read()
+        )
+        bgjob = mock.MagicMock()
+
+        DragenQcImportExecutor(self.case, bgjob=bgjob).run()
+
+        self.assertEqual(contents, {"sv": "sv metrics", "mapping": "mapping metrics"})
+        mock_load_mapping_metrics.assert_called_once_with(
+            sample=self.individual.name,
+            input_file=mock.ANY,
+            caseqc=CaseQc.objects.get(),
+            file_identifier_to_individual={},
+        )
+        self.assertEqual(CaseQc.objects.get().state, CaseQc.STATE_ACTIVE)
+        log_entries = [call.args[0] for call in bgjob.add_log_entry.call_args_list]
+        self.assertEqual(len(log_entries), 2)
+        self.assertTrue(log_entries[0].startswith("... x-dragen-qc-mapping-metrics: 1 file(s)"))
+        self.assertTrue(log_entries[1].startswith("... x-dragen-qc-sv-metrics: 1 file(s)"))
+
+    @override_settings(VARFISH_CASE_IMPORT_QC_THREADS=1)
+    def test_run_sequential(self):
+        self._test_run()
+
+    @override_settings(VARFISH_CASE_IMPORT_QC_THREADS=4)
+    def test_run_concurrent(self):
+        self._test_run()
+
+
 class BuildLegacyModelTest(TestCaseSnapshot, TestCase):
     def setUp(self):
         with open("cases_import/tests/data/family.yaml", "rt") as inputf:
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:55
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django_pydantic_field.fields
+
+import cases_qc.models.varfish
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cases_qc", "0003_auto_20240604_1128"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="caseqc",
+            name="varfish_stats",
+            field=django_pydantic_field.fields.PydanticSchemaField(
+                blank=True,
+                config=None,
+                default=None,
+                encoder=django.core.serializers.json.DjangoJSONEncoder,
+                null=True,
+                schema=cases_qc.models.varfish.VarfishStats | None,
+            ),
+        ),
+        migrations.AddField(
+            model_name="caseqc",
+            name="varfish_stats_version",
+            field=models.IntegerField(blank=True, default=None, null=True),
+        ),
+    ]
@@ -1,8 +1,10 @@
 import uuid as uuid_object
 
 from django.db import models
+from django_pydantic_field import SchemaField
 
 from cases.models import Case
+from cases_qc.models.varfish import VarfishStats
 
 #: Maximal array length for Postgres array fields
 MAX_ARRAY_LENGTH = 10_000
@@ -35,6 +37,11 @@ class CaseQc(models.Model):
     #: The case this QC set belong to
     case = models.ForeignKey(Case, on_delete=models.CASCADE, null=False, blank=False)
 
+    #: Precomputed ``VarfishStats`` for the UI, see ``cases_qc.varfish_stats``
+    varfish_stats = SchemaField(schema=VarfishStats | None, default=None, null=True, blank=True)
+    #: Version of the derivation that ``varfish_stats`` was computed with
+    varfish_stats_version = models.IntegerField(default=None, null=True, blank=True)
+
     class Meta:
         #: Order by creation date
         ordering = ["-date_created"]
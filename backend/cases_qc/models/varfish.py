@@ -3,8 +3,8 @@
 While we expose all raw statistics via a REST API, this data type is used for generating
 the quality control display in the frontend.
 
-We only use Pydantic models here; we construct them on the fly from the raw statistics in
-the REST API endpoints.
+We only use Pydantic models here; they are derived from the raw statistics after QC import
+(see ``cases_qc.varfish_stats``) and stored in ``CaseQc.varfish_stats``.
 """
 
 from typing import Annotated
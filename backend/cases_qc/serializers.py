@@ -68,6 +68,23 @@ from cases_qc.models.varfish import (
 )
 
 
+def downsample_histogram(
+    keys: list[int], values: list[int | float], max_points: int | None
+) -> tuple[list[int], list[int | float]]:
+    """Downsample a sparse histogram to at most ``max_points`` entries.
+
+    Consecutive entries are merged into chunks of equal entry count; each chunk is
+    represented by its first key and the sum of its values.
+    """
+    if not max_points or len(keys) <= max_points:
+        return keys, values
+    chunk_size = -(-len(keys) // max_points)
+    return (
+        [keys[i] for i in range(0, len(keys), chunk_size)],
+        [sum(values[i : i + chunk_size]) for i in range(0, len(values), chunk_size)],
+    )
+
+
 class QcSerializerBase(SODARModelSerializer):
     caseqc = serializers.ReadOnlyField(source="caseqc.sodar_uuid")
 
@@ -76,6 +93,24 @@ class QcSerializerBase(SODARModelSerializer):
         exclude = ("id",)
 
 
+class DragenBaseHistogramSerializer(QcSerializerBase):
+    """Base serializer for ``DragenBaseHistogram`` models.
+
+    Downsamples the histogram if ``max_points`` is given in the serializer context.
+    """
+
+    def to_representation(self, instance):
+        result = super().to_representation(instance)
+        result["keys"], result["values"] = downsample_histogram(
+            result["keys"], result["values"], self.context.get("max_points")
+        )
+        return result
+
+    class Meta:
+        abstract = True
+        exclude = ("id",)
+
+
 class DragenBaseMetricsSerializer(QcSerializerBase):
     metrics = SchemaField(schema=list[DragenStyleMetric])
 
@@ -90,7 +125,7 @@ class DragenCnvMetricsSerializer(DragenBaseMetricsSerializer):
         exclude = ("id",)
 
 
-class DragenFragmentLengthHistogramSerializer(QcSerializerBase):
+class DragenFragmentLengthHistogramSerializer(DragenBaseHistogramSerializer):
     class Meta:
         model = DragenFragmentLengthHistogram
         exclude = ("id",)
@@ -164,7 +199,7 @@ class DragenWgsOverallMeanCovSerializer(DragenBaseMetricsSerializer):
         exclude = ("id",)
 
 
-class DragenWgsFineHistSerializer(QcSerializerBase):
+class DragenWgsFineHistSerializer(DragenBaseHistogramSerializer):
     class Meta:
         model = DragenWgsFineHist
         exclude = ("id",)
@@ -182,7 +217,7 @@ class DragenRegionCoverageMetricsSerializer(DragenBaseMetricsSerializer):
         exclude = ("id",)
 
 
-class DragenRegionFineHistSerializer(QcSerializerBase):
+class DragenRegionFineHistSerializer(DragenBaseHistogramSerializer):
     class Meta:
         model = DragenRegionFineHist
         exclude = ("id",)
@@ -363,7 +398,7 @@ class CaseQcSerializer(SODARModelSerializer):
 
     class Meta:
         model = CaseQc
-        exclude = ("id",)
+        exclude = ("id", "varfish_stats", "varfish_stats_version")
 
 
 class VarfishStatsSerializer(rest_framework.serializers.Serializer):
@@ -30,6 +30,7 @@ from cases_qc.serializers import (
     SamtoolsStatsMainMetricsSerializer,
     SamtoolsStatsSupplementaryMetricsSerializer,
     VarfishStatsSerializer,
+    downsample_histogram,
 )
 from cases_qc.tests import helpers
 from cases_qc.tests.factories import (
@@ -104,3 +105,20 @@ class SerializerTest(
         obj = factory_class()
         serializer = serializer_class(obj)
         self.assertMatchSnapshot(dict(serializer.data))
+
+
+class DownsampleHistogramTest(TestCase):
+    def test_downsample_histogram(self):
+        keys, values = downsample_histogram([1, 2, 3, 4, 5], [1, 2, 3, 4, 5], 2)
+        self.assertEqual(keys, [1, 4])
+        self.assertEqual(values, [6, 9])
+
+    def test_downsample_histogram_noop(self):
+        self.assertEqual(downsample_histogram([1, 2], [3, 4], 2), ([1, 2], [3, 4]))
+        self.assertEqual(downsample_histogram([1, 2], [3, 4], None), ([1, 2], [3, 4]))
+
+    def test_serializer_max_points(self):
+        obj = DragenWgsFineHistFactory()
+        data = DragenWgsFineHistSerializer(obj, context={"max_points": 2}).data
+        self.assertEqual(data["keys"], [37, 41])
+        self.assertEqual(data["values"], [101, 101])
@@ -9,8 +9,16 @@ from cases_import.models.base import CaseImportAction
 from cases_import.models.executors import CaseImportBackgroundJobExecutor
 from cases_import.tests.factories import CaseImportActionFactory, CaseImportBackgroundJobFactory
 from cases_import.tests.test_models_executor import ExecutorTestMixin
+from cases_qc.models import CaseQc
 from cases_qc.tests import helpers
-from cases_qc.tests.factories import CaseQcFactory, DragenWgsOverallMeanCovFactory
+from cases_qc.tests.factories import (
+    CaseQcFactory,
+    DragenStyleMetricFactory,
+    DragenSvMetricsFactory,
+    DragenWgsFineHistFactory,
+    DragenWgsOverallMeanCovFactory,
+)
+from cases_qc.varfish_stats import VARFISH_STATS_VERSION
 from seqmeta.tests.factories import TargetBedFileFactory
 from variants.models import Case
 from variants.tests.factories import CaseFactory
@@ -43,6 +51,19 @@ class CaseQcRetrieveApiViewTest(
         self.assertEqual(response.status_code, 200)
         self.assertMatchSnapshot(response.json())
 
+    def test_retrieve_max_points(self):
+        """GET with downsampling of histograms"""
+        caseqc = CaseQcFactory(case__project=self.project, state=CaseQc.STATE_ACTIVE)
+        DragenWgsFineHistFactory(caseqc=caseqc)
+        extra = self.get_accept_header(None, None)
+        url = reverse("cases_qc:api-caseqc-retrieve", kwargs={"case": caseqc.case.sodar_uuid})
+        with self.login(self.superuser):
+            response = self.client.get(url, {"max_points": 2}, **extra)
+            response_invalid = self.client.get(url, {"max_points": "x"}, **extra)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["dragen_wgsfinehist"][0]["keys"], [37, 41])
+        self.assertEqual(response_invalid.status_code, 400)
+
     def test_retrieve_nonexisting(self):
         """GET on non-existing case"""
         case = CaseFactory(project=self.project)
@@ -120,3 +141,38 @@ class TestVarfishStatsRetrieveApiView(
             )
         self.assertEqual(response.status_code, 200)
         self.assertMatchSnapshot(response.json())
+
+    def _retrieve(self, case):
+        extra = self.get_accept_header(None, None)
+        with self.login(self.superuser):
+            return self.client.get(
+                reverse("cases_qc:api-varfishstats-retrieve", kwargs={"case": case.sodar_uuid}),
+                **extra,
+            )
+
+    def test_retrieve_stored(self):
+        """The ``VarfishStats`` are stored on first access and recomputed if outdated"""
+        caseqc = CaseQcFactory(case__project=self.project, state=CaseQc.STATE_ACTIVE)
+        DragenSvMetricsFactory(
+            caseqc=caseqc,
+            metrics=[
+                DragenStyleMetricFactory(
+                    section="SV SUMMARY", entry="sample", name="Number of deletions (PASS)"
+                )
+            ],
+        )
+
+        response = self._retrieve(caseqc.case)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["strucvarstats"][0]["deletion_count"], 42)
+        caseqc.refresh_from_db()
+        self.assertEqual(caseqc.varfish_stats_version, VARFISH_STATS_VERSION)
+        self.assertEqual(caseqc.varfish_stats.samples, ["sample"])
+
+        caseqc.varfish_stats.samples = ["outdated"]
+        caseqc.save()
+        self.assertEqual(self._retrieve(caseqc.case).json()["samples"], ["outdated"])
+
+        caseqc.varfish_stats_version = VARFISH_STATS_VERSION - 1
+        caseqc.save()
+        self.assertEqual(self._retrieve(caseqc.case).json()["samples"], ["sample"])
@@ -648,6 +648,16 @@ FIELD_ENCRYPTION_KEY = env.str(
 # Number of cases to perform in one query for joint queries.
 QUERY_MAX_UNION = env.int("VARFISH_QUERY_MAX_UNION", 20)
 
+# Number of projects to regenerate annotation result sets for in parallel, 1 to run sequentially.
+RESULT_SET_WORKERS = env.int("VARFISH_RESULT_SET_WORKERS", 4)
+
+# Number of independent filter job stages (gene and variant prioritization) to run in parallel, 1 to
+# run them sequentially.
+FILTER_STAGE_WORKERS = env.int("VARFISH_FILTER_STAGE_WORKERS", 4)
+
+# Timeout (in seconds) of cached per-variant frequency lookups.
+FREQUENCY_CACHE_TIMEOUT = env.int("VARFISH_FREQUENCY_CACHE_TIMEOUT", 24 * 60 * 60)
+
 # Timeout (in hours) for VarFish cleaning up background SV sets in "building" state.
 SV_CLEANUP_BUILDING_SV_SETS = env.int("VARFISH_SV_CLEANUP_BUILDING_SV_SETS", 48)
 
@@ -663,6 +673,18 @@ WORKER_EXE_PATH = env.str("VARFISH_WORKER_EXE_PATH", "varfish-server-worker")
 # URL prefix to look at for worker.
 WORKER_REST_BASE_URL = env.str("VARFISH_WORKER_REST_BASE_URL", "http://127.0.0.1:8081")
 
+# Data version of the worker database, change to prevent reuse of earlier seqvars query results.
+WORKER_DB_VERSION = env.str("VARFISH_WORKER_DB_VERSION", "")
+
+# Number of seqvars in-house database builds to keep per genome release, including the active one.
+VARFISH_SEQVARS_INHOUSE_DB_KEEP_BUILDS = env.int("VARFISH_SEQVARS_INHOUSE_DB_KEEP_BUILDS", 3)
+# Build the seqvars in-house database incrementally when cases were only added, by aggregating the
+# new cases into a copy of the active build.  Only enable this if the worker's `seqvars aggregate`
+# adds to an existing RocksDB, otherwise the new build only holds the new cases.
+VARFISH_SEQVARS_INHOUSE_DB_INCREMENTAL = env.bool(
+    "VARFISH_SEQVARS_INHOUSE_DB_INCREMENTAL", default=False
+)
+
 
 # Varfish: Exomiser
 # ------------------------------------------------------------------------------
@@ -673,6 +695,9 @@ VARFISH_ENABLE_EXOMISER_PRIORITISER = env.bool("VARFISH_ENABLE_EXOMISER_PRIORITI
 VARFISH_EXOMISER_PRIORITISER_API_URL = env.str("VARFISH_EXOMISER_PRIORITISER_API_URL", "")
 # Configure maximal number of genes to send to Exomiser API
 VARFISH_EXOMISER_PRIORITISER_MAX_GENES = env.int("VARFISH_EXOMISER_PRIORITISER_MAX_GENES", 1000)
+# Data version of the Exomiser prioritizer.  Cached gene scores are only invalidated when this
+# changes, so bump it whenever the Exomiser software or data is upgraded.
+VARFISH_EXOMISER_PRIORITISER_DATA_VERSION = env.str("VARFISH_EXOMISER_PRIORITISER_DATA_VERSION", "")
 
 # Varfish: CADD
 # ------------------------------------------------------------------------------
@@ -696,6 +721,27 @@ VARFISH_ENABLE_CADA = env.bool("VARFISH_ENABLE_CADA", default=False)
 VARFISH_CADA_REST_API_URL = env.str(
     "VARFISH_CADA_REST_API_URL", "https://cada.gene-talk.de/api/process"
 )
+# Data version of the CADA prioritizer.  Cached gene scores are only invalidated when this
+# changes, so bump it whenever the CADA service is upgraded.
+VARFISH_CADA_DATA_VERSION = env.str("VARFISH_CADA_DATA_VERSION", "")
+
+# Enable persistent caching of gene prioritization (Exomiser/CADA) scores.
+VARFISH_GENE_PRIO_CACHE_ENABLED = env.bool("VARFISH_GENE_PRIO_CACHE_ENABLED", default=True)
+# Cached gene scores not used for this many days are removed nightly.
+VARFISH_GENE_PRIO_CACHE_MAX_AGE_DAYS = env.int("VARFISH_GENE_PRIO_CACHE_MAX_AGE_DAYS", 90)
+
+# Enable the site-wide cache of per-variant annotations (mehari transcripts).
+VARFISH_ANNOTATION_CACHE_ENABLED = env.bool("VARFISH_ANNOTATION_CACHE_ENABLED", default=True)
+# Data versions of the annotation sources (mehari, cadd, umd, mutationtaster) of the mehari and
+# pathogenicity score caches, e.g., "mehari=0.36,umd=2024-01".  Only annotations of the configured
+# versions are used.  The CADD version defaults to VARFISH_CADD_REST_API_CADD_VERSION, the other
+# sources have no version by default, so set (or bump) their version whenever the mehari or scorer
+# data is upgraded.  Otherwise the annotations of the old data keep being served from the cache.
+VARFISH_ANNOTATION_CACHE_DATA_VERSIONS = env.dict(
+    "VARFISH_ANNOTATION_CACHE_DATA_VERSIONS", default={}
+)
+# Maximal number of cached annotations per cache, the least recently used ones are removed nightly.
+VARFISH_ANNOTATION_CACHE_MAX_ENTRIES = env.int("VARFISH_ANNOTATION_CACHE_MAX_ENTRIES", 1_000_000)
 
 # Enable PEDIA prioritization.
 VARFISH_ENABLE_PEDIA = env.bool("VARFISH_ENABLE_PEDIA", default=False)
@@ -739,6 +785,11 @@ VARFISH_ENABLE_SVS = env.bool("VARFISH_ENABLE_SVS", default=False)
 
 # Enabling or disabling Beacon site.
 VARFISH_ENABLE_BEACON_SITE = env.bool("VARFISH_ENABLE_BEACON_SITE", default=False)
+# Delay in seconds between a change of the variants or consortium assignments of a project and the
+# refresh of the precomputed beacon allele counts.  Until then, the project is queried directly.
+VARFISH_BEACON_ALLELE_COUNT_REFRESH_DELAY = env.int(
+    "VARFISH_BEACON_ALLELE_COUNT_REFRESH_DELAY", 10 * 60
+)
 
 # Your common stuff: Below this line define 3rd party library settings
 # ------------------------------------------------------------------------------
@@ -1111,6 +1162,8 @@ VARFISH_CASE_IMPORT_INTERNAL_STORAGE = InternalStorageConfig(
         },
     )
 )
+#: Number of threads for fetching QC files concurrently on import, 1 to fetch sequentially.
+VARFISH_CASE_IMPORT_QC_THREADS = env.int("VARFISH_CASE_IMPORT_QC_THREADS", default=8)
 #: Prefilter configurations.
 VARFISH_CASE_IMPORT_SEQVARS_PREFILTER_CONFIGS: list[PrefilterConfig] = [
     PrefilterConfig(**vals)
@@ -1135,6 +1188,29 @@ VARFISH_BACKEND_URL_MEHARI = env.str("VARFISH_BACKEND_URL_MEHARI", default="http
 VARFISH_BACKEND_URL_VIGUNO = env.str("VARFISH_BACKEND_URL_VIGUNO", default="http://localhost:3003")
 VARFISH_BACKEND_URL_NGINX = env.str("VARFISH_BACKEND_URL_NGINX", default="http://localhost:3004")
 
+# Shared HTTP client for the backends (see ``varfish.backend_client``).
+#
+# Read and connect timeouts in seconds.
+BACKEND_CLIENT_TIMEOUT = env.float("VARFISH_BACKEND_CLIENT_TIMEOUT", 60.0)
+BACKEND_CLIENT_CONNECT_TIMEOUT = env.float("VARFISH_BACKEND_CLIENT_CONNECT_TIMEOUT", 5.0)
+# Read timeouts per service, e.g., "pedia=120,cadd_submission=600".
+BACKEND_CLIENT_SERVICE_TIMEOUTS = env.dict(
+    "VARFISH_BACKEND_CLIENT_SERVICE_TIMEOUTS", cast={"value": float}, default={}
+)
+# Number of retries of idempotent requests and base of the exponential backoff in seconds.
+BACKEND_CLIENT_RETRIES = env.int("VARFISH_BACKEND_CLIENT_RETRIES", 2)
+BACKEND_CLIENT_BACKOFF = env.float("VARFISH_BACKEND_CLIENT_BACKOFF", 0.5)
+# Consecutive failures after which a service is considered down (0 to disable), and seconds until
+# it is tried again.
+BACKEND_CLIENT_BREAKER_THRESHOLD = env.int("VARFISH_BACKEND_CLIENT_BREAKER_THRESHOLD", 5)
+BACKEND_CLIENT_BREAKER_RESET = env.float("VARFISH_BACKEND_CLIENT_BREAKER_RESET", 30.0)
+# Number of keep-alive connections per service.
+BACKEND_CLIENT_POOL_SIZE = env.int("VARFISH_BACKEND_CLIENT_POOL_SIZE", 10)
+# Seconds between logging the request metrics of the services in each process (0 to disable).
+BACKEND_CLIENT_METRICS_LOG_INTERVAL = env.float(
+    "VARFISH_BACKEND_CLIENT_METRICS_LOG_INTERVAL", 300.0
+)
+
 # URL prefix through the front reverse proxy (traefik for production).
 VARFISH_BACKEND_URL_PREFIX_ANNONARS = env.str(
     "VARFISH_BACKEND_URL_PREFIX_ANNONARS", default="/proxy/varfish/annonars"
@@ -44,6 +44,11 @@ CELERY_TASK_ALWAYS_EAGER = True
 # http://docs.celeryproject.org/en/latest/userguide/configuration.html#task-eager-propagates
 CELERY_TASK_EAGER_PROPAGATES = True
 
+# BACKEND CLIENT
+# ------------------------------------------------------------------------------
+# Do not sleep between retries of backend calls.
+BACKEND_CLIENT_BACKOFF = 0.0
+
 # SITE CONFIGURATION
 # ------------------------------------------------------------------------------
 # In tests ... everything goes.
@@ -68,6 +68,7 @@ urlpatterns += [
     path("cases-qc/", include("cases_qc.urls")),
     path("cases-analysis/", include("cases_analysis.urls")),
     path("seqvars/", include("seqvars.urls")),
+    path("frequencies/", include("frequencies.urls")),
 ]
 
 # URL Patterns for DRF Spectacular
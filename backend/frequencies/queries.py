@@ -0,0 +1,118 @@
+"""Batched lookup of variant frequencies from all frequency databases."""
+
+import hashlib
+import json
+import typing
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .models import FREQUENCY_DB_INFO, MT_DB_INFO
+
+#: The columns identifying a variant in the frequency databases (see ``Coordinates.Meta.unique_together``).
+KEY_FIELDS = ("release", "chromosome", "start", "reference", "alternative")
+
+#: All frequency databases, by name.
+FREQUENCY_DBS = {
+    **{db_name: info["model"] for db_name, info in FREQUENCY_DB_INFO.items()},
+    **MT_DB_INFO,
+}
+
+#: Number of variants to look up in one statement.
+LOOKUP_CHUNK_SIZE = 500
+
+#: A variant key, values in the order of ``KEY_FIELDS``.
+VariantKey = typing.Tuple[str, str, int, str, str]
+
+
+def variant_key(variant: typing.Mapping) -> VariantKey:
+    """Return the ``VariantKey`` of the given mapping, e.g., query keyword arguments."""
+    return (
+        variant["release"],
+        variant["chromosome"],
+        int(variant["start"]),
+        variant["reference"],
+        variant["alternative"],
+    )
+
+
+def _cache_key(key: VariantKey) -> str:
+    """Return the cache key for the frequencies of one variant.
+
+    The variant is hashed as reference and alternative alleles may be longer than cache backends allow for keys.
+    """
+    return "frequencies:%s" % hashlib.sha1("-".join(map(str, key)).encode("utf-8")).hexdigest()
+
+
+def _query_frequencies(
+    keys: typing.Sequence[VariantKey], db_names: typing.Iterable[str]
+) -> typing.Dict[VariantKey, typing.Dict[str, typing.Optional[dict]]]:
+    """Look up ``keys`` in all databases from ``db_names`` with one ``UNION ALL`` statement.
+
+    Each database record is returned as ``dict`` of its columns.
+    """
+    values = ", ".join(["(%s, %s, %s::integer, %s, %s)"] * len(keys))
+    selects = [
+        (
+            "SELECT %%s AS db_name, k.*, to_jsonb(t.*) AS record FROM keys k "
+            "JOIN %s t USING (release, chromosome, start, reference, alternative)"
+        )
+        % connection.ops.quote_name(FREQUENCY_DBS[db_name]._meta.db_table)
+        for db_name in db_names
+    ]
+    stmt = "WITH keys (%s) AS (VALUES %s) %s" % (
+        ", ".join(KEY_FIELDS),
+        values,
+        " UNION ALL ".join(selects),
+    )
+    params = [value for key in keys for value in key] + list(db_names)
+
+    result = {key: {db_name: None for db_name in db_names} for key in keys}
+    with connection.cursor() as cursor:
+        cursor.execute(stmt, params)
+        for db_name, *key, record in cursor.fetchall():
+            # Django's connection does not decode ``jsonb`` values.
+            result[tuple(key)][db_name] = json.loads(record)
+    return result
+
+
+def fetch_frequencies(
+    variants: typing.Iterable[typing.Mapping],
+    db_names: typing.Optional[typing.Iterable[str]] = None,
+) -> typing.Dict[VariantKey, typing.Dict[str, typing.Optional[dict]]]:
+    """Return the frequencies of all ``variants`` from the databases named in ``db_names``.
+
+    By default, all databases from ``FREQUENCY_DBS`` are queried.  The result maps the ``variant_key()`` of each
+    variant to a ``dict`` from database name to the database record as ``dict`` or ``None`` if the variant is not in
+    the database.
+
+    Results are cached per variant for ``settings.FREQUENCY_CACHE_TIMEOUT`` seconds, variants not in the cache are
+    looked up with one statement per ``LOOKUP_CHUNK_SIZE`` variants.
+    """
+    db_names = list(FREQUENCY_DBS if db_names is None else db_names)
+    keys = list(dict.fromkeys(map(variant_key, variants)))
+
+    cache_keys = {key: _cache_key(key) for key in keys}
+    cached = cache.get_many(cache_keys.values())
+    result = {}
+    missing = []
+    for key in keys:
+        entry = cached.get(cache_keys[key])
+        if entry is not None:
+            result[key] = {db_name: entry[db_name] for db_name in db_names}
+        else:
+            missing.append(key)
+
+    # Always look up the missing variants in all databases so the cache entries are complete.
+    for offset in range(0, len(missing), LOOKUP_CHUNK_SIZE):
+        found = _query_frequencies(
+            missing[offset : offset + LOOKUP_CHUNK_SIZE], list(FREQUENCY_DBS)
+        )
+        cache.set_many(
+            {cache_keys[key]: entry for key, entry in found.items()},
+            settings.FREQUENCY_CACHE_TIMEOUT,
+        )
+        for key, entry in found.items():
+            result[key] = {db_name: entry[db_name] for db_name in db_names}
+    return result
@@ -0,0 +1,28 @@
+from rest_framework import serializers
+
+#: Maximal number of variants per bulk frequency lookup.
+FREQUENCIES_MAX_VARIANTS = 1000
+
+
+class FrequencyVariantSerializer(serializers.Serializer):
+    """Serializer for the coordinates of one variant in a bulk frequency lookup."""
+
+    release = serializers.CharField(max_length=32)
+    chromosome = serializers.CharField(max_length=32)
+    start = serializers.IntegerField()
+    reference = serializers.CharField(max_length=512)
+    alternative = serializers.CharField(max_length=512)
+
+
+class FrequencyBulkQuerySerializer(serializers.Serializer):
+    """Serializer for the request of a bulk frequency lookup."""
+
+    variants = FrequencyVariantSerializer(
+        many=True, allow_empty=False, max_length=FREQUENCIES_MAX_VARIANTS
+    )
+
+
+class FrequencyBulkResultSerializer(FrequencyVariantSerializer):
+    """Serializer for the frequencies of one variant, by frequency database name."""
+
+    frequencies = serializers.DictField(child=serializers.JSONField(allow_null=True))
@@ -0,0 +1,73 @@
+"""Tests for the batched frequency lookup in ``frequencies.queries``."""
+
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from variants.tests.helpers import QueryTestBase
+
+from ..queries import FREQUENCY_DBS, fetch_frequencies, variant_key
+from ..views import FrequencyMixin
+from .factories import ExacFactory, GnomadExomesFactory, GnomadGenomesFactory
+
+
+def _key_kwargs(obj):
+    return {
+        "release": obj.release,
+        "chromosome": obj.chromosome,
+        "start": obj.start,
+        "end": obj.end,
+        "reference": obj.reference,
+        "alternative": obj.alternative,
+    }
+
+
+class TestFetchFrequencies(QueryTestBase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.exomes = GnomadExomesFactory()
+        self.genomes = GnomadGenomesFactory(**_key_kwargs(self.exomes))
+        self.exac = ExacFactory()
+
+    def test_fetch(self):
+        variants = [_key_kwargs(self.exomes), _key_kwargs(self.exac)]
+        with CaptureQueriesContext(connection) as ctx:
+            result = fetch_frequencies(variants)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(list(result), [variant_key(variant) for variant in variants])
+        first, second = result.values()
+        self.assertEqual(set(first), set(FREQUENCY_DBS))
+        self.assertEqual(first["gnomadexomes"]["af"], self.exomes.af)
+        self.assertEqual(first["gnomadgenomes"]["id"], self.genomes.id)
+        self.assertIsNone(first["exac"])
+        self.assertIsNone(first["MITOMAP"])
+        self.assertEqual(second["exac"]["ac"], self.exac.ac)
+        self.assertIsNone(second["gnomadexomes"])
+
+    def test_fetch_cached(self):
+        variants = [_key_kwargs(self.exomes), _key_kwargs(self.exac)]
+        expected = fetch_frequencies(variants)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(fetch_frequencies(variants), expected)
+            result = fetch_frequencies([_key_kwargs(self.exac)], ["exac"])
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(
+            list(result.values()), [{"exac": expected[variant_key(variants[1])]["exac"]}]
+        )
+
+    @patch("frequencies.queries.LOOKUP_CHUNK_SIZE", 1)
+    def test_fetch_chunked(self):
+        with CaptureQueriesContext(connection) as ctx:
+            result = fetch_frequencies([_key_kwargs(self.exomes), _key_kwargs(self.exac)])
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertEqual(len(result), 2)
+
+    def test_frequency_mixin(self):
+        result = FrequencyMixin().get_frequencies(_key_kwargs(self.exomes))
+        self.assertEqual(result["gnomadexomes"], self.exomes)
+        self.assertEqual(result["gnomadexomes"].hom, self.exomes.hom)
+        self.assertIsNone(result["exac"])
+        self.assertNotIn("MITOMAP", result)
@@ -0,0 +1,53 @@
+from django.core.cache import cache
+from django.urls import reverse
+
+from variants.tests.helpers import ApiViewTestBase
+
+from ..serializers import FREQUENCIES_MAX_VARIANTS
+from .factories import ExacFactory
+
+
+class TestFrequencyBulkApiView(ApiViewTestBase):
+    """Tests for the bulk frequency lookup"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.exac = ExacFactory()
+        self.url = reverse("frequencies:api-bulk")
+
+    def _variant(self, obj, **kwargs):
+        return {
+            "release": obj.release,
+            "chromosome": obj.chromosome,
+            "start": obj.start,
+            "reference": obj.reference,
+            "alternative": obj.alternative,
+            **kwargs,
+        }
+
+    def test_post(self):
+        variants = [self._variant(self.exac), self._variant(self.exac, start=self.exac.start + 1)]
+        response = self.request_knox(self.url, method="POST", data={"variants": variants})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(response.data[0]["start"], self.exac.start)
+        self.assertEqual(response.data[0]["frequencies"]["exac"]["ac"], self.exac.ac)
+        self.assertIsNone(response.data[0]["frequencies"]["gnomadexomes"])
+        self.assertEqual(response.data[1]["start"], self.exac.start + 1)
+        self.assertIsNone(response.data[1]["frequencies"]["exac"])
+
+    def test_post_invalid(self):
+        for data in (
+            {"variants": []},
+            {"variants": [{"release": "GRCh37"}]},
+            {"variants": [self._variant(self.exac)] * (FREQUENCIES_MAX_VARIANTS + 1)},
+        ):
+            response = self.request_knox(self.url, method="POST", data=data)
+            self.assertEqual(response.status_code, 400)
+
+    def test_post_anonymous(self):
+        response = self.client.post(
+            self.url, {"variants": [self._variant(self.exac)]}, content_type="application/json"
+        )
+        self.assertIn(response.status_code, (401, 403))
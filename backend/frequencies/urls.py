@@ -0,0 +1,15 @@
+from django.urls import path
+
+from frequencies import views_api
+
+app_name = "frequencies"
+
+api_urlpatterns = [
+    path(
+        route="api/bulk/",
+        view=views_api.FrequencyBulkApiView.as_view(),
+        name="api-bulk",
+    ),
+]
+
+urlpatterns = api_urlpatterns
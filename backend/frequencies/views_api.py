@@ -0,0 +1,42 @@
+from drf_spectacular.utils import extend_schema
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from frequencies.queries import fetch_frequencies, variant_key
+from frequencies.serializers import FrequencyBulkQuerySerializer, FrequencyBulkResultSerializer
+from varfish.api_utils import VarfishApiRenderer, VarfishApiVersioning
+
+
+class FrequencyBulkApiView(APIView):
+    """Retrieve the frequencies of many variants from all frequency databases at once.
+
+    Results are cached per variant, see ``frequencies.queries.fetch_frequencies()``.
+
+    **URL:** ``/frequencies/api/bulk/``
+
+    **Methods:** ``POST``
+
+    **Data:** ``{"variants": [{"release", "chromosome", "start", "reference", "alternative"}, ...]}`` with at most
+    ``FREQUENCIES_MAX_VARIANTS`` variants
+
+    **Returns:** List with one entry per given variant, in the same order, with the variant coordinates and
+    ``frequencies`` mapping each database name to its record or ``null``
+    """
+
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [VarfishApiRenderer]
+    versioning_class = VarfishApiVersioning
+
+    @extend_schema(
+        request=FrequencyBulkQuerySerializer,
+        responses=FrequencyBulkResultSerializer(many=True),
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = FrequencyBulkQuerySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        variants = serializer.validated_data["variants"]
+        frequencies = fetch_frequencies(variants)
+        return Response(
+            [{**variant, "frequencies": frequencies[variant_key(variant)]} for variant in variants]
+        )
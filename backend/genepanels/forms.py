@@ -4,6 +4,7 @@ from django.db import transaction
 import requests
 
 from genepanels.models import GenePanel, GenePanelCategory, GenePanelEntry, GenePanelState
+from varfish.backend_client import get_client
 
 
 class GenePanelCategoryForm(forms.ModelForm):
@@ -51,7 +52,7 @@ class GenePanelForm(forms.ModelForm):
         url_tpl = "{base_url}/genes/lookup?q={gene_list_joined}"
         url = url_tpl.format(base_url=base_url, gene_list_joined=",".join(gene_list))
         try:
-            res = requests.request(method="get", url=url)
+            res = get_client("annonars").get(url)
             if not res.status_code == 200:
                 raise ConnectionError(
                     "ERROR: Server responded with status {} and message {}".format(
@@ -5,7 +5,6 @@ import sys
 
 from django.core.exceptions import ValidationError
 from django.core.management.base import BaseCommand
-from django.db import transaction
 from projectroles.models import Project
 
 from variants.models import Case
@@ -124,6 +123,11 @@ class Command(BaseCommand):
             "--project-uuid", help="UUID of the project to create the query set for all cases."
         )
         parser.add_argument("--all", help="Create query set for all cases.", action="store_true")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Number of projects to process in parallel with --all, defaults to setting.",
+        )
 
     def check_arguments(self, options):
         if bool(options["case_uuid"]) + bool(options["project_uuid"]) + bool(options["all"]) != 1:
@@ -197,7 +201,6 @@ class Command(BaseCommand):
             or count["svs"]["salvable"]["comments"]
         )
 
-    @transaction.atomic
     def handle(self, *args, **options):
         """Generate and fill result sets."""
         self.check_arguments(options)
@@ -205,7 +208,7 @@ class Command(BaseCommand):
 
         if options["async"]:
             count, salvable, duplicates, orphans = create_queryresultset(
-                options["case_uuid"], options["project_uuid"], options["all"]
+                options["case_uuid"], options["project_uuid"], options["all"], options["workers"]
             )
             msg = "Done creating result sets:"
             if self.check_result_sets_created(count):
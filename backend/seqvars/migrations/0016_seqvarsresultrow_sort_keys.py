@@ -0,0 +1,144 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:30
+
+from django.db import migrations, models
+
+#: Fill the sort keys of existing rows from their payload, mirroring
+#: ``SeqvarsResultRow.sort_keys_from_payload()``.
+SQL_BACKFILL_SORT_KEYS = r"""
+UPDATE seqvars_seqvarsresultrow AS row SET
+    gene_symbol = coalesce(
+        payload #>> '{variant_annotation,gene,identity,gene_symbol}', ''
+    ),
+    gnomad_exomes_af = coalesce(
+        (payload #>> '{variant_annotation,variant,frequency,gnomad_exomes,af}')::float, 0.0
+    ),
+    gnomad_genomes_af = coalesce(
+        (payload #>> '{variant_annotation,variant,frequency,gnomad_genomes,af}')::float, 0.0
+    ),
+    inhouse_carriers = (
+        coalesce((payload #>> '{variant_annotation,variant,frequency,inhouse,het}')::int, 0)
+        + coalesce((payload #>> '{variant_annotation,variant,frequency,inhouse,homalt}')::int, 0)
+        + coalesce((payload #>> '{variant_annotation,variant,frequency,inhouse,hemialt}')::int, 0)
+    ),
+    clinvar_significance = coalesce(
+        payload #>> '{variant_annotation,variant,clinvar,effective_germline_significance_description}',
+        ''
+    ),
+    scores = coalesce(
+        (
+            SELECT jsonb_object_agg(entry.key, entry.value)
+            FROM jsonb_each(
+                CASE
+                    WHEN jsonb_typeof(payload #> '{variant_annotation,variant,scores,entries}') = 'object'
+                    THEN payload #> '{variant_annotation,variant,scores,entries}'
+                    ELSE '{}'::jsonb
+                END
+            ) AS entry
+            WHERE jsonb_typeof(entry.value) = 'number'
+            AND entry.key IN (
+                SELECT column_.value ->> 'name'
+                FROM seqvars_seqvarsresultset AS resultset,
+                jsonb_array_elements(
+                    CASE
+                        WHEN jsonb_typeof(resultset.output_header -> 'variant_score_columns') = 'array'
+                        THEN resultset.output_header -> 'variant_score_columns'
+                        ELSE '[]'::jsonb
+                    END
+                ) AS column_
+                WHERE resultset.id = row.resultset_id AND column_.value ->> 'type' = 'number'
+            )
+        ),
+        '{}'::jsonb
+    )
+WHERE payload IS NOT NULL
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("seqvars", "0015_seqvarsinhousedbbuildbackgroundjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="seqvarsresultrow",
+            name="clinvar_significance",
+            field=models.CharField(blank=True, default="", max_length=128),
+        ),
+        migrations.AddField(
+            model_name="seqvarsresultrow",
+            name="gene_symbol",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.AddField(
+            model_name="seqvarsresultrow",
+            name="gnomad_exomes_af",
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name="seqvarsresultrow",
+            name="gnomad_genomes_af",
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name="seqvarsresultrow",
+            name="inhouse_carriers",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="seqvarsresultrow",
+            name="scores",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddIndex(
+            model_name="seqvarsresultrow",
+            index=models.Index(
+                fields=[
+                    "resultset",
+                    "chrom_no",
+                    "pos",
+                    "ref_allele",
+                    "alt_allele",
+                    "id",
+                ],
+                name="seqvars_seq_results_a0899c_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="seqvarsresultrow",
+            index=models.Index(
+                fields=["resultset", "gene_symbol", "id"],
+                name="seqvars_seq_results_59d0b6_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="seqvarsresultrow",
+            index=models.Index(
+                fields=["resultset", "gnomad_exomes_af", "id"],
+                name="seqvars_seq_results_bcba48_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="seqvarsresultrow",
+            index=models.Index(
+                fields=["resultset", "gnomad_genomes_af", "id"],
+                name="seqvars_seq_results_56e7af_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="seqvarsresultrow",
+            index=models.Index(
+                fields=["resultset", "inhouse_carriers", "id"],
+                name="seqvars_seq_results_e0aa69_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="seqvarsresultrow",
+            index=models.Index(
+                fields=["resultset", "clinvar_significance", "id"],
+                name="seqvars_seq_results_9c8283_idx",
+            ),
+        ),
+        migrations.RunSQL(SQL_BACKFILL_SORT_KEYS, migrations.RunSQL.noop),
+    ]
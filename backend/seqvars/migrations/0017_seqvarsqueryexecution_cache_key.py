@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("seqvars", "0016_seqvarsresultrow_sort_keys"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="seqvarsqueryexecution",
+            name="cache_key",
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="seqvarsqueryexecution",
+            name="force_rerun",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="seqvarsqueryexecution",
+            name="reused_from",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="seqvars.seqvarsqueryexecution",
+            ),
+        ),
+    ]
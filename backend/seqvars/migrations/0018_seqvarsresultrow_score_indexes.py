@@ -0,0 +1,77 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:24
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+import django.db.models.fields.json
+import django.db.models.functions.comparison
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("seqvars", "0017_seqvarsqueryexecution_cache_key"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="seqvarsresultrow",
+            index=models.Index(
+                models.F("resultset"),
+                django.db.models.functions.comparison.Coalesce(
+                    django.db.models.functions.comparison.Cast(
+                        django.db.models.fields.json.KeyTextTransform("cadd_phred", "scores"),
+                        models.FloatField(),
+                    ),
+                    models.Value(float("-inf")),
+                ),
+                models.F("id"),
+                name="seqvars_score_cadd_phred",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="seqvarsresultrow",
+            index=models.Index(
+                models.F("resultset"),
+                django.db.models.functions.comparison.Coalesce(
+                    django.db.models.functions.comparison.Cast(
+                        django.db.models.fields.json.KeyTextTransform("revel", "scores"),
+                        models.FloatField(),
+                    ),
+                    models.Value(float("-inf")),
+                ),
+                models.F("id"),
+                name="seqvars_score_revel",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="seqvarsresultrow",
+            index=models.Index(
+                models.F("resultset"),
+                django.db.models.functions.comparison.Coalesce(
+                    django.db.models.functions.comparison.Cast(
+                        django.db.models.fields.json.KeyTextTransform("spliceai", "scores"),
+                        models.FloatField(),
+                    ),
+                    models.Value(float("-inf")),
+                ),
+                models.F("id"),
+                name="seqvars_score_spliceai",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="seqvarsresultrow",
+            index=models.Index(
+                models.F("resultset"),
+                django.db.models.functions.comparison.Coalesce(
+                    django.db.models.functions.comparison.Cast(
+                        django.db.models.fields.json.KeyTextTransform("alphamissense", "scores"),
+                        models.FloatField(),
+                    ),
+                    models.Value(float("-inf")),
+                ),
+                models.F("id"),
+                name="seqvars_score_alphamissense",
+            ),
+        ),
+    ]
@@ -25,6 +25,9 @@ from bgjobs.models import BackgroundJob, JobModelMessageMixin
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Cast, Coalesce
 from django_pydantic_field.v2.fields import PydanticSchemaField as SchemaField
 import model_clone
 from modelcluster.fields import ParentalKey
@@ -1791,6 +1794,16 @@ class SeqvarsQueryExecution(BaseModel):
     #: Effective query settings of execution.
     querysettings = models.ForeignKey(SeqvarsQuerySettings, on_delete=models.CASCADE)
 
+    #: Hash of the worker inputs (query, ingested VCF, data versions, in-house database),
+    #: used for reusing the results of an earlier execution with the same inputs.
+    cache_key = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    #: Whether to run the worker even if there are results to reuse.
+    force_rerun = models.BooleanField(default=False)
+    #: The execution whose results were reused, if any.
+    reused_from = models.ForeignKey(
+        "self", null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
+
     @property
     def case(self) -> typing.Optional[Case]:
         try:
@@ -2417,6 +2430,18 @@ class SeqvarsResultSet(BaseModel):
         ordering = ["-date_created"]
 
 
+#: Names of the numeric scores that have an index for ordering result rows.  Ordering by the other
+#: scores works as well but without an index.
+SEQVARS_INDEXED_SCORES = ("cadd_phred", "revel", "spliceai", "alphamissense")
+
+
+def seqvars_score_sort_expression(name: str) -> Coalesce:
+    """Return the expression for ordering result rows by the score ``name``."""
+    return Coalesce(
+        Cast(KeyTextTransform(name, "scores"), models.FloatField()), Value(float("-inf"))
+    )
+
+
 class SeqvarsResultRow(models.Model):
     """One entry in the result set."""
 
@@ -2451,6 +2476,85 @@ class SeqvarsResultRow(models.Model):
         schema=typing.Optional[SeqvarsOutputRecordPydantic], default=None, null=True
     )
 
+    #: Sort key - gene symbol, empty if intergenic.
+    gene_symbol = models.CharField(max_length=64, default="", blank=True)
+    #: Sort key - gnomAD exomes allele frequency.
+    gnomad_exomes_af = models.FloatField(default=0.0)
+    #: Sort key - gnomAD genomes allele frequency.
+    gnomad_genomes_af = models.FloatField(default=0.0)
+    #: Sort key - number of in-house carriers.
+    inhouse_carriers = models.IntegerField(default=0)
+    #: Sort key - effective ClinVar germline significance, empty if not in ClinVar.
+    clinvar_significance = models.CharField(max_length=128, default="", blank=True)
+    #: Sort keys - values of the numeric score columns from the output header.
+    scores = models.JSONField(default=dict, blank=True)
+
+    #: Names of the sort key fields.
+    SORT_KEY_FIELDS = (
+        "gene_symbol",
+        "gnomad_exomes_af",
+        "gnomad_genomes_af",
+        "inhouse_carriers",
+        "clinvar_significance",
+    )
+
+    @staticmethod
+    def sort_keys_from_payload(
+        payload: typing.Optional[SeqvarsOutputRecordPydantic], score_names: typing.Iterable[str]
+    ) -> dict[str, typing.Any]:
+        """Extract the sort key field values from ``payload``.
+
+        Only the scores with names in ``score_names`` are kept, and only if they are numeric.
+        """
+        result = {
+            "gene_symbol": "",
+            "gnomad_exomes_af": 0.0,
+            "gnomad_genomes_af": 0.0,
+            "inhouse_carriers": 0,
+            "clinvar_significance": "",
+            "scores": {},
+        }
+        annotation = payload.variant_annotation if payload else None
+        if not annotation:
+            return result
+        if annotation.gene and annotation.gene.identity:
+            result["gene_symbol"] = annotation.gene.identity.gene_symbol
+        variant = annotation.variant
+        if variant and variant.frequency:
+            frequency = variant.frequency
+            if frequency.gnomad_exomes:
+                result["gnomad_exomes_af"] = frequency.gnomad_exomes.af
+            if frequency.gnomad_genomes:
+                result["gnomad_genomes_af"] = frequency.gnomad_genomes.af
+            if frequency.inhouse:
+                result["inhouse_carriers"] = (
+                    frequency.inhouse.het + frequency.inhouse.homalt + frequency.inhouse.hemialt
+                )
+        if variant and variant.clinvar:
+            result["clinvar_significance"] = (
+                variant.clinvar.effective_germline_significance_description
+            )
+        if variant and variant.scores:
+            result["scores"] = {
+                name: value
+                for name, value in variant.scores.entries.items()
+                if name in score_names
+                and isinstance(value, (int, float))
+                and not isinstance(value, bool)
+            }
+        return result
+
+    #: Names of the scores with an index for ordering, see ``SEQVARS_INDEXED_SCORES``.
+    INDEXED_SCORES = SEQVARS_INDEXED_SCORES
+
+    @staticmethod
+    def score_sort_expression(name: str) -> Coalesce:
+        """Return the expression for ordering by the score ``name``, missing scores sort first.
+
+        Only the scores in ``INDEXED_SCORES`` are backed by an index.
+        """
+        return seqvars_score_sort_expression(name)
+
     def __str__(self):
         return (
             f"SeqvarsResultRow '{self.sodar_uuid}' '{self.genome_release}-{self.chrom}-"
@@ -2459,6 +2563,22 @@ class SeqvarsResultRow(models.Model):
 
     class Meta:
         ordering = ["chrom_no", "pos", "ref_allele", "alt_allele"]
+        indexes = [
+            models.Index(fields=["resultset", "chrom_no", "pos", "ref_allele", "alt_allele", "id"]),
+            models.Index(fields=["resultset", "gene_symbol", "id"]),
+            models.Index(fields=["resultset", "gnomad_exomes_af", "id"]),
+            models.Index(fields=["resultset", "gnomad_genomes_af", "id"]),
+            models.Index(fields=["resultset", "inhouse_carriers", "id"]),
+            models.Index(fields=["resultset", "clinvar_significance", "id"]),
+        ] + [
+            models.Index(
+                F("resultset"),
+                seqvars_score_sort_expression(name),
+                F("id"),
+                name=f"seqvars_score_{name}",
+            )
+            for name in SEQVARS_INDEXED_SCORES
+        ]
 
 
 class SeqvarsQueryExecutionBackgroundJobManager(models.Manager):
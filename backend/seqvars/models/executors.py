@@ -1,6 +1,9 @@
 import datetime
+import hashlib
+import json
 import os
 import pathlib
+import shutil
 import subprocess
 import sys
 import tempfile
@@ -8,10 +11,9 @@ import traceback
 import typing
 
 from django.conf import settings
-from django.db import transaction
+from django.db import connection, transaction
 from django.utils import timezone
 from google.protobuf.json_format import MessageToJson, Parse
-from projectroles.templatetags.projectroles_common_tags import get_app_setting
 
 from cases_files.models import PedigreeInternalFile
 from cases_import.models.executors import FileSystemOptions, FileSystemWrapper, uuid_frag
@@ -23,6 +25,7 @@ from seqvars.models.base import (
     SeqvarsQueryExecutionBackgroundJob,
     SeqvarsResultRow,
     SeqvarsResultSet,
+    SeqvarsVariantScoreColumnTypeChoice,
 )
 from seqvars.models.protobufs import (
     outputheader_from_protobuf,
@@ -30,7 +33,7 @@ from seqvars.models.protobufs import (
     seqvars_output_record_from_protobuf,
 )
 from seqvars.protos.output_pb2 import OutputHeader, OutputRecord
-from variants.models.case import Case
+from variants.models.case import get_inhouse_db_excluded_project_ids
 
 
 def aws_config_env_internal() -> dict[str, str]:
@@ -96,9 +99,15 @@ class SeqvarsQueryExecutionBackgroundJobExecutor:
             self.execution.start_time = timezone.now()
             self.execution.save()
             try:
-                with tempfile.TemporaryDirectory() as tmpdir:
-                    genome_release = self.execute_query(tmpdir)
-                self.load_results(genome_release=genome_release)
+                self.execution.cache_key = self.compute_cache_key()
+                self.execution.save()
+                source = None if self.execution.force_rerun else self.find_reusable_execution()
+                if source:
+                    self.reuse_results(source)
+                else:
+                    with tempfile.TemporaryDirectory() as tmpdir:
+                        genome_release = self.execute_query(tmpdir)
+                    self.load_results(genome_release=genome_release)
                 self.execution.end_time = timezone.now()
                 self.execution.elapsed_seconds = (
                     self.execution.end_time - self.execution.start_time
@@ -116,6 +125,87 @@ class SeqvarsQueryExecutionBackgroundJobExecutor:
                 self.execution.state = SeqvarsQueryExecution.STATE_FAILED
                 self.execution.save()
 
+    def ingested_vcf_file(self) -> PedigreeInternalFile:
+        """Return the ingested VCF internal file object of the case."""
+        return PedigreeInternalFile.objects.filter(
+            case=self.case,
+            designation="variant_calls/seqvars/ingested-vcf",
+        )[0]
+
+    def inhouse_db_path(self, genome_release: str) -> pathlib.Path:
+        """Return the path to the active in-house database for the given genome release."""
+        worker_rw_path = pathlib.Path(settings.WORKER_DB_PATH)
+        return (
+            worker_rw_path
+            / "worker"
+            / "seqvars"
+            / "inhouse"
+            / genome_release
+            / "active"
+            / "rocksdb"
+        )
+
+    def compute_cache_key(self) -> str:
+        """Compute hash of all inputs to the worker that determine the query results.
+
+        These are the query protobuf, the ingested VCF path and checksum, the worker
+        database version, and the target of the active in-house database.
+        """
+        seqvars_file = self.ingested_vcf_file()
+        case_query = querysettings_to_protobuf(self.execution.querysettings)
+        path_inhouse = self.inhouse_db_path(seqvars_file.genomebuild)
+        inputs = {
+            "query": case_query.SerializeToString(deterministic=True).hex(),
+            "vcf_path": seqvars_file.path,
+            "vcf_checksum": seqvars_file.checksum,
+            "worker_db_path": os.path.realpath(settings.WORKER_DB_PATH),
+            "worker_db_version": settings.WORKER_DB_VERSION,
+            "inhouse_db": os.path.realpath(path_inhouse) if path_inhouse.exists() else None,
+        }
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+    def find_reusable_execution(self) -> typing.Optional[SeqvarsQueryExecution]:
+        """Return the latest successful execution with the same cache key and a result set."""
+        return (
+            SeqvarsQueryExecution.objects.filter(
+                cache_key=self.execution.cache_key,
+                state=SeqvarsQueryExecution.STATE_DONE,
+                seqvarsresultset__isnull=False,
+            )
+            .exclude(pk=self.execution.pk)
+            .order_by("-date_created")
+            .first()
+        )
+
+    @transaction.atomic
+    def reuse_results(self, source: SeqvarsQueryExecution):
+        """Clone the result set of ``source`` for this execution, rows are copied in SQL."""
+        source_resultset = source.seqvarsresultset_set.order_by("-date_created").first()
+        resultset = SeqvarsResultSet.objects.create(
+            queryexecution=self.execution,
+            result_row_count=source_resultset.result_row_count,
+            datasource_infos=source_resultset.datasource_infos,
+            output_header=source_resultset.output_header,
+        )
+        columns = [
+            field.column
+            for field in SeqvarsResultRow._meta.concrete_fields
+            if field.name not in ("id", "sodar_uuid", "resultset")
+        ]
+        columns_sql = ", ".join('"%s"' % column for column in columns)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {SeqvarsResultRow._meta.db_table} (sodar_uuid, resultset_id, {columns_sql})
+                SELECT gen_random_uuid(), %s, {columns_sql}
+                FROM {SeqvarsResultRow._meta.db_table}
+                WHERE resultset_id = %s
+                """,
+                [resultset.pk, source_resultset.pk],
+            )
+        self.execution.reused_from = source
+        self.execution.save()
+
     def execute_query(self, tmpdir: str) -> str:
         """Execute the query, writing it to the internal storage.
 
@@ -123,10 +213,7 @@ class SeqvarsQueryExecutionBackgroundJobExecutor:
         """
         bucket = settings.VARFISH_CASE_IMPORT_INTERNAL_STORAGE.bucket
         # Obtain ingested VCF internal file object and path.
-        seqvars_file = PedigreeInternalFile.objects.filter(
-            case=self.case,
-            designation="variant_calls/seqvars/ingested-vcf",
-        )[0]
+        seqvars_file = self.ingested_vcf_file()
         vcf_path_in = seqvars_file.path
         vcf_genome_release = seqvars_file.genomebuild
         # Build query protobuf and conver to JSON.
@@ -157,16 +244,7 @@ class SeqvarsQueryExecutionBackgroundJobExecutor:
             f"{bucket}/{self.path_internal_results}",
         ]
         # Expand with inhouse-database if existing.
-        worker_rw_path = pathlib.Path(settings.WORKER_DB_PATH)
-        path_inhouse = (
-            worker_rw_path
-            / "worker"
-            / "seqvars"
-            / "inhouse"
-            / vcf_genome_release
-            / "active"
-            / "rocksdb"
-        )
+        path_inhouse = self.inhouse_db_path(vcf_genome_release)
         if path_inhouse.exists():
             args.extend(["--path-inhouse-db", str(path_inhouse)])
         # Setup environment so the worker can access the internal S3 storage.
@@ -199,6 +277,7 @@ class SeqvarsQueryExecutionBackgroundJobExecutor:
             f"s3://{bucket}/{self.path_internal_results}", "rt"
         ) as internalf:
             read_header = False
+            score_names = set()
             for line in internalf:
                 if not read_header:
                     read_header = True
@@ -214,9 +293,15 @@ class SeqvarsQueryExecutionBackgroundJobExecutor:
                         ]
                     )
                     resultset.save()
+                    score_names = {
+                        column.name
+                        for column in resultset.output_header.variant_score_columns or []
+                        if column.type == SeqvarsVariantScoreColumnTypeChoice.NUMBER
+                    }
                 else:
                     # Parse out record from JSONL line and write to database.
                     record_pb = Parse(line, OutputRecord())
+                    payload = seqvars_output_record_from_protobuf(record_pb)
                     SeqvarsResultRow.objects.create(
                         sodar_uuid=record_pb.uuid,
                         resultset=resultset,
@@ -226,7 +311,8 @@ class SeqvarsQueryExecutionBackgroundJobExecutor:
                         pos=record_pb.vcf_variant.pos,
                         ref_allele=record_pb.vcf_variant.ref_allele,
                         alt_allele=record_pb.vcf_variant.alt_allele,
-                        payload=seqvars_output_record_from_protobuf(record_pb),
+                        payload=payload,
+                        **SeqvarsResultRow.sort_keys_from_payload(payload, score_names),
                     )
 
 
@@ -253,19 +339,46 @@ class InhouseDbBuildBackgroundJobExecutor:
         self.run_for_genome_release(genome_release="grch38")
 
     def run_for_genome_release(self, *, genome_release: typing.Literal["grch37", "grch38"]):
-        """Execute building the inhouse database for the given genome release."""
+        """Execute building the inhouse database for the given genome release.
+
+        The ingested VCFs (by path and checksum) that went into a build are recorded in its
+        ``manifest.json``.  The build is skipped if the ingested VCFs did not change since the
+        active build.  If VCFs were only added and ``VARFISH_SEQVARS_INHOUSE_DB_INCREMENTAL`` is
+        set, the new build is created incrementally from a copy of the active build.
+        """
+        inhouse_path = pathlib.Path(settings.WORKER_DB_PATH) / "worker" / "seqvars" / "inhouse"
+        release_path = inhouse_path / genome_release
+        # Collect the ingested VCFs and compare to the manifest of the active build.
+        inputs = self.collect_inputs_for_genome_release(genome_release=genome_release)
+        if not inputs:
+            print(f"No cases to process for {genome_release}, skipping inhouse database build.")
+            return
+        active_path = release_path / "active"
+        previous_inputs = (
+            self.read_manifest(active_path).get("inputs") if active_path.exists() else None
+        )
+        if previous_inputs == inputs:
+            print(f"No changes for {genome_release}, skipping inhouse database build.")
+            return
+        incremental = (
+            settings.VARFISH_SEQVARS_INHOUSE_DB_INCREMENTAL
+            and bool(previous_inputs)
+            and all(inputs.get(path) == checksum for path, checksum in previous_inputs.items())
+        )
         # Ensure the output path is present.
-        worker_rw_path = pathlib.Path(settings.WORKER_DB_PATH)
         name = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        output_path = worker_rw_path / "worker" / "seqvars" / "inhouse" / genome_release / name
+        output_path = release_path / name
         output_path.mkdir(parents=True, exist_ok=True)
+        if incremental:
+            # Aggregate the added VCFs on top of a copy of the previous build.
+            paths = sorted(set(inputs) - set(previous_inputs))
+            shutil.copytree(active_path / "rocksdb", output_path / "rocksdb")
+        else:
+            paths = sorted(inputs)
         # Prepare the file with paths in S3 for the worker.
-        num_cases = self.prepare_paths_for_genome_release(
-            genome_release=genome_release, output_path=output_path
-        )
-        if not num_cases:
-            print(f"No cases to process for {genome_release}, skipping inhouse database build.")
-            return
+        bucket = settings.VARFISH_CASE_IMPORT_INTERNAL_STORAGE.bucket
+        with open(output_path / "paths.txt", "wt") as f:
+            f.write("\n".join(f"{bucket}/{path}" for path in paths) + "\n")
         # Create arguments to use.
         args = [
             "seqvars",
@@ -292,7 +405,20 @@ class InhouseDbBuildBackgroundJobExecutor:
             )
         except Exception:
             print("Error while executing worker / importing results", file=sys.stderr)
+            shutil.rmtree(output_path, ignore_errors=True)
             return
+        with open(output_path / "manifest.json", "wt") as f:
+            json.dump(
+                {
+                    "genome_release": genome_release,
+                    "base": (
+                        os.path.basename(os.path.realpath(active_path)) if incremental else None
+                    ),
+                    "inputs": inputs,
+                },
+                f,
+                indent=2,
+            )
 
         # Atomically update the "active" symlink for the release using Unix `rename(2)`.
         # This will not work on Windows.
@@ -303,29 +429,54 @@ class InhouseDbBuildBackgroundJobExecutor:
         print(f"rename {output_path_with_suffix} {output_path}")
         output_path_with_suffix.rename(output_path.with_name("active"))
 
-    def prepare_paths_for_genome_release(
-        self, *, genome_release: typing.Literal["grch37", "grch38"], output_path: pathlib.Path
-    ) -> int:
-        """Prepare the paths file for the worker.
+        self.prune_builds(release_path)
+
+    def collect_inputs_for_genome_release(
+        self, *, genome_release: typing.Literal["grch37", "grch38"]
+    ) -> dict[str, typing.Optional[str]]:
+        """Return mapping from ingested VCF path to checksum for the inhouse database.
 
-        For this, we loop over all V2 cases that have the matching inhouse release.
+        For this, we consider all V2 cases with the matching genome release outside of
+        projects excluded from the inhouse database.
         """
-        bucket = settings.VARFISH_CASE_IMPORT_INTERNAL_STORAGE.bucket
-        paths = []
-        for case in Case.objects.filter(case_version=2).prefetch_related("project").iterator():
-            if not get_app_setting("variants", "exclude_from_inhouse_db", project=case.project):
-                seqvars_file = PedigreeInternalFile.objects.filter(
-                    case=case,
-                    designation="variant_calls/seqvars/ingested-vcf",
-                )[0]
-                if seqvars_file.genomebuild == genome_release:
-                    paths.append(f"{bucket}/{seqvars_file.path}")
-        paths.sort()
+        seqvars_files = (
+            PedigreeInternalFile.objects.filter(
+                case__case_version=2,
+                designation="variant_calls/seqvars/ingested-vcf",
+            )
+            .exclude(case__project_id__in=get_inhouse_db_excluded_project_ids())
+            .order_by("case_id", "pk")
+            .distinct("case_id")
+            .values_list("genomebuild", "path", "checksum")
+        )
+        return {
+            path: checksum
+            for genomebuild, path, checksum in seqvars_files
+            if genomebuild == genome_release
+        }
 
-        with open(output_path / "paths.txt", "wt") as f:
-            f.write("\n".join(paths) + "\n")
+    @staticmethod
+    def read_manifest(build_path: pathlib.Path) -> dict:
+        """Read ``manifest.json`` of the given build, empty if there is none."""
+        try:
+            with open(build_path / "manifest.json", "rt") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
 
-        return len(paths)
+    @staticmethod
+    def prune_builds(release_path: pathlib.Path):
+        """Remove the oldest builds beyond ``VARFISH_SEQVARS_INHOUSE_DB_KEEP_BUILDS``."""
+        active_name = os.path.basename(os.path.realpath(release_path / "active"))
+        builds = sorted(
+            path
+            for path in release_path.iterdir()
+            if path.is_dir() and not path.is_symlink() and path.name != active_name
+        )
+        keep = max(settings.VARFISH_SEQVARS_INHOUSE_DB_KEEP_BUILDS - 1, 0)
+        for path in builds[: max(len(builds) - keep, 0)]:
+            print(f"Removing old inhouse database build {path}")
+            shutil.rmtree(path, ignore_errors=True)
 
 
 @transaction.atomic
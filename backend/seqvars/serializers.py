@@ -61,6 +61,7 @@ from seqvars.models.base import (
     SeqvarsVariantTypeChoice,
     TermPresencePydantic,
 )
+from varfish.api_utils import RawJsonField
 
 
 class SodarUuidWritableNestedModelSerializer(WritableNestedModelSerializer):
@@ -1246,3 +1247,14 @@ class SeqvarsResultRowSerializer(serializers.ModelSerializer):
             "payload",
         ]
         read_only_fields = fields
+
+
+class SeqvarsResultRowRawSerializer(SeqvarsResultRowSerializer):
+    """Serializer for ``ResultRow`` that passes through the stored ``payload`` JSON.
+
+    The payload has been validated when the row was written.  The queryset must provide
+    the ``payload`` as text in the ``payload_text`` annotation.
+    """
+
+    #: Pass through ``payload`` as ``RawJson``.
+    payload = RawJsonField(source="payload_text")
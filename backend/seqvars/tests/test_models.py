@@ -1,5 +1,6 @@
 """Test models and factories"""
 
+from django.db import connection
 from freezegun import freeze_time
 from parameterized import parameterized
 from snapshottest.unittest import TestCase as TestCaseSnapshot
@@ -8,9 +9,15 @@ from test_plus.test import TestCase
 from cases_analysis.tests.factories import CaseAnalysisSessionFactory
 from seqvars.factory_defaults import create_seqvarspresetsset_short_read_genome
 from seqvars.models.base import (
+    ClinvarAggregateGermlineReviewStatusChoice,
+    ClinvarAnnotationPydantic,
+    GeneIdentityPydantic,
+    GeneRelatedAnnotationPydantic,
+    SeqvarsFrequencyAnnotationPydantic,
     SeqvarsGenotypeChoice,
     SeqvarsGenotypePresetChoice,
     SeqvarsGenotypePresetsPydantic,
+    SeqvarsNuclearFrequencyPydantic,
     SeqvarsPredefinedQuery,
     SeqvarsQuery,
     SeqvarsQueryExecution,
@@ -37,8 +44,11 @@ from seqvars.models.base import (
     SeqvarsRecessiveModeChoice,
     SeqvarsResultRow,
     SeqvarsResultSet,
+    SeqvarsScoreAnnotationsPydantic,
+    SeqvarsVariantRelatedAnnotationPydantic,
 )
 from seqvars.tests.factories import (
+    SeqvarsOutputRecordPydanticFactory,
     SeqvarsPredefinedQueryFactory,
     SeqvarsQueryExecutionFactory,
     SeqvarsQueryFactory,
@@ -774,3 +784,68 @@ class TestSeqvarsResultRow(TestCase):
             ),
             seqvarresultrow.__str__(),
         )
+
+    def test_sort_keys_from_payload(self):
+        payload = SeqvarsOutputRecordPydanticFactory(
+            variant_annotation__gene=GeneRelatedAnnotationPydantic(
+                identity=GeneIdentityPydantic(hgnc_id="HGNC:1100", gene_symbol="BRCA1"),
+                consequences=None,
+                phenotypes=None,
+                constraints=None,
+            ),
+            variant_annotation__variant=SeqvarsVariantRelatedAnnotationPydantic(
+                frequency=SeqvarsFrequencyAnnotationPydantic(
+                    gnomad_exomes=SeqvarsNuclearFrequencyPydantic(af=0.01),
+                    inhouse=SeqvarsNuclearFrequencyPydantic(het=2, homalt=1, hemialt=1),
+                ),
+                clinvar=ClinvarAnnotationPydantic(
+                    vcv_accession="VCV000000001",
+                    germline_significance_description="Pathogenic",
+                    germline_review_status=ClinvarAggregateGermlineReviewStatusChoice.PRACTICE_GUIDELINE,
+                    effective_germline_significance_description="Pathogenic",
+                ),
+                scores=SeqvarsScoreAnnotationsPydantic(
+                    entries={"cadd_phred": 25.5, "spliceai": 0.5, "label": "x"}
+                ),
+            ),
+        )
+        self.assertEqual(
+            SeqvarsResultRow.sort_keys_from_payload(payload, {"cadd_phred", "label"}),
+            {
+                "gene_symbol": "BRCA1",
+                "gnomad_exomes_af": 0.01,
+                "gnomad_genomes_af": 0.0,
+                "inhouse_carriers": 4,
+                "clinvar_significance": "Pathogenic",
+                "scores": {"cadd_phred": 25.5},
+            },
+        )
+
+    def test_sort_keys_from_payload_empty(self):
+        self.assertEqual(
+            SeqvarsResultRow.sort_keys_from_payload(None, set()),
+            {
+                "gene_symbol": "",
+                "gnomad_exomes_af": 0.0,
+                "gnomad_genomes_af": 0.0,
+                "inhouse_carriers": 0,
+                "clinvar_significance": "",
+                "scores": {},
+            },
+        )
+
+    def test_score_sort_index(self):
+        index_name = "seqvars_score_cadd_phred"
+        seqvarresultrow = SeqvarsResultRowFactory(scores={"cadd_phred": 20.0})
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, SeqvarsResultRow._meta.db_table
+            )
+            self.assertIn(index_name, constraints)
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            queryset = (
+                SeqvarsResultRow.objects.filter(resultset=seqvarresultrow.resultset)
+                .annotate(score_value=SeqvarsResultRow.score_sort_expression("cadd_phred"))
+                .order_by("-score_value", "-id")
+            )
+            self.assertIn(index_name, queryset.explain())
@@ -0,0 +1,222 @@
+"""Tests for the ``seqvars.models.executors`` module."""
+
+import itertools
+import json
+import os
+import pathlib
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from django.conf import settings
+from django.test import override_settings
+from test_plus.test import TestCase
+
+from cases_analysis.tests.factories import CaseAnalysisFactory, CaseAnalysisSessionFactory
+from cases_files.tests.factories import PedigreeInternalFileFactory
+from seqvars.models.base import (
+    SeqvarsInhouseDbBuildBackgroundJob,
+    SeqvarsQueryExecution,
+    SeqvarsQueryExecutionBackgroundJob,
+    SeqvarsResultRow,
+)
+from seqvars.models.executors import (
+    InhouseDbBuildBackgroundJobExecutor,
+    SeqvarsQueryExecutionBackgroundJobExecutor,
+)
+from seqvars.tests.factories import (
+    SeqvarsQueryExecutionFactory,
+    SeqvarsQueryFactory,
+    SeqvarsResultRowFactory,
+    SeqvarsResultSetFactory,
+)
+from variants.tests.factories import CaseFactory
+
+
+class TestSeqvarsQueryExecutionBackgroundJobExecutor(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user()
+        self.case = CaseFactory()
+        self.vcf_file = PedigreeInternalFileFactory(
+            case=self.case,
+            pedigree=self.case.pedigree_obj,
+            designation="variant_calls/seqvars/ingested-vcf",
+            genomebuild="grch38",
+        )
+        self.session = CaseAnalysisSessionFactory(
+            caseanalysis=CaseAnalysisFactory(case=self.case), user=self.user
+        )
+        self.query = SeqvarsQueryFactory(session=self.session)
+
+    def _make_executor(self, force_rerun=False):
+        execution = SeqvarsQueryExecutionFactory(
+            query=self.query,
+            querysettings=self.query.settings.make_clone(),
+            state=SeqvarsQueryExecution.STATE_QUEUED,
+            force_rerun=force_rerun,
+        )
+        bgjob = SeqvarsQueryExecutionBackgroundJob.objects.create_full(
+            seqvarsqueryexecution=execution, user=self.user
+        )
+        return SeqvarsQueryExecutionBackgroundJobExecutor(bgjob.pk)
+
+    def _make_done_execution(self):
+        executor = self._make_executor()
+        executor.execution.cache_key = executor.compute_cache_key()
+        executor.execution.state = SeqvarsQueryExecution.STATE_DONE
+        executor.execution.save()
+        resultset = SeqvarsResultSetFactory(queryexecution=executor.execution)
+        SeqvarsResultRowFactory.create_batch(2, resultset=resultset, gene_symbol="BRCA1")
+        return executor.execution
+
+    def test_compute_cache_key(self):
+        cache_key = self._make_executor().compute_cache_key()
+        self.assertEqual(len(cache_key), 64)
+        self.assertEqual(self._make_executor().compute_cache_key(), cache_key)
+
+        self.vcf_file.checksum = "sha256:0000"
+        self.vcf_file.save()
+        self.assertNotEqual(self._make_executor().compute_cache_key(), cache_key)
+
+    @patch("seqvars.models.executors.run_worker")
+    def test_run_reuses_results(self, mock_run_worker):
+        source = self._make_done_execution()
+        executor = self._make_executor()
+
+        executor.run()
+
+        mock_run_worker.assert_not_called()
+        execution = SeqvarsQueryExecution.objects.get(pk=executor.execution.pk)
+        self.assertEqual(execution.state, SeqvarsQueryExecution.STATE_DONE)
+        self.assertEqual(execution.reused_from, source)
+        resultset = execution.seqvarsresultset_set.get()
+        rows = SeqvarsResultRow.objects.filter(resultset=resultset)
+        self.assertEqual(rows.count(), 2)
+        self.assertEqual({row.gene_symbol for row in rows}, {"BRCA1"})
+        self.assertEqual(SeqvarsResultRow.objects.count(), 4)
+
+    @patch("seqvars.models.executors.SeqvarsQueryExecutionBackgroundJobExecutor.load_results")
+    @patch("seqvars.models.executors.SeqvarsQueryExecutionBackgroundJobExecutor.execute_query")
+    def test_run_force_rerun(self, mock_execute_query, mock_load_results):
+        self._make_done_execution()
+        executor = self._make_executor(force_rerun=True)
+
+        executor.run()
+
+        mock_execute_query.assert_called_once()
+        mock_load_results.assert_called_once()
+        execution = SeqvarsQueryExecution.objects.get(pk=executor.execution.pk)
+        self.assertEqual(execution.state, SeqvarsQueryExecution.STATE_DONE)
+        self.assertIsNone(execution.reused_from)
+
+
+def _fake_aggregate(*, args, env):
+    """Fake ``seqvars aggregate`` that records the input paths in the RocksDB directory."""
+    _ = env
+    path_rocksdb = pathlib.Path(args[args.index("--path-out-rocksdb") + 1])
+    path_input = args[args.index("--path-input") + 1][1:]
+    path_rocksdb.mkdir(exist_ok=True)
+    with open(path_input, "rt") as inputf, open(path_rocksdb / "paths.txt", "at") as outputf:
+        outputf.write(inputf.read())
+
+
+@patch("seqvars.models.executors.run_worker", side_effect=_fake_aggregate)
+class TestInhouseDbBuildBackgroundJobExecutor(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_user(settings.PROJECTROLES_ADMIN_OWNER)
+        self.tmpdir = TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.release_path = pathlib.Path(self.tmpdir.name) / "worker/seqvars/inhouse/grch38"
+        self.vcf_files = [self._make_vcf_file() for _ in range(2)]
+        self.build_no = itertools.count()
+
+    def _make_vcf_file(self):
+        case = CaseFactory(case_version=2)
+        return PedigreeInternalFileFactory(
+            case=case,
+            pedigree=case.pedigree_obj,
+            designation="variant_calls/seqvars/ingested-vcf",
+            genomebuild="grch38",
+        )
+
+    def _run(self, keep_builds=3, incremental=True):
+        with override_settings(
+            WORKER_DB_PATH=self.tmpdir.name,
+            VARFISH_SEQVARS_INHOUSE_DB_KEEP_BUILDS=keep_builds,
+            VARFISH_SEQVARS_INHOUSE_DB_INCREMENTAL=incremental,
+        ):
+            bgjob = SeqvarsInhouseDbBuildBackgroundJob.objects.create_full()
+            executor = InhouseDbBuildBackgroundJobExecutor(bgjob.pk)
+            # Use distinct build names, the executor uses a timestamp at second resolution.
+            with patch("seqvars.models.executors.datetime") as mock_datetime:
+                mock_datetime.datetime.now.return_value.strftime.return_value = "build-%d" % next(
+                    self.build_no
+                )
+                executor.run_for_genome_release(genome_release="grch38")
+
+    def _active_paths(self):
+        with open(self.release_path / "active" / "rocksdb" / "paths.txt", "rt") as inputf:
+            return sorted(line.split("/", 1)[1] for line in inputf.read().split())
+
+    def _manifest(self):
+        with open(self.release_path / "active" / "manifest.json", "rt") as inputf:
+            return json.load(inputf)
+
+    def test_run_full(self, mock_run_worker):
+        self._run()
+        mock_run_worker.assert_called_once()
+        self.assertEqual(self._active_paths(), sorted(f.path for f in self.vcf_files))
+        self.assertEqual(self._manifest()["inputs"], {f.path: f.checksum for f in self.vcf_files})
+        self.assertIsNone(self._manifest()["base"])
+
+    def test_run_unchanged(self, mock_run_worker):
+        self._run()
+        self._run()
+        mock_run_worker.assert_called_once()
+        self.assertEqual(os.readlink(self.release_path / "active"), "build-0")
+
+    def test_run_incremental(self, mock_run_worker):
+        self._run()
+        self.vcf_files.append(self._make_vcf_file())
+        self._run()
+        self.assertEqual(mock_run_worker.call_count, 2)
+        self.assertEqual(os.readlink(self.release_path / "active"), "build-1")
+        self.assertEqual(self._active_paths(), sorted(f.path for f in self.vcf_files))
+        self.assertEqual(self._manifest()["base"], "build-0")
+        with open(self.release_path / "build-1" / "paths.txt", "rt") as inputf:
+            self.assertEqual(
+                inputf.read().split(),
+                [
+                    f"{settings.VARFISH_CASE_IMPORT_INTERNAL_STORAGE.bucket}/"
+                    f"{self.vcf_files[-1].path}"
+                ],
+            )
+
+    def test_run_incremental_disabled(self, mock_run_worker):
+        self._run(incremental=False)
+        self.vcf_files.append(self._make_vcf_file())
+        self._run(incremental=False)
+        self.assertEqual(mock_run_worker.call_count, 2)
+        self.assertIsNone(self._manifest()["base"])
+        self.assertEqual(self._active_paths(), sorted(f.path for f in self.vcf_files))
+        with open(self.release_path / "build-1" / "paths.txt", "rt") as inputf:
+            self.assertEqual(len(inputf.read().split()), 3)
+
+    def test_run_changed_checksum(self, mock_run_worker):
+        self._run()
+        self.vcf_files[0].checksum = "sha256:0000"
+        self.vcf_files[0].save()
+        self._run()
+        self.assertEqual(mock_run_worker.call_count, 2)
+        self.assertIsNone(self._manifest()["base"])
+        self.assertEqual(self._active_paths(), sorted(f.path for f in self.vcf_files))
+
+    def test_run_prune(self, mock_run_worker):
+        for _ in range(3):
+            self.vcf_files.append(self._make_vcf_file())
+            self._run(keep_builds=2)
+        self.assertEqual(mock_run_worker.call_count, 3)
+        self.assertEqual(
+            sorted(path.name for path in self.release_path.glob("build-*")), ["build-1", "build-2"]
+        )
@@ -2268,6 +2268,127 @@ class TestResultRowViewSet(ApiViewTestBase):
             },
         )
 
+    def test_list_query_count(self):
+        SeqvarsResultRowFactory.create_batch(5, resultset=self.resultset)
+        with self.login(self.superuser):
+            url = reverse(
+                "seqvars:api-resultrow-list",
+                kwargs={
+                    "resultset": self.resultset.sodar_uuid,
+                },
+            )
+            self.client.get(url)  # warm up session and permission caches
+            with self.assertNumQueries(8):
+                response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 6)
+        self.assertEqual(
+            [row["payload"] for row in response.json()["results"]],
+            [
+                SeqvarsResultRowSerializer(row).data["payload"]
+                for row in self.resultset.seqvarsresultrow_set.all()
+            ],
+        )
+
+    def _list(self, **params):
+        url = reverse(
+            "seqvars:api-resultrow-list",
+            kwargs={
+                "resultset": self.resultset.sodar_uuid,
+            },
+        )
+        with self.login(self.superuser):
+            return self.client.get(url, params)
+
+    def test_list_order_by(self):
+        SeqvarsResultRowFactory(resultset=self.resultset, gene_symbol="BRCA1")
+        SeqvarsResultRowFactory(resultset=self.resultset, gene_symbol="TTN")
+        response = self._list(order_by="gene_symbol", order_dir="desc")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row["sodar_uuid"] for row in response.json()["results"]],
+            [
+                str(row.sodar_uuid)
+                for row in self.resultset.seqvarsresultrow_set.order_by("-gene_symbol", "-id")
+            ],
+        )
+
+    def test_list_order_by_score(self):
+        row_low = SeqvarsResultRowFactory(resultset=self.resultset, scores={"cadd_phred": 1.0})
+        row_high = SeqvarsResultRowFactory(resultset=self.resultset, scores={"cadd_phred": 30.0})
+        response = self._list(order_by="score:cadd_phred", order_dir="desc")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row["sodar_uuid"] for row in response.json()["results"]],
+            [
+                str(row_high.sodar_uuid),
+                str(row_low.sodar_uuid),
+                str(self.seqvarresultrow.sodar_uuid),
+            ],
+        )
+
+    def test_list_filter(self):
+        row = SeqvarsResultRowFactory(resultset=self.resultset, gnomad_exomes_af=0.001)
+        SeqvarsResultRowFactory(resultset=self.resultset, gnomad_exomes_af=0.1)
+        response = self._list(max_gnomad_exomes_af="0.01")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {row["sodar_uuid"] for row in response.json()["results"]},
+            {str(row.sodar_uuid), str(self.seqvarresultrow.sodar_uuid)},
+        )
+
+    def test_list_filter_invalid(self):
+        response = self._list(max_inhouse_carriers="many")
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_keyset_pagination(self):
+        for i in range(6):
+            SeqvarsResultRowFactory(resultset=self.resultset, inhouse_carriers=i % 3)
+        expected = [
+            str(row.sodar_uuid)
+            for row in self.resultset.seqvarsresultrow_set.order_by("inhouse_carriers", "id")
+        ]
+
+        pages = []
+        response = self._list(order_by="inhouse_carriers", page_size=3, cursor="")
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append([row["sodar_uuid"] for row in response.json()["results"]])
+            if not response.json()["next"]:
+                break
+            with self.login(self.superuser):
+                response = self.client.get(response.json()["next"])
+        self.assertEqual(pages, [expected[0:3], expected[3:6], expected[6:7]])
+        self.assertEqual(response.json()["count"], 7)
+
+        with self.login(self.superuser):
+            response = self.client.get(response.json()["previous"])
+        self.assertEqual([row["sodar_uuid"] for row in response.json()["results"]], expected[3:6])
+        with self.login(self.superuser):
+            response = self.client.get(response.json()["previous"])
+        self.assertEqual([row["sodar_uuid"] for row in response.json()["results"]], expected[0:3])
+        self.assertIsNone(response.json()["previous"])
+
+    def test_list_keyset_invalid_cursor(self):
+        response = self._list(cursor="invalid")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("cursor", response.json())
+
+    def test_list_page_number(self):
+        SeqvarsResultRowFactory.create_batch(2, resultset=self.resultset)
+        response = self._list(page=2, page_size=2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 1)
+        self.assertIsNotNone(response.json()["previous"])
+
+    def test_list_page_number_default(self):
+        SeqvarsResultRowFactory.create_batch(2, resultset=self.resultset)
+        response = self._list(page_size=2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 2)
+        self.assertIn("page=2", response.json()["next"])
+        self.assertNotIn("cursor", response.json()["next"])
+
     def test_retrieve_existing(self):
         with self.login(self.superuser):
             response = self.client.get(
@@ -1,17 +1,22 @@
+import base64
+import json
 import sys
 import typing
 
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Q, TextField
+from django.db.models.functions import Cast
 from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import OpenApiParameter, extend_schema
 from projectroles.models import Project
 from projectroles.views_api import SODARAPIProjectPermission
 from rest_framework import serializers, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 from cases_analysis.models import CaseAnalysisSession
 from seqvars.factory_defaults import (
@@ -51,11 +56,16 @@ from seqvars.serializers import (
     SeqvarsQuerySerializer,
     SeqvarsQuerySettingsDetailsSerializer,
     SeqvarsQuerySettingsSerializer,
+    SeqvarsResultRowRawSerializer,
     SeqvarsResultRowSerializer,
     SeqvarsResultSetSerializer,
 )
 from seqvars.tasks import run_seqvarsqueryexecutionbackgroundjob
-from varfish.api_utils import VarfishApiRenderer, VarfishApiVersioning
+from varfish.api_utils import (
+    VarfishApiRawJsonRenderer,
+    VarfishApiRenderer,
+    VarfishApiVersioning,
+)
 from variants.models.case import Case
 
 
@@ -95,7 +105,10 @@ def get_project(kwargs):
         project = queryexecution.query.session.caseanalysis.case.project
     elif "resultset" in kwargs:
         resultset = get_object_or_404(
-            SeqvarsResultSet.objects.all(), sodar_uuid=kwargs["resultset"]
+            SeqvarsResultSet.objects.select_related(
+                "queryexecution__query__session__caseanalysis__case__project"
+            ),
+            sodar_uuid=kwargs["resultset"],
         )
         project = resultset.queryexecution.query.session.caseanalysis.case.project
     elif "case" in kwargs:
@@ -492,20 +505,26 @@ class SeqvarsQueryExecutionViewSet(BaseReadOnlyViewSet):
         "start": SeqvarsQueryExecutionDetailsSerializer,
     }
 
-    @extend_schema(request=serializers.Serializer)
+    @extend_schema(
+        request=serializers.Serializer,
+        parameters=[OpenApiParameter(name="force_rerun", type=bool)],
+    )
     @action(methods=["post"], detail=False)
     def start(self, *args, **kwargs):
         """Create a new query execution for the given query.
 
-        Also, start the execution of a background job.
+        Also, start the execution of a background job.  The results of an earlier
+        execution with the same inputs are reused unless ``force_rerun`` is given.
         """
         # TODO: check permissions on the source's project
         query = SeqvarsQuery.objects.get(sodar_uuid=self.kwargs["query"])
+        force_rerun = self.request.query_params.get("force_rerun", "").lower() in ("1", "true")
         with transaction.atomic():
             queryexecution = SeqvarsQueryExecution.objects.create(
                 state=SeqvarsQueryExecution.STATE_QUEUED,
                 query=query,
                 querysettings=query.settings.make_clone(),
+                force_rerun=force_rerun,
             )
             bgjob = SeqvarsQueryExecutionBackgroundJob.objects.create_full(
                 seqvarsqueryexecution=queryexecution,
@@ -545,10 +564,128 @@ class SeqvarsResultSetViewSet(BaseReadOnlyViewSet):
         return result
 
 
+#: Column filters for result rows, query parameter to lookup and type.
+RESULT_ROW_FILTERS = {
+    "gene_symbol": ("gene_symbol__iexact", str),
+    "clinvar_significance": ("clinvar_significance__iexact", str),
+    "max_gnomad_exomes_af": ("gnomad_exomes_af__lte", float),
+    "max_gnomad_genomes_af": ("gnomad_genomes_af__lte", float),
+    "max_inhouse_carriers": ("inhouse_carriers__lte", int),
+}
+
+
 class SeqvarsResultRowPagination(StandardPagination):
-    """Cursor navigation for result rows."""
+    """Navigation for result rows.
+
+    Uses page number pagination unless a ``cursor`` is passed, use an empty ``cursor`` to get
+    the first page.  Keyset pagination uses an opaque ``cursor`` that holds the ordering values
+    of the first/last row of the current page.  The queryset's ordering must end with a unique
+    field.
+    """
 
     ordering = ["chrom_no", "pos"]
+    #: Query parameter for the keyset cursor.
+    cursor_query_param = "cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.count = queryset.count()
+        self.order_fields = list(queryset.query.order_by)
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        self.reverse = bool(cursor and cursor["r"])
+        if cursor:
+            queryset = queryset.filter(self.keyset_filter(cursor["v"], self.reverse))
+        if self.reverse:
+            queryset = queryset.reverse()
+        rows = list(queryset[: page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if self.reverse:
+            rows.reverse()
+
+        self.next_cursor = self.previous_cursor = None
+        if rows and (has_more if not self.reverse else True):
+            self.next_cursor = self.encode_cursor(rows[-1], reverse=False)
+        if rows and (has_more if self.reverse else cursor is not None):
+            self.previous_cursor = self.encode_cursor(rows[0], reverse=True)
+        return rows
+
+    def keyset_filter(self, values: list, reverse: bool) -> Q:
+        """Return filter for rows after (or before if ``reverse``) the given ordering values."""
+        if len(values) != len(self.order_fields):
+            raise ValidationError({self.cursor_query_param: "Invalid cursor"})
+        result = Q()
+        for i, field in reversed(list(enumerate(self.order_fields))):
+            name = field.lstrip("-")
+            lookup = "gt" if field.startswith("-") == reverse else "lt"
+            after = Q(**{f"{name}__{lookup}": values[i]})
+            result = (
+                after
+                if i == len(self.order_fields) - 1
+                else after | (Q(**{name: values[i]}) & result)
+            )
+        return result
+
+    def encode_cursor(self, row, reverse: bool) -> str:
+        values = [getattr(row, field.lstrip("-")) for field in self.order_fields]
+        payload = json.dumps({"v": values, "r": reverse}).encode()
+        return base64.urlsafe_b64encode(payload).decode()
+
+    def decode_cursor(self, request) -> typing.Optional[dict]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if not isinstance(cursor, dict) or not isinstance(cursor.get("v"), list):
+                raise ValueError("invalid cursor payload")
+            return cursor
+        except (TypeError, ValueError):
+            raise ValidationError({self.cursor_query_param: "Invalid cursor"})
+
+    def _cursor_link(self, cursor: typing.Optional[str]) -> typing.Optional[str]:
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        return self._cursor_link(self.next_cursor)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        return self._cursor_link(self.previous_cursor)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(
+            {
+                "count": self.count,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The keyset pagination cursor value, empty for the first page.",
+                "schema": {"type": "string"},
+            }
+        ]
 
 
 class SeqvarsResultRowViewSet(BaseReadOnlyViewSet):
@@ -560,22 +697,79 @@ class SeqvarsResultRowViewSet(BaseReadOnlyViewSet):
     serializer_class = SeqvarsResultRowSerializer
     #: Override pagination as rows do not have ``date_created``.
     pagination_class = SeqvarsResultRowPagination
+    #: Splice the stored ``payload`` JSON into the response.
+    renderer_classes = [VarfishApiRawJsonRenderer]
 
     @extend_schema(
         parameters=[
             OpenApiParameter(name="order_by", type=str),
             OpenApiParameter(name="order_dir", type=str),
         ]
+        + [
+            OpenApiParameter(name=name, type=type_)
+            for name, (_lookup, type_) in RESULT_ROW_FILTERS.items()
+        ]
     )
     def list(self, *args, **kwargs):
         return super().list(*args, **kwargs)
 
     def get_queryset(self):
-        """Return queryset with all ``ResultRow`` records for the given result set."""
+        """Return queryset with all ``ResultRow`` records for the given result set.
+
+        For listing, the rows are filtered and ordered as given in the query parameters.
+        """
         result = SeqvarsResultRow.objects.all()
         if sys.argv[:2] == ["manage.py", "spectacular"]:
             return result  # short circuit in schema generation
-        result = result.filter(
-            resultset__sodar_uuid=self.kwargs["resultset"],
+        result = (
+            result.filter(
+                resultset__sodar_uuid=self.kwargs["resultset"],
+            )
+            .select_related("resultset")
+            .defer("payload")
+            .annotate(payload_text=Cast("payload", output_field=TextField()))
         )
+        if self.action == "list":
+            result = self.filter_queryset_by_params(result)
+            order_by = self.request.query_params.get("order_by")
+            if order_by and order_by.startswith("score:"):
+                result = result.annotate(
+                    score_value=SeqvarsResultRow.score_sort_expression(order_by[len("score:") :])
+                )
+            result = result.order_by(*self.get_ordering())
         return result
+
+    def filter_queryset_by_params(self, queryset):
+        """Apply the column filters from ``RESULT_ROW_FILTERS``."""
+        for name, (lookup, type_) in RESULT_ROW_FILTERS.items():
+            value = self.request.query_params.get(name)
+            if value is None:
+                continue
+            try:
+                value = type_(value)
+            except ValueError:
+                raise ValidationError({name: f"Invalid value: {value}"})
+            queryset = queryset.filter(**{lookup: value})
+        return queryset
+
+    def get_ordering(self) -> typing.List[str]:
+        """Return ordering from ``order_by`` and ``order_dir``, ending with the unique ``id``.
+
+        ``order_by`` is one of ``SeqvarsResultRow.SORT_KEY_FIELDS`` or ``score:<name>``
+        for a score column; rows are ordered by position otherwise.
+        """
+        order_by = self.request.query_params.get("order_by")
+        if order_by in SeqvarsResultRow.SORT_KEY_FIELDS:
+            fields = [order_by]
+        elif order_by and order_by.startswith("score:"):
+            fields = ["score_value"]
+        else:
+            fields = ["chrom_no", "pos", "ref_allele", "alt_allele"]
+        prefix = "-" if self.request.query_params.get("order_dir") == "desc" else ""
+        return [prefix + field for field in fields + ["id"]]
+
+    def get_serializer_class(self):
+        """Pass through the stored ``payload`` JSON, except in schema generation."""
+        if sys.argv[:2] == ["manage.py", "spectacular"]:
+            return super().get_serializer_class()
+        return SeqvarsResultRowRawSerializer
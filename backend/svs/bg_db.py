@@ -22,7 +22,6 @@ from django.db.models import Q
 from django.utils import timezone
 from intervaltree import Interval, IntervalTree
 from projectroles.plugins import get_backend_api
-from projectroles.templatetags.projectroles_common_tags import get_app_setting
 import psutil
 from sqlalchemy import delete
 
@@ -40,7 +39,11 @@ from varfish import __version__ as varfish_version
 
 #: Logger to use in this module.
 from variants.helpers import get_engine, get_meta
-from variants.models import CHROMOSOME_NAMES, CHROMOSOME_STR_TO_CHROMOSOME_INT, Case
+from variants.models import (
+    CHROMOSOME_NAMES,
+    CHROMOSOME_STR_TO_CHROMOSOME_INT,
+    get_inhouse_db_excluded_case_ids,
+)
 
 LOGGER = logging.getLogger(__name__)
 
@@ -549,10 +552,7 @@ def _build_bg_sv_set_impl(
     )
 
     log("Obtain IDs of cases marked for exclusion")
-    excluded_case_ids = set([])
-    for case in Case.objects.prefetch_related("project").iterator():
-        if get_app_setting("variants", "exclude_from_inhouse_db", project=case.project):
-            excluded_case_ids.add(case.id)
+    excluded_case_ids = get_inhouse_db_excluded_case_ids()
 
     log("Starting actual clustering")
     params = ClusterAlgoParams()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""Add a GiST interval index on ``StructuralVariant`` for region lookups.
+
+The index covers ``(set_id, chromosome, svs.models.sv_interval())`` so that overlap queries (``&&``) can be
+answered without scanning UCSC bins.  The interval is ``[start, end]`` for linear variants and the point ``start``
+for non-linear variants with ``end`` on ``chromosome2``.  ``btree_gist`` is needed for the scalar columns in the
+GiST index.
+"""
+
+from django.conf import settings
+from django.contrib.postgres.fields import IntegerRangeField
+from django.contrib.postgres.indexes import GistIndex
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+from django.db.models.functions import Greatest, Least
+
+end = models.Case(
+    models.When(
+        models.Q(chromosome2__isnull=True) | models.Q(chromosome2=models.F("chromosome")),
+        then=models.F("end"),
+    ),
+    default=models.F("start"),
+)
+
+operations = [
+    BtreeGistExtension(),
+    migrations.AddIndex(
+        model_name="structuralvariant",
+        index=GistIndex(
+            models.F("set_id"),
+            models.F("chromosome"),
+            models.Func(
+                Least("start", end),
+                Greatest("start", end),
+                models.Value("[]"),
+                function="int4range",
+                output_field=IntegerRangeField(),
+            ),
+            name="svs_structuralvariant_interval",
+        ),
+    ),
+]
+
+if not settings.IS_TESTING:
+    operations.append(
+        migrations.RunSQL(
+            r"""
+            CREATE INDEX IF NOT EXISTS svs_structuralvariant_interval ON svs_structuralvariant
+                USING gist (
+                    set_id,
+                    chromosome,
+                    int4range(
+                        LEAST(start, CASE WHEN (chromosome2 IS NULL OR chromosome2 = chromosome)
+                            THEN "end" ELSE start END),
+                        GREATEST(start, CASE WHEN (chromosome2 IS NULL OR chromosome2 = chromosome)
+                            THEN "end" ELSE start END),
+                        '[]'
+                    )
+                );
+            """,
+            r"""
+            DROP INDEX IF EXISTS svs_structuralvariant_interval;
+            """,
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("svs", "0029_alter_buildbackgroundsvsetjob_bg_job_and_more"),
+    ]
+
+    operations = operations
@@ -1,10 +1,10 @@
 """Models and related code for execution SV query jobs."""
 
 from datetime import datetime, timedelta
+import io
 from itertools import islice
 import json
 import os
-import re
 import subprocess
 from tempfile import TemporaryDirectory
 import traceback
@@ -15,10 +15,11 @@ import uuid as uuid_object
 from bgjobs.models import BackgroundJob, JobModelMessageMixin
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models, transaction
+from django.db import connection, models, transaction
 from django.utils import timezone
 from projectroles.models import Project
 from pydantic import BaseModel
+import pysam
 from sqlalchemy import and_
 
 from svs.models.queries import SvQuery, SvQueryResultRow, SvQueryResultSet
@@ -274,6 +275,201 @@ def _write_header(outputf, case, callers):
     )
 
 
+#: Mapping of key from database JSON keys to VCF format keys.
+FORMAT_DB_TO_VCF = {
+    "gq": "GQ",
+    "gt": "GT",
+    "pec": "pec",
+    "pev": "pev",
+    "src": "src",
+    "srv": "srv",
+    "amq": "amq",
+    "cn": "cn",
+    "anc": "anc",
+    "pc": "pc",
+}
+
+#: The ``StructuralVariant`` columns that are needed for writing VCF records.
+SV_VCF_COLUMNS = (
+    "chromosome",
+    "start",
+    "end",
+    "chromosome2",
+    "pe_orientation",
+    "caller",
+    "sv_type",
+    "genotype",
+)
+
+
+def _query_sv_set_callers(case_id, set_id):
+    """Return the sorted list of callers of the SVs in the given set, collected in SQL."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT DISTINCT regexp_split_to_table(caller, '[+;]')
+            FROM svs_structuralvariant
+            WHERE case_id = %s AND set_id = %s
+            """,
+            [case_id, set_id],
+        )
+        return list(sorted(row[0] for row in cursor.fetchall()))
+
+
+def _format_sv_vcf_value(key, value):
+    """Format a genotype value of a ``StructuralVariant`` for the VCF file."""
+    if key == "cn" and value != ".":
+        return str(int(value))
+    else:
+        return str(value)
+
+
+def _sv_vcf_line(
+    samples, chromosome, start, end, chromosome2, pe_orientation, caller, sv_type, genotype
+):
+    """Return VCF line (without trailing newline) for one ``StructuralVariant`` row."""
+    keys_in_row = set()
+    for gt in genotype.values():
+        keys_in_row.update(gt.keys())
+    keys_in_row = ["gt"] + [x for x in sorted(keys_in_row & FORMAT_DB_TO_VCF.keys()) if x != "gt"]
+
+    sv_type = sv_type.split("_")[0]
+    info = f"SVTYPE={sv_type};END={end};callers={caller.replace(';', ',')}"
+    if sv_type == "DEL":
+        info = f"{info};SVLEN={end - start};SVCLAIM=DJ"
+        alt = "<DEL>"
+    elif sv_type == "DUP":
+        info = f"{info};SVLEN={end - start};SVCLAIM=DJ"
+        alt = "<DUP>"
+    elif sv_type == "INV":
+        info = f"{info};SVLEN={end - start};SVCLAIM=J"
+        alt = "<INV>"
+    elif sv_type == "INS":
+        info = f"{info};SVLEN={end - start};SVCLAIM=J"
+        alt = "<INS>"
+    elif sv_type == "CNV":
+        info = f"{info};SVLEN={end - start};SVCLAIM=D"
+        alt = "<CNV>"
+    elif sv_type == "BND":
+        info = f"{info};chr2={chromosome2};SVCLAIM=J"
+        pe_orientation = pe_orientation or "NtoN"
+        if pe_orientation == "3to3":
+            alt = f"[{chromosome2}:{end}[N"
+        elif pe_orientation == "5to5":
+            alt = f"N]{chromosome2}:{end}]"
+        elif pe_orientation == "3to5" or pe_orientation == "NtoN":
+            alt = f"]{chromosome2}:{end}]N"
+        elif pe_orientation == "5to3":
+            alt = f"N[{chromosome2}:{end}["
+        else:
+            raise ValueError(f"Unexpected PE orientation: {pe_orientation}")
+    else:
+        raise ValueError(f"Unexpected SV type: {sv_type}")
+
+    arr = [
+        chromosome,
+        str(start),
+        ".",
+        "N",
+        alt,
+        ".",
+        ".",
+        info,
+        ":".join([FORMAT_DB_TO_VCF[key] for key in keys_in_row]),
+    ] + [
+        ":".join([_format_sv_vcf_value(key, genotype[sample].get(key, ".")) for key in keys_in_row])
+        for sample in samples
+    ]
+    return "\t".join(arr)
+
+
+def write_sv_set_vcf(path, case, set_id, chunk_size=10_000):
+    """Write the SVs of the given set to a bgzip-compressed VCF file at ``path``.
+
+    The records are streamed from the database in a single pass over the required columns only
+    and the callers for the header are collected in SQL.  Returns the number of written records.
+    """
+    samples = [member["patient"] for member in case.pedigree]
+    callers = _query_sv_set_callers(case.id, set_id)
+    rows = (
+        StructuralVariant.objects.filter(case_id=case.id, set_id=set_id)
+        .values_list(*SV_VCF_COLUMNS)
+        .iterator(chunk_size=chunk_size)
+    )
+    record_count = 0
+    with io.TextIOWrapper(pysam.BGZFile(path, "wb"), encoding="utf-8") as outputf:
+        _write_header(outputf, case, callers)
+        for row in rows:
+            outputf.write(_sv_vcf_line(samples, *row))
+            outputf.write("\n")
+            record_count += 1
+    return record_count
+
+
+#: Columns of ``SvQueryResultRow`` that the worker writes to its ``output.tsv`` file.
+SV_QUERY_RESULT_COLUMNS = (
+    "sodar_uuid",
+    "release",
+    "chromosome",
+    "chromosome_no",
+    "bin",
+    "chromosome2",
+    "chromosome_no2",
+    "bin2",
+    "start",
+    "end",
+    "pe_orientation",
+    "sv_type",
+    "sv_sub_type",
+    "payload",
+)
+
+
+class _ResultRowStream:
+    """File-like adapter around the worker's ``output.tsv`` for ``COPY ... FROM STDIN``.
+
+    Appends the owning result set's ID to each line so that rows can be copied verbatim; in
+    particular, the ``payload`` JSON text is passed to PostgreSQL without decoding it.
+    """
+
+    def __init__(self, inputf, svqueryresultset_id):
+        self.lines = ("%s\t%d\n" % (line.rstrip("\n"), svqueryresultset_id) for line in inputf)
+        self.buffer = ""
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            line = next(self.lines, None)
+            if line is None:
+                break
+            self.buffer += line
+        if size < 0:
+            size = len(self.buffer)
+        result, self.buffer = self.buffer[:size], self.buffer[size:]
+        return result
+
+
+def load_sv_query_results(path, svqueryresultset):
+    """Load the worker's ``output.tsv`` at ``path`` into ``svqueryresultset`` with ``COPY``.
+
+    The file is streamed to the database in one pass.  Returns the number of rows loaded.
+    """
+    with open(path, "rt") as inputf:
+        header = inputf.readline().rstrip("\n").split("\t")
+        unknown = set(header) - set(SV_QUERY_RESULT_COLUMNS)
+        if unknown:
+            raise ValueError("Unexpected columns in worker output: %s" % ", ".join(sorted(unknown)))
+        columns = ", ".join('"%s"' % column for column in header + ["svqueryresultset_id"])
+        # CSV format with a quote character that cannot occur in the file so that the JSON
+        # payload is taken literally; keep empty strings as such like the worker wrote them.
+        sql = (
+            "COPY %s (%s) FROM STDIN WITH (FORMAT csv, DELIMITER E'\\t', QUOTE E'\\x01', "
+            "FORCE_NOT_NULL (%s))"
+        ) % (SvQueryResultRow._meta.db_table, columns, columns)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(sql, _ResultRowStream(inputf, svqueryresultset.pk))
+            return cursor.rowcount
+
+
 def run_sv_query_bg_job(pk):  # noqa: C901
     """Execute a query for SVs."""
     filter_job = FilterSvBgJob.objects.select_related("case", "svquery").get(id=pk)
@@ -283,55 +479,10 @@ def run_sv_query_bg_job(pk):  # noqa: C901
     query_model.query_state = SvQuery.QueryState.RUNNING
     query_model.save()
 
-    def _read_records(inputf, svqueryresultset):
-        """Read and yield ``SvQueryResultRow`` objects by reading ``inputf`` for the given ``SvQueryResultSet``."""
-        header = None
-        for line in inputf:
-            arr = line.strip().split("\t")
-            if not header:
-                header = arr
-            else:
-                raw = dict(zip(header, arr))
-                yield SvQueryResultRow(
-                    sodar_uuid=uuid.UUID(raw["sodar_uuid"]),
-                    svqueryresultset=svqueryresultset,
-                    release=raw["release"],
-                    chromosome=raw["chromosome"],
-                    chromosome_no=int(raw["chromosome_no"]),
-                    bin=int(raw["bin"]),
-                    chromosome2=raw["chromosome2"],
-                    chromosome_no2=int(raw["chromosome_no2"]),
-                    bin2=int(raw["bin2"]),
-                    start=int(raw["start"]),
-                    end=int(raw["end"]),
-                    pe_orientation=raw["pe_orientation"],
-                    sv_type=raw["sv_type"],
-                    sv_sub_type=raw["sv_sub_type"],
-                    payload=json.loads(raw["payload"]),
-                )
-
     def _inner(tmpdir):
         """Actual implementation moved into function so we can easily wrap this into try/catch"""
         filter_job.add_log_entry("Starting SV database query")
 
-        # Mapping of key from database JSON keys to VCF format keys.
-        format_db_to_vcf = {
-            "gq": "GQ",
-            "gt": "GT",
-            "pec": "pec",
-            "pev": "pev",
-            "src": "src",
-            "srv": "srv",
-            "amq": "amq",
-            "cn": "cn",
-            "anc": "anc",
-            "pc": "pc",
-        }
-        # Mapping of key from database JSON keys to VCF coercion function.
-        coerce_db_to_vcf = {
-            "cn": lambda x: x if x == "." else int(x),
-        }
-
         # Dump the SVs to a TSV file for processing by the worker
         filter_job.add_log_entry("Dumping SVs and query to temporary files ...")
         with open(os.path.join(tmpdir, "query.json"), "wt") as outputf:
@@ -368,86 +519,12 @@ def run_sv_query_bg_job(pk):  # noqa: C901
                             query_settings["genomic_region"][i] = region[3:]
             print(json.dumps(query_settings), file=outputf)
 
-        samples = [member["patient"] for member in filter_job.case.pedigree]
-
-        with open(os.path.join(tmpdir, "input.vcf"), "wt") as outputf:
-            case_id = filter_job.case.id
-            variant_set_id = filter_job.case.latest_structural_variant_set_id
-            records = StructuralVariant.objects.filter(case_id=case_id, set_id=variant_set_id)
-
-            callers = set()
-            for record in records:
-                for caller in re.split(r"[+;]", record.caller):
-                    callers.add(caller)
-
-            _write_header(outputf, filter_job.case, list(sorted(callers)))
-            for record in records:
-                keys_in_row = set()
-                for gt in record.genotype.values():
-                    keys_in_row.update(gt.keys())
-                keys_in_row = ["gt"] + [
-                    x for x in sorted(keys_in_row & set(format_db_to_vcf.keys())) if x != "gt"
-                ]
-
-                sv_type = record.sv_type.split("_")[0]
-                info = (
-                    f"SVTYPE={sv_type};END={record.end};callers={record.caller.replace(';', ',')}"
-                )
-                if sv_type == "DEL":
-                    info = f"{info};SVLEN={record.end - record.start};SVCLAIM=DJ"
-                    alt = "<DEL>"
-                elif sv_type == "DUP":
-                    info = f"{info};SVLEN={record.end - record.start};SVCLAIM=DJ"
-                    alt = "<DUP>"
-                elif sv_type == "INV":
-                    info = f"{info};SVLEN={record.end - record.start};SVCLAIM=J"
-                    alt = "<INV>"
-                elif sv_type == "INS":
-                    info = f"{info};SVLEN={record.end - record.start};SVCLAIM=J"
-                    alt = "<INS>"
-                elif sv_type == "CNV":
-                    info = f"{info};SVLEN={record.end - record.start};SVCLAIM=D"
-                    alt = "<CNV>"
-                elif sv_type == "BND":
-                    info = f"{info};chr2={record.chromosome2};SVCLAIM=J"
-                    pe_orientation = record.pe_orientation or "NtoN"
-                    if pe_orientation == "3to3":
-                        alt = f"[{record.chromosome2}:{record.end}[N"
-                    elif pe_orientation == "5to5":
-                        alt = f"N]{record.chromosome2}:{record.end}]"
-                    elif pe_orientation == "3to5" or pe_orientation == "NtoN":
-                        alt = f"]{record.chromosome2}:{record.end}]N"
-                    elif pe_orientation == "5to3":
-                        alt = f"N[{record.chromosome2}:{record.end}["
-                    else:
-                        raise ValueError(f"Unexpected PE orientation: {pe_orientation}")
-                else:
-                    raise ValueError(f"Unexpected SV type: {sv_type}")
-
-                arr = [
-                    record.chromosome,
-                    record.start,
-                    ".",
-                    "N",
-                    alt,
-                    ".",
-                    ".",
-                    info,
-                    ":".join([format_db_to_vcf[key] for key in keys_in_row]),
-                ] + [
-                    ":".join(
-                        [
-                            str(
-                                coerce_db_to_vcf.get(key, lambda x: x)(
-                                    record.genotype[sample].get(key, ".")
-                                )
-                            )
-                            for key in keys_in_row
-                        ]
-                    )
-                    for sample in samples
-                ]
-                print("\t".join(map(str, arr)), file=outputf)
+        record_count = write_sv_set_vcf(
+            os.path.join(tmpdir, "input.vcf.gz"),
+            filter_job.case,
+            filter_job.case.latest_structural_variant_set_id,
+        )
+        filter_job.add_log_entry("Wrote {} SVs to the worker input file".format(record_count))
         filter_job.add_log_entry("... done dumping the SVs and query")
 
         #: Actually run the worker
@@ -463,7 +540,7 @@ def run_sv_query_bg_job(pk):  # noqa: C901
             "--path-query-json",
             os.path.join(tmpdir, "query.json"),
             "--path-input",
-            os.path.join(tmpdir, "input.vcf"),
+            os.path.join(tmpdir, "input.vcf.gz"),
             "--path-output",
             os.path.join(tmpdir, "output.tsv"),
             "--genome-release",
@@ -488,10 +565,6 @@ def run_sv_query_bg_job(pk):  # noqa: C901
             return
 
         subprocess.check_call(cmd)
-        worker_results = os.path.join(tmpdir, "output.tsv")
-        with open(worker_results, "rt") as inputf:
-            result_row_count = sum(1 for _line in inputf) - 1
-            result_row_count = max(0, result_row_count)
         end_time = timezone.now()
         filter_job.add_log_entry("... done running the worker")
 
@@ -501,14 +574,18 @@ def run_sv_query_bg_job(pk):  # noqa: C901
             svqueryresultset = SvQueryResultSet.objects.create(
                 case=query_model.case,
                 svquery=query_model,
-                result_row_count=result_row_count,
+                result_row_count=0,
                 start_time=start_time,
                 end_time=end_time,
                 elapsed_seconds=(end_time - start_time).total_seconds(),
             )
-            with open(worker_results, "rt") as inputf:
-                for batch in batched(_read_records(inputf, svqueryresultset), n=1000):
-                    SvQueryResultRow.objects.bulk_create(batch)
+            svqueryresultset.result_row_count = load_sv_query_results(
+                os.path.join(tmpdir, "output.tsv"), svqueryresultset
+            )
+            svqueryresultset.save(update_fields=["result_row_count"])
+        filter_job.add_log_entry(
+            "Imported {} result rows".format(svqueryresultset.result_row_count)
+        )
         filter_job.add_log_entry("... done creating result set and importing worker results")
 
     try:
@@ -3,8 +3,10 @@
 import uuid as uuid_object
 
 from django.conf import settings
-from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.fields import ArrayField, IntegerRangeField
+from django.contrib.postgres.indexes import GistIndex
 from django.db import models
+from django.db.models.functions import Greatest, Least
 from django.db.models.signals import pre_delete
 from django.dispatch import receiver
 from postgres_copy import CopyManager
@@ -124,6 +126,29 @@ class StructuralVariantSet(models.Model):
     )
 
 
+def sv_interval():
+    """Return the expression for the closed interval covered by a ``StructuralVariant`` on ``chromosome``.
+
+    This is ``[start, end]`` for linear variants (bounds ordered), and the point ``start`` for non-linear variants
+    whose ``end`` lies on another chromosome.  Queries must use this very expression so the planner can pick the
+    ``svs_structuralvariant_interval`` index.
+    """
+    end = models.Case(
+        models.When(
+            models.Q(chromosome2__isnull=True) | models.Q(chromosome2=models.F("chromosome")),
+            then=models.F("end"),
+        ),
+        default=models.F("start"),
+    )
+    return models.Func(
+        Least("start", end),
+        Greatest("start", end),
+        models.Value("[]"),
+        function="int4range",
+        output_field=IntegerRangeField(),
+    )
+
+
 class StructuralVariant(models.Model):
     """Represent a structural variant call with its genomic coordinates, genotype calls in a ``Case``, and other
     properties.
@@ -219,6 +244,12 @@ class StructuralVariant(models.Model):
             models.Index(
                 fields=["case_id", "release", "chromosome", "bin", "sv_type", "sv_sub_type"]
             ),
+            GistIndex(
+                models.F("set_id"),
+                models.F("chromosome"),
+                sv_interval(),
+                name="svs_structuralvariant_interval",
+            ),
         )
         managed = settings.IS_TESTING
         db_table = "svs_structuralvariant"
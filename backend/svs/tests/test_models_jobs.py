@@ -1,10 +1,28 @@
 """Tests for the ``svs.models.jobs`` module."""
 
+import gzip
+import json
+import os
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
 from bgjobs.models import BackgroundJob
 
-from svs.models.jobs import FilterSvBgJob, create_sv_query_bg_job
-from svs.models.queries import SvQuery
-from svs.tests.factories import BackgroundSvSetFactory, StructuralVariantSetFactory, SvQueryFactory
+from svs.models.jobs import (
+    SV_QUERY_RESULT_COLUMNS,
+    FilterSvBgJob,
+    create_sv_query_bg_job,
+    load_sv_query_results,
+    write_sv_set_vcf,
+)
+from svs.models.queries import SvQuery, SvQueryResultRow
+from svs.tests.factories import (
+    BackgroundSvSetFactory,
+    StructuralVariantFactory,
+    StructuralVariantSetFactory,
+    SvQueryFactory,
+    SvQueryResultSetFactory,
+)
 from svs.tests.helpers import StructuralVariantQueryTestBase
 
 
@@ -37,3 +55,103 @@ class TestCreateSvQueryBgJob(StructuralVariantQueryTestBase):
         self.assertEquals(FilterSvBgJob.objects.count(), 1)
         self.assertEquals(BackgroundJob.objects.count(), 1)
         self.assertEqual(SvQuery.objects.count(), 1)
+
+
+class TestWriteSvSetVcf(StructuralVariantQueryTestBase):
+    """Test the ``svs.models.jobs.write_sv_set_vcf`` function"""
+
+    def setUp(self):
+        super().setUp()
+        self.variant_set = StructuralVariantSetFactory(case__structure="trio")
+        self.case = self.variant_set.case
+        self.svs = [
+            StructuralVariantFactory(variant_set=self.variant_set, caller="DELLYv4001"),
+            StructuralVariantFactory(variant_set=self.variant_set, caller="DELLYv4001;MANTAv1.6"),
+            StructuralVariantFactory(
+                variant_set=self.variant_set, sv_type="BND", sv_sub_type="BND"
+            ),
+        ]
+
+    @patch("subprocess.check_output", return_value=b"varfish-server-worker 0.0.0\n")
+    def test_run(self, _mock_check_output):
+        with TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "input.vcf.gz")
+            record_count = write_sv_set_vcf(path, self.case, self.variant_set.id)
+            with gzip.open(path, "rt") as inputf:
+                lines = inputf.read().splitlines()
+
+        self.assertEqual(record_count, 3)
+        self.assertIn(
+            '##x-varfish-version=<ID=orig-caller-DELLY,Name="DELLY",Version="4001">', lines
+        )
+        self.assertIn(
+            '##x-varfish-version=<ID=orig-caller-MANTA,Name="MANTA",Version="1.6">', lines
+        )
+        header = [line for line in lines if line.startswith("#CHROM")][0].split("\t")
+        self.assertEqual(header[9:], [member["patient"] for member in self.case.pedigree])
+        records = [line.split("\t") for line in lines if not line.startswith("#")]
+        self.assertEqual(len(records), 3)
+        by_pos = {int(record[1]): record for record in records}
+        record = by_pos[self.svs[0].start]
+        self.assertEqual(record[4], "<DEL>")
+        self.assertEqual(
+            record[7],
+            "SVTYPE=DEL;END=%d;callers=DELLYv4001;SVLEN=100;SVCLAIM=DJ" % self.svs[0].end,
+        )
+        self.assertEqual(record[8], "GT:amq:anc:cn:GQ:pec:pev:src:srv")
+        record = by_pos[self.svs[2].start]
+        self.assertEqual(record[4], "]%s:%d]N" % (self.svs[2].chromosome2, self.svs[2].end))
+
+
+class TestLoadSvQueryResults(StructuralVariantQueryTestBase):
+    """Test the ``svs.models.jobs.load_sv_query_results`` function"""
+
+    def setUp(self):
+        super().setUp()
+        self.resultset = SvQueryResultSetFactory()
+        self.payload = {"callers": ["DELLY"], "info": {"note": 'quoted "text"\twith\\escapes'}}
+
+    def _write_output(self, path, rows):
+        with open(path, "wt") as outputf:
+            print("\t".join(SV_QUERY_RESULT_COLUMNS), file=outputf)
+            for i, row in enumerate(rows):
+                values = {
+                    "sodar_uuid": "b0a6a3e8-6a2e-4e1b-8f0e-00000000000%d" % i,
+                    "release": "GRCh37",
+                    "chromosome": "1",
+                    "chromosome_no": "1",
+                    "bin": "585",
+                    "chromosome2": "1",
+                    "chromosome_no2": "1",
+                    "bin2": "585",
+                    "start": str(1000 * (i + 1)),
+                    "end": str(1000 * (i + 1) + 100),
+                    "pe_orientation": "",
+                    "sv_type": "DEL",
+                    "sv_sub_type": "DEL",
+                    "payload": json.dumps(self.payload),
+                    **row,
+                }
+                print("\t".join(values[column] for column in SV_QUERY_RESULT_COLUMNS), file=outputf)
+
+    def test_run(self):
+        with TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "output.tsv")
+            self._write_output(path, [{}, {"sv_type": "DUP", "sv_sub_type": "DUP"}])
+            row_count = load_sv_query_results(path, self.resultset)
+
+        self.assertEqual(row_count, 2)
+        rows = list(SvQueryResultRow.objects.filter(svqueryresultset=self.resultset))
+        self.assertEqual([row.sv_type for row in rows], ["DEL", "DUP"])
+        self.assertEqual(rows[0].payload, self.payload)
+        self.assertEqual(rows[0].pe_orientation, "")
+        self.assertEqual(rows[1].end, 2100)
+
+    def test_run_empty(self):
+        with TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "output.tsv")
+            self._write_output(path, [])
+            row_count = load_sv_query_results(path, self.resultset)
+
+        self.assertEqual(row_count, 0)
+        self.assertEqual(SvQueryResultRow.objects.count(), 0)
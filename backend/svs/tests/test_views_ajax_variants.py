@@ -0,0 +1,72 @@
+from unittest.mock import patch
+
+from django.urls import reverse
+
+from svs.tests.factories import StructuralVariantFactory
+from svs.views.ajax.variants import SvFetchVariantsAjaxView
+from variants.tests.factories import CaseWithVariantSetFactory
+from variants.tests.helpers import ApiViewTestBase
+
+
+class TestSvFetchVariantsAjaxView(ApiViewTestBase):
+    """Tests for the region lookup of structural variants"""
+
+    def setUp(self):
+        super().setUp()
+        self.case, _, self.variant_set = CaseWithVariantSetFactory.get(
+            "structural", project=self.project
+        )
+        self.svs = [
+            StructuralVariantFactory(
+                variant_set=self.variant_set, chromosome="1", start=start, end=end
+            )
+            for start, end in ((50_000, 60_000), (1_000, 200_000), (1_000, 2_000), (99_000, 99_000))
+        ]
+        # Breakend whose end lies on another chromosome, before its start.
+        StructuralVariantFactory(
+            variant_set=self.variant_set,
+            chromosome="1",
+            chromosome2="2",
+            start=150_000,
+            end=10,
+            sv_type="BND",
+            sv_sub_type="BND",
+        )
+        self.url = reverse("svs:ajax-variants-fetch", kwargs={"case": self.case.sodar_uuid})
+
+    def test_get_overlapping(self):
+        response = self.request_knox(self.url + "?chromosome=chr1&start=55000&end=99000")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(record["start"], record["end"]) for record in response.data],
+            [(999, 200_000), (49_999, 60_000), (98_999, 99_000)],
+        )
+        self.assertEqual(response.data[1]["name"], "DEL @1:50,000-60,000")
+        self.assertEqual(set(response.data[0]), {*SvFetchVariantsAjaxView.RESULT_FIELDS, "name"})
+
+    def test_get_breakend(self):
+        response = self.request_knox(self.url + "?chromosome=1&start=149000&end=151000")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [record["name"] for record in response.data],
+            ["DEL @1:1,000-200,000", "BND 1:150,000 -> 2:10"],
+        )
+        # The end position on the other chromosome does not span an interval on this one.
+        response = self.request_knox(self.url + "?chromosome=1&start=100&end=500")
+        self.assertEqual(response.data, [])
+
+    @patch("svs.views.ajax.variants.SvFetchVariantsAjaxView.MAX_RECORDS", 2)
+    def test_get_columnar_truncated(self):
+        response = self.request_knox(self.url + "?chromosome=1&start=1&end=100000&layout=columnar")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["start"], [999, 999])
+        self.assertEqual(response.data["end"], [2_000, 200_000])
+        self.assertEqual(response.data["sv_type"], ["DEL", "DEL"])
+        self.assertEqual(len(response.data["genotype"]), 2)
+        self.assertTrue(response.data["truncated"])
+
+    def test_get_columnar_complete(self):
+        response = self.request_knox(self.url + "?chromosome=1&start=1&end=1500&layout=columnar")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["start"], [999, 999])
+        self.assertFalse(response.data["truncated"])
@@ -1,9 +1,9 @@
-import binning
+from django.db.backends.postgresql.psycopg_any import NumericRange
 from projectroles.views_api import SODARAPIProjectPermission
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from svs.models import StructuralVariant
+from svs.models import StructuralVariant, sv_interval
 from varfish.api_utils import VarfishApiRenderer, VarfishApiVersioning
 from variants.models import Case
 from variants.queries import normalize_chrom
@@ -23,9 +23,19 @@ class SvFetchVariantsAjaxViewPermission(SODARAPIProjectPermission):
 class SvFetchVariantsAjaxView(APIView):
     """AJAX endpoint for retrieving structural variants from the given case.
 
+    Variants overlapping the closed interval ``[start, end]`` on ``chromosome`` are selected in the database using
+    the ``svs_structuralvariant_interval`` GiST index and returned ordered by position.
+
     **URL:** ``/ajax/fetch-variants/{case.sodar_uuid}/``
 
     **Methods:** ``GET``
+
+    **Parameters:**
+
+    - ``chromosome`` -- chromosome name, normalized for the case's genome build
+    - ``start``, ``end`` -- 1-based region bounds
+    - ``layout`` -- ``rows`` (default) for a list of records, or ``columnar`` for one list per field
+      together with a ``truncated`` flag that is set when more than ``MAX_RECORDS`` variants overlap
     """
 
     lookup_field = "sodar_uuid"
@@ -35,21 +45,29 @@ class SvFetchVariantsAjaxView(APIView):
     versioning_class = VarfishApiVersioning
     permission_classes = [SvFetchVariantsAjaxViewPermission]
 
-    #: Will at most query this number of records from database.  Fewer may be returned to the client as we fetch
-    #: by UCSC bin and then post-filter for overlap.
+    #: Will at most return this number of overlapping records, the first ones by position.
     MAX_RECORDS = 100
 
-    def get(self, request, **kwargs):
-        def overlaps(s1, e1, s2, e2):
-            return s1 < e2 and s2 < e1
+    #: The fields loaded from the database.
+    FIELDS = ("chromosome", "chromosome2", "start", "end", "sv_type", "sv_sub_type", "genotype")
+
+    #: The fields returned to the client, in addition to ``name``.
+    RESULT_FIELDS = ("chromosome", "start", "end", "sv_type", "sv_sub_type", "genotype")
 
+    def get(self, request, **kwargs):
         def describe(record):
-            if record.sv_type == "INS":
-                return f"INS @{record.chromosome}:{record.start:,}"
-            elif record.sv_type == "BND":
-                return f"BND {record.chromosome}:{record.start:,} -> {record.chromosome2}:{record.end:,}"
+            if record["sv_type"] == "INS":
+                return f"INS @{record['chromosome']}:{record['start']:,}"
+            elif record["sv_type"] == "BND":
+                return (
+                    f"BND {record['chromosome']}:{record['start']:,} -> "
+                    f"{record['chromosome2']}:{record['end']:,}"
+                )
             else:
-                return f"{record.sv_type} @{record.chromosome}:{record.start:,}-{record.end:,}"
+                return (
+                    f"{record['sv_type']} @{record['chromosome']}:"
+                    f"{record['start']:,}-{record['end']:,}"
+                )
 
         case = Case.objects.get(sodar_uuid=self.kwargs["case"])
         structuralvariantset = case.latest_structural_variant_set
@@ -60,25 +78,35 @@ class SvFetchVariantsAjaxView(APIView):
         end = int(float(request.GET.get("end", start)))
         if start > end:
             end = start
-        bins = binning.overlapping_bins(start, end)
-        qs = StructuralVariant.objects.filter(
-            case_id=case.id, set_id=structuralvariantset.id, chromosome=chromosome, bin__in=bins
+        qs = (
+            StructuralVariant.objects.filter(
+                case_id=case.id, set_id=structuralvariantset.id, chromosome=chromosome
+            )
+            .alias(interval=sv_interval())
+            .filter(interval__overlap=NumericRange(start, end, "[]"))
+            .order_by("start", "end", "id")
+            .values(*self.FIELDS)
         )
+        truncated = False
         if self.MAX_RECORDS:
-            qs = qs[: self.MAX_RECORDS]
-        result = [
-            {
-                "chromosome": record.chromosome,
-                "start": record.start - 1,
-                "end": record.end,
-                "sv_type": record.sv_type,
-                "sv_sub_type": record.sv_sub_type,
-                "genotype": record.genotype,
-                "name": describe(record),
+            records = list(qs[: self.MAX_RECORDS + 1])
+            truncated = len(records) > self.MAX_RECORDS
+            records = records[: self.MAX_RECORDS]
+        else:
+            records = list(qs)
+        for record in records:
+            record["name"] = describe(record)
+            record["start"] -= 1
+
+        if request.GET.get("layout", "rows") == "columnar":
+            result = {
+                key: [record[key] for record in records] for key in (*self.RESULT_FIELDS, "name")
             }
-            for record in qs
-            if overlaps(record.start, record.end, start, end)
-        ]
+            result["truncated"] = truncated
+        else:
+            result = [
+                {key: record[key] for key in (*self.RESULT_FIELDS, "name")} for record in records
+            ]
         return Response(result)
 
     def get_permission_required(self):
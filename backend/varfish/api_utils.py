@@ -1,6 +1,9 @@
 """Constants and utility code for the VarFish REST API."""
 
+import uuid
+
 from projectroles.views_api import SODARAPIRenderer, SODARAPIVersioning
+from rest_framework import serializers
 from rest_framework.pagination import PageNumberPagination
 
 
@@ -8,6 +11,54 @@ class VarfishApiRenderer(SODARAPIRenderer):
     pass
 
 
+class RawJson:
+    """Wrapper for already serialized JSON text, e.g., a ``jsonb`` column read as ``text``.
+
+    ``VarfishApiRawJsonRenderer`` splices the text into the response verbatim.
+    """
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class RawJsonField(serializers.Field):
+    """Read-only serializer field that wraps JSON text into ``RawJson``."""
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return RawJson(value)
+
+
+class VarfishApiRawJsonRenderer(VarfishApiRenderer):
+    """Renderer that writes ``RawJson`` values without decoding and re-encoding them."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        raw_texts = []
+        placeholder = "raw-json-%s" % uuid.uuid4().hex
+
+        class Encoder(self.encoder_class):
+            def default(self, obj):
+                if isinstance(obj, RawJson):
+                    raw_texts.append(obj.text)
+                    return placeholder
+                return super().default(obj)
+
+        self.encoder_class = Encoder
+        ret = super().render(data, accepted_media_type, renderer_context)
+        if not raw_texts:
+            return ret
+        chunks = ret.split(b'"%s"' % placeholder.encode())
+        result = [chunks[0]]
+        for raw_text, chunk in zip(raw_texts, chunks[1:]):
+            result += [raw_text.encode(), chunk]
+        return b"".join(result)
+
+
 class VarfishApiVersioning(SODARAPIVersioning):
     pass
 
@@ -0,0 +1,313 @@
+"""Shared HTTP client for the annotation and prioritization backends.
+
+Each backend service (annonars, mehari, the CADD/UMD/MutationTaster scorers, Exomiser, CADA, PEDIA,
+and the external submission sites) gets one ``BackendClient`` per process, obtained with
+``get_client()``.  The client keeps a pooled keep-alive ``requests.Session`` and applies timeouts,
+retries with exponential backoff, and a circuit breaker.  Per-service metrics (request and error
+counts, latency histogram) are available from ``get_metrics()``.  Each process also logs them as
+one JSON document every ``BACKEND_CLIENT_METRICS_LOG_INTERVAL`` seconds.
+
+Errors are raised as ``requests.ConnectionError`` (``BackendUnavailable``), so callers can keep
+handling connection problems the way they did with plain ``requests`` calls.
+"""
+
+import bisect
+from collections import Counter
+from http.cookiejar import DefaultCookiePolicy
+import json
+import logging
+import os
+import threading
+import time
+import typing
+
+from django.conf import settings
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+#: Default read timeouts (in seconds) of services that deviate from ``BACKEND_CLIENT_TIMEOUT``,
+#: the external submission sites receive whole VCF files and the phenotype prioritization
+#: services score whole gene lists.
+DEFAULT_SERVICE_TIMEOUTS = {
+    "cada": 300.0,
+    "cadd_submission": 300.0,
+    "distiller": 300.0,
+    "exomiser": 300.0,
+    "pedia": 300.0,
+    "spanr": 300.0,
+}
+
+#: HTTP methods that are retried by default.
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+#: Response status codes that count as backend failures and are retried.
+RETRY_STATUS_CODES = (502, 503, 504)
+
+#: Upper bounds (in seconds) of the latency histogram buckets.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+
+
+class BackendUnavailable(requests.ConnectionError):
+    """Raised when a backend could not be reached, timed out, or its circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Circuit breaker that opens after ``threshold`` consecutive failures.
+
+    While open, calls are rejected until ``reset_timeout`` seconds have passed.  Then a single
+    probe call is let through while the others are still rejected, a success of the probe closes
+    the breaker and a failure opens it again.  A ``threshold`` of ``0`` disables the breaker.
+    """
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: typing.Optional[float] = None
+        #: Whether the probe call of the half-open breaker is running.
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            elif time.monotonic() - self.opened_at < self.reset_timeout:
+                return "open"
+            else:
+                return "half-open"
+
+    def allow(self) -> bool:
+        """Return whether a call may be made, the first call in the half-open state is the probe."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            elif time.monotonic() - self.opened_at < self.reset_timeout or self.probing:
+                return False
+            else:
+                self.probing = True
+                return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.probing = False
+            if self.threshold and self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """Let another probe through after a call that was neither a success nor a failure."""
+        with self._lock:
+            self.probing = False
+
+
+class BackendMetrics:
+    """Request and error counts and latency histogram of one backend service."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = Counter()
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, duration: float, error: typing.Optional[str] = None):
+        """Record one request of ``duration`` seconds, ``error`` names the kind of failure."""
+        with self._lock:
+            self.requests += 1
+            self.latency_sum += duration
+            self.latency_buckets[bisect.bisect_left(LATENCY_BUCKETS, duration)] += 1
+            if error:
+                self.errors[error] += 1
+
+    def reject(self):
+        """Record a request rejected by the circuit breaker."""
+        with self._lock:
+            self.errors["circuit_open"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": dict(self.errors),
+                "latency_sum": self.latency_sum,
+                "latency_buckets": {
+                    str(bound): count for bound, count in zip(LATENCY_BUCKETS, self.latency_buckets)
+                },
+            }
+
+
+class BackendClient:
+    """Pooled HTTP client for one backend service.
+
+    ``request()`` takes the arguments of ``requests.Session.request()`` and returns the response.
+    Connection errors, timeouts, and the statuses in ``RETRY_STATUS_CODES`` are retried with
+    exponential backoff if the request is idempotent, by default for ``IDEMPOTENT_METHODS`` only.
+    After the last attempt, the last response is returned or ``BackendUnavailable`` is raised.
+
+    The session does not keep cookies so that no state leaks between users of the shared client,
+    pass ``cookies`` explicitly where needed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        timeout: float,
+        connect_timeout: float,
+        retries: int,
+        backoff: float,
+        breaker_threshold: int,
+        breaker_reset: float,
+        pool_size: int,
+    ):
+        self.name = name
+        self.timeout = (connect_timeout, timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self.metrics = BackendMetrics()
+        self.session = requests.Session()
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(
+        self, method: str, url: str, *, idempotent: typing.Optional[bool] = None, **kwargs
+    ) -> requests.Response:
+        _log_metrics_periodically()
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        kwargs.setdefault("timeout", self.timeout)
+        attempts = 1 + (self.retries if idempotent else 0)
+        for attempt in range(attempts):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            if not self.breaker.allow():
+                self.metrics.reject()
+                raise BackendUnavailable("ERROR: Backend {} is unavailable.".format(self.name))
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = "timeout" if isinstance(e, requests.Timeout) else "connection"
+                self.metrics.observe(time.perf_counter() - started, error)
+                self.breaker.record_failure()
+                logger.warning("%s %s to %s failed: %s", method, url, self.name, e)
+                if attempt + 1 == attempts:
+                    raise BackendUnavailable(
+                        "ERROR: Backend {} not responding.".format(self.name)
+                    ) from e
+                continue
+            except Exception:
+                self.breaker.release()
+                raise
+            if response.status_code >= 500:
+                self.metrics.observe(
+                    time.perf_counter() - started, "status_%d" % response.status_code
+                )
+                self.breaker.record_failure()
+                if response.status_code in RETRY_STATUS_CODES and attempt + 1 < attempts:
+                    continue
+            else:
+                self.metrics.observe(time.perf_counter() - started)
+                self.breaker.record_success()
+            return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, data=None, json=None, **kwargs) -> requests.Response:
+        return self.request("POST", url, data=data, json=json, **kwargs)
+
+
+#: The clients by service name, with the ID of the process that created them.
+_clients: typing.Dict[str, BackendClient] = {}
+_clients_pid = None
+_clients_lock = threading.Lock()
+#: Time (from ``time.monotonic()``) at which the metrics were last logged.
+_metrics_logged_at: typing.Optional[float] = None
+
+
+def get_client(name: str) -> BackendClient:
+    """Return the shared client for the backend service ``name``.
+
+    Clients are configured from the ``BACKEND_CLIENT_*`` settings.  They are created per process, so
+    forked workers do not share connections with their parent.
+    """
+    global _clients_pid, _metrics_logged_at
+    with _clients_lock:
+        if _clients_pid != os.getpid():
+            _clients.clear()
+            _clients_pid = os.getpid()
+            _metrics_logged_at = None
+        if name not in _clients:
+            timeouts = {**DEFAULT_SERVICE_TIMEOUTS, **settings.BACKEND_CLIENT_SERVICE_TIMEOUTS}
+            _clients[name] = BackendClient(
+                name,
+                timeout=timeouts.get(name, settings.BACKEND_CLIENT_TIMEOUT),
+                connect_timeout=settings.BACKEND_CLIENT_CONNECT_TIMEOUT,
+                retries=settings.BACKEND_CLIENT_RETRIES,
+                backoff=settings.BACKEND_CLIENT_BACKOFF,
+                breaker_threshold=settings.BACKEND_CLIENT_BREAKER_THRESHOLD,
+                breaker_reset=settings.BACKEND_CLIENT_BREAKER_RESET,
+                pool_size=settings.BACKEND_CLIENT_POOL_SIZE,
+            )
+        return _clients[name]
+
+
+def get_metrics() -> typing.Dict[str, dict]:
+    """Return the metrics of all clients in this process, by service name."""
+    with _clients_lock:
+        clients = dict(_clients) if _clients_pid == os.getpid() else {}
+    return {
+        name: {**client.metrics.snapshot(), "circuit": client.breaker.state}
+        for name, client in clients.items()
+    }
+
+
+def log_metrics():
+    """Log the metrics of all clients in this process as one JSON document."""
+    logger.info(
+        "backend client metrics: %s",
+        json.dumps({"pid": os.getpid(), "services": get_metrics()}, sort_keys=True),
+    )
+
+
+def _log_metrics_periodically():
+    """Call ``log_metrics()`` if ``BACKEND_CLIENT_METRICS_LOG_INTERVAL`` seconds have passed.
+
+    The interval starts with the first request of the process.
+    """
+    global _metrics_logged_at
+    interval = settings.BACKEND_CLIENT_METRICS_LOG_INTERVAL
+    if not interval:
+        return
+    now = time.monotonic()
+    with _clients_lock:
+        if _metrics_logged_at is not None and now - _metrics_logged_at < interval:
+            return
+        due = _metrics_logged_at is not None
+        _metrics_logged_at = now
+    if due:
+        log_metrics()
+
+
+def reset_clients():
+    """Close and drop all clients, e.g., after changing settings in tests."""
+    global _metrics_logged_at
+    with _clients_lock:
+        for client in _clients.values():
+            client.session.close()
+        _clients.clear()
+        _metrics_logged_at = None
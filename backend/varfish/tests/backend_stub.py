@@ -0,0 +1,147 @@
+"""Local stub HTTP server for testing calls to the backends offline.
+
+``BackendStubServer`` listens on a free port of ``127.0.0.1`` and answers requests with canned
+responses registered per method and path.  It records the requests and counts the TCP connections
+so tests can check keep-alive, retry, and timeout behaviour of ``varfish.backend_client``::
+
+    with BackendStubServer() as stub:
+        stub.add("GET", "/genes/info", json={"genes": {}})
+        get_client("annonars").get(stub.url("/genes/info"))
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json as jsonlib
+import threading
+import time
+import typing
+from urllib.parse import urlsplit
+
+import attr
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class StubResponse:
+    """Canned response of ``BackendStubServer``."""
+
+    status: int = 200
+    body: bytes = b""
+    content_type: str = "application/json"
+    #: Seconds to wait before answering.
+    delay: float = 0.0
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class StubRequest:
+    """Request recorded by ``BackendStubServer``."""
+
+    method: str
+    path: str
+    query: str
+    headers: typing.Dict[str, str]
+    body: bytes
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep connections alive between requests.
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.stub.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self):
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        self.server.stub.requests.append(
+            StubRequest(
+                method=self.command,
+                path=url.path,
+                query=url.query,
+                headers=dict(self.headers),
+                body=self.rfile.read(length),
+            )
+        )
+        response = self.server.stub.next_response(self.command, url.path)
+        if response.delay:
+            time.sleep(response.delay)
+        self.send_response(response.status)
+        self.send_header("Content-Type", response.content_type)
+        self.send_header("Content-Length", str(len(response.body)))
+        self.end_headers()
+        try:
+            self.wfile.write(response.body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up waiting, e.g., on a timeout.
+            self.close_connection = True
+
+    do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+
+class BackendStubServer:
+    """Stub HTTP server with canned responses, use as context manager."""
+
+    def __init__(self):
+        #: Queued responses by ``(method, path)``, the last one is repeated.
+        self.routes: typing.Dict[typing.Tuple[str, str], typing.List[StubResponse]] = {}
+        #: The requests received so far.
+        self.requests: typing.List[StubRequest] = []
+        #: Number of TCP connections accepted so far.
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    def add(
+        self,
+        method: str,
+        path: str,
+        *,
+        status: int = 200,
+        json: typing.Any = None,
+        text: typing.Optional[str] = None,
+        delay: float = 0.0,
+    ):
+        """Queue a response for ``method`` and ``path``, either with a ``json`` or ``text`` body."""
+        if text is not None:
+            response = StubResponse(status, text.encode("utf-8"), "text/plain", delay)
+        else:
+            response = StubResponse(status, jsonlib.dumps(json).encode("utf-8"), delay=delay)
+        with self._lock:
+            self.routes.setdefault((method.upper(), path), []).append(response)
+
+    def next_response(self, method: str, path: str) -> StubResponse:
+        with self._lock:
+            responses = self.routes.get((method, path))
+            if not responses:
+                return StubResponse(404, b'{"detail": "not found"}')
+            elif len(responses) > 1:
+                return responses.pop(0)
+            else:
+                return responses[0]
+
+    def url(self, path: str = "") -> str:
+        host, port = self._server.server_address[:2]
+        return "http://%s:%d%s" % (host, port, path)
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
@@ -0,0 +1,146 @@
+"""Tests for ``varfish.backend_client``."""
+
+import json
+import time
+
+from django.test import SimpleTestCase, override_settings
+import requests
+
+from varfish.backend_client import BackendUnavailable, get_client, get_metrics, reset_clients
+from varfish.tests.backend_stub import BackendStubServer
+
+
+@override_settings(
+    BACKEND_CLIENT_TIMEOUT=1.0,
+    BACKEND_CLIENT_RETRIES=2,
+    BACKEND_CLIENT_BACKOFF=0.0,
+    BACKEND_CLIENT_BREAKER_THRESHOLD=3,
+    BACKEND_CLIENT_BREAKER_RESET=60,
+)
+class TestBackendClient(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        reset_clients()
+        self.stub = BackendStubServer().start()
+        self.client = get_client("annonars")
+
+    def tearDown(self):
+        self.stub.stop()
+        reset_clients()
+        super().tearDown()
+
+    def test_get_client_shared(self):
+        self.assertIs(get_client("annonars"), self.client)
+        self.assertIsNot(get_client("mehari"), self.client)
+
+    def test_service_timeouts(self):
+        self.assertEqual(self.client.timeout[1], 1.0)
+        for name in ("exomiser", "cada", "pedia"):
+            self.assertEqual(get_client(name).timeout[1], 300.0)
+        reset_clients()
+        with override_settings(BACKEND_CLIENT_SERVICE_TIMEOUTS={"pedia": 10.0}):
+            self.assertEqual(get_client("pedia").timeout[1], 10.0)
+
+    def test_keep_alive(self):
+        self.stub.add("GET", "/genes/info", json={"genes": {}})
+        for _ in range(3):
+            res = self.client.get(self.stub.url("/genes/info"))
+            self.assertEqual(res.json(), {"genes": {}})
+        self.assertEqual(len(self.stub.requests), 3)
+        self.assertEqual(self.stub.connections, 1)
+
+    def test_get_retried(self):
+        self.stub.add("GET", "/genes/info", status=503, text="busy")
+        self.stub.add("GET", "/genes/info", json={"genes": {}})
+        res = self.client.get(self.stub.url("/genes/info"))
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(self.stub.requests), 2)
+
+    def test_get_retries_exhausted(self):
+        self.stub.add("GET", "/genes/info", status=503, text="busy")
+        res = self.client.get(self.stub.url("/genes/info"))
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(len(self.stub.requests), 3)
+
+    def test_post_not_retried(self):
+        self.stub.add("POST", "/annotate/", status=503, text="busy")
+        self.stub.add("POST", "/annotate/", json={})
+        res = self.client.post(self.stub.url("/annotate/"), json={"variant": "1-1-A-C"})
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(len(self.stub.requests), 1)
+        self.assertEqual(self.stub.requests[0].body, b'{"variant": "1-1-A-C"}')
+
+    def test_post_idempotent_retried(self):
+        self.stub.add("POST", "/result/", status=502, text="bad gateway")
+        self.stub.add("POST", "/result/", json={"status": "finished"})
+        res = self.client.post(self.stub.url("/result/"), json={}, idempotent=True)
+        self.assertEqual(res.json(), {"status": "finished"})
+        self.assertEqual(len(self.stub.requests), 2)
+
+    def test_timeout(self):
+        self.stub.add("GET", "/genes/info", json={}, delay=0.3)
+        with self.assertRaises(requests.ConnectionError):
+            self.client.get(self.stub.url("/genes/info"), timeout=0.1, idempotent=False)
+        self.assertEqual(get_metrics()["annonars"]["errors"], {"timeout": 1})
+
+    def test_circuit_breaker(self):
+        self.stub.add("GET", "/genes/info", status=500, text="error")
+        self.client.get(self.stub.url("/genes/info"))
+        self.client.get(self.stub.url("/genes/info"))
+        self.client.get(self.stub.url("/genes/info"))
+        self.assertEqual(len(self.stub.requests), 3)
+        self.assertEqual(self.client.breaker.state, "open")
+        with self.assertRaises(BackendUnavailable):
+            self.client.get(self.stub.url("/genes/info"))
+        self.assertEqual(len(self.stub.requests), 3)
+        self.assertEqual(get_metrics()["annonars"]["errors"], {"status_500": 3, "circuit_open": 1})
+
+    def test_circuit_breaker_half_open(self):
+        self.stub.add("GET", "/genes/info", status=500, text="error")
+        self.stub.add("GET", "/genes/info", status=500, text="error")
+        self.stub.add("GET", "/genes/info", status=500, text="error")
+        self.stub.add("GET", "/genes/info", json={})
+        for _ in range(3):
+            self.client.get(self.stub.url("/genes/info"))
+        self.client.breaker.reset_timeout = 0
+        self.assertEqual(self.client.breaker.state, "half-open")
+        self.assertEqual(self.client.get(self.stub.url("/genes/info")).status_code, 200)
+        self.assertEqual(self.client.breaker.state, "closed")
+
+    def test_circuit_breaker_single_probe(self):
+        breaker = self.client.breaker
+        for _ in range(3):
+            breaker.record_failure()
+        breaker.reset_timeout = 0
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.allow())
+
+    def test_metrics(self):
+        self.stub.add("GET", "/genes/info", json={})
+        self.client.get(self.stub.url("/genes/info"))
+        metrics = get_metrics()["annonars"]
+        self.assertEqual(metrics["requests"], 1)
+        self.assertEqual(metrics["errors"], {})
+        self.assertEqual(metrics["circuit"], "closed")
+        self.assertEqual(sum(metrics["latency_buckets"].values()), 1)
+
+    @override_settings(BACKEND_CLIENT_METRICS_LOG_INTERVAL=0.001)
+    def test_metrics_logged(self):
+        self.stub.add("GET", "/genes/info", json={})
+        self.stub.add("GET", "/genes/info", json={})
+        self.client.get(self.stub.url("/genes/info"))
+        time.sleep(0.01)
+        with self.assertLogs("varfish.backend_client", level="INFO") as logs:
+            self.client.get(self.stub.url("/genes/info"))
+        document = json.loads(logs.records[0].args[0])
+        self.assertEqual(document["services"]["annonars"]["requests"], 1)
+
+    def test_no_cookies_kept(self):
+        self.stub.add("GET", "/genes/info", json={})
+        self.client.get(self.stub.url("/genes/info"))
+        self.assertEqual(len(self.client.session.cookies), 0)
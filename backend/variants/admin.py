@@ -14,6 +14,7 @@ from .models import (
     SmallVariantComment,
     SmallVariantFlags,
     SmallVariantQuery,
+    SmallVariantQueryProfile,
     SmallVariantSet,
     SpanrSubmissionBgJob,
     SyncCaseListBgJob,
@@ -31,6 +32,7 @@ admin.site.register(
         ExportFileJobResult,
         SmallVariantFlags,
         SmallVariantQuery,
+        SmallVariantQueryProfile,
         SmallVariantComment,
         FilterBgJob,
         ProjectCasesFilterBgJob,
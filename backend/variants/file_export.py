@@ -3,12 +3,17 @@
 import contextlib
 import datetime
 from datetime import timedelta
-import math
+import itertools
+import os
 from tempfile import NamedTemporaryFile
 
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from projectroles.plugins import get_backend_api
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pysam
 import vcfpy
 import wrapt
 import xlsxwriter
@@ -61,6 +66,24 @@ BG_COLORS = {
 }
 
 
+#: Number of query result rows to annotate and write at a time.
+EXPORT_CHUNK_SIZE = 10_000
+
+#: Maximal number of rows in an Excel worksheet, including the header.
+XLSX_MAX_ROWS = 1_048_576
+
+#: Number of rows to write into one Parquet row group.
+PARQUET_ROW_GROUP_SIZE = 100_000
+
+#: Map of column type to Arrow type for Parquet export.
+ARROW_TYPES = {
+    str: pa.string(),
+    int: pa.int64(),
+    float: pa.float64(),
+    bool: pa.bool_(),
+    list: pa.list_(pa.string()),
+}
+
 #: Constant that determines how many days generated files should stay.  Note for the actual removal, a separate
 #: Celery job must be ran.
 EXPIRY_DAYS = 14
@@ -256,6 +279,29 @@ class RowWithJoinProxy(wrapt.ObjectProxy):
         return self.__wrapped__.__getitem__(key)
 
 
+def join_rows_by_coordinate(rows):
+    """Merge consecutive rows of the same variant from different cases, joining their genotypes.
+
+    ``rows`` must be ordered by coordinate as returned by ``CasePrefetchQuery.run()``, so only the
+    rows of the current variant are held in memory.
+    """
+    for _, group in itertools.groupby(
+        rows,
+        key=lambda row: (
+            row.release,
+            row.chromosome,
+            row.start,
+            row.end,
+            row.reference,
+            row.alternative,
+        ),
+    ):
+        joined = RowWithJoinProxy(next(group))
+        for row in group:
+            joined.add_genotype(row.genotype)
+        yield joined
+
+
 class CaseExporterBase:
     """Base class for export of (filtered) case data from single case or all cases of a project."""
 
@@ -393,69 +439,84 @@ class CaseExporterBase:
                     "fixed": False,
                 }
 
+    def _needs_full_result(self):
+        """Whether the annotation ranks variants across the whole result.
+
+        Phenotype, pathogenicity, Gestalt Matcher and PEDIA scores sort and rank all variants of
+        the result, so the result cannot be annotated in chunks then.
+        """
+        return any(
+            (
+                self._is_prioritization_enabled(),
+                self._is_pathogenicity_enabled(),
+                self._is_gm_enabled(),
+                self._is_pedia_enabled(),
+            )
+        )
+
+    def _annotate_smallvars(self, rows, fields):
+        """Run the annotation stages on the list of result ``rows`` and return the annotated rows."""
+        _result = annotate_with_gnomad_constraints(rows)
+        _result = annotate_with_transcripts(_result, self.query_args["database_select"])
+        if self._is_prioritization_enabled():
+            gene_scores = self._fetch_gene_scores([entry.entrez_id for entry in _result])
+            _result = annotate_with_phenotype_scores(_result, gene_scores)
+        if self._is_pathogenicity_enabled():
+            variant_scores = self._fetch_variant_scores(
+                [
+                    (
+                        entry["chromosome"],
+                        entry["start"],
+                        entry["reference"],
+                        entry["alternative"],
+                    )
+                    for entry in _result
+                ]
+            )
+            _result = annotate_with_pathogenicity_scores(_result, variant_scores)
+        if self._is_prioritization_enabled() and self._is_pathogenicity_enabled():
+            _result = annotate_with_joint_scores(_result)
+        if self._is_gm_enabled():
+            gene_scores = self._fetch_gm_scores([entry.entrez_id for entry in _result])
+            _result = annotate_with_gm_scores(_result, gene_scores)
+        if self._is_pedia_enabled():
+            pedia_scores = self._fetch_pedia_scores(_result)
+            if pedia_scores:
+                _result = annotate_with_pedia_scores(_result, pedia_scores)
+        return unroll_extra_annos_result(_result, fields)
+
     def _yield_smallvars(self):
-        """Use this for yielding the resulting small variants one-by-one."""
-        prev_chrom = None
+        """Use this for yielding the resulting small variants one-by-one.
+
+        The query result is read and annotated in chunks of ``EXPORT_CHUNK_SIZE`` rows unless the
+        annotation needs the full result.
+        """
+        fields = {x[1].label: x[0] for x in enumerate(list(ExtraAnnoField.objects.all()))}
         self.job.add_log_entry("Executing database query...")
-        with contextlib.closing(self.query.run(self.query_args)) as result:
-            self.job.add_log_entry("Executing phenotype score query...")
-            _result = annotate_with_gnomad_constraints(list(result))
-            _result = annotate_with_transcripts(_result, self.query_args["database_select"])
-            if self._is_prioritization_enabled():
-                gene_scores = self._fetch_gene_scores([entry.entrez_id for entry in _result])
-                _result = annotate_with_phenotype_scores(_result, gene_scores)
-            if self._is_pathogenicity_enabled():
-                variant_scores = self._fetch_variant_scores(
-                    [
-                        (
-                            entry["chromosome"],
-                            entry["start"],
-                            entry["reference"],
-                            entry["alternative"],
-                        )
-                        for entry in _result
-                    ]
+        with transaction.atomic(), contextlib.closing(
+            self.query.run(self.query_args, stream_results=True)
+        ) as result:
+            if self._needs_full_result():
+                chunks = iter([result.fetchall()])
+            else:
+                chunks = iter(lambda: result.fetchmany(EXPORT_CHUNK_SIZE), [])
+            total = 0
+            for chunk in chunks:
+                if not chunk:
+                    break
+                self.job.add_log_entry(
+                    "Annotating and writing variants {}-{} (chr{})...".format(
+                        total + 1, total + len(chunk), chunk[0].chromosome
+                    )
                 )
-                _result = annotate_with_pathogenicity_scores(_result, variant_scores)
-            if self._is_prioritization_enabled() and self._is_pathogenicity_enabled():
-                _result = annotate_with_joint_scores(_result)
-            if self._is_gm_enabled():
-                gene_scores = self._fetch_gm_scores([entry.entrez_id for entry in _result])
-                _result = annotate_with_gm_scores(_result, gene_scores)
-            if self._is_pedia_enabled():
-                pedia_scores = self._fetch_pedia_scores(_result)
-                if pedia_scores:
-                    _result = annotate_with_pedia_scores(_result, pedia_scores)
-            fields = {x[1].label: x[0] for x in enumerate(list(ExtraAnnoField.objects.all()))}
-            _result = unroll_extra_annos_result(_result, fields)
-            self.job.add_log_entry("Writing output file...")
-            total = len(_result)
-            steps = math.ceil(total / 10)
-            for i, small_var in enumerate(_result):
-                if (
-                    self._is_prioritization_enabled()
-                    or self._is_pathogenicity_enabled()
-                    or self._is_gm_enabled
-                    or self._is_pedia_enabled()
-                ):
-                    if i % steps == 0:
-                        self.job.add_log_entry("{}%".format(int(100 * i / total)))
-                else:
-                    if small_var.chromosome != prev_chrom:
-                        self.job.add_log_entry(
-                            "Now on chromosome chr{} ({}%)".format(
-                                small_var.chromosome, int(100 * i / total)
-                            )
-                        )
-                    prev_chrom = small_var.chromosome
-                if self.project_or_cohort:
-                    for sample in sorted(small_var.genotype.keys()):
-                        if self.query_class_project_cases is ProjectExportVcfQuery:
-                            yield RowWithJoinProxy(small_var)
-                        else:
+                total += len(chunk)
+                for small_var in self._annotate_smallvars(list(chunk), fields):
+                    if self.project_or_cohort:
+                        for sample in sorted(small_var.genotype.keys()):
                             yield RowWithSampleProxy(small_var, sample)
-                else:
-                    yield small_var
+                    else:
+                        yield small_var
+            self.job.add_log_entry("Wrote {} variants.".format(total))
 
     def _fetch_gene_scores(self, entrez_ids):
         if self._is_prioritization_enabled():
@@ -596,6 +657,10 @@ class CaseExporterBase:
         Override in sub class.
         """
 
+    def generate_index(self):
+        """Return an index for the data from ``generate()``, if supported by the file format."""
+        return None
+
     def _write_variants(self):
         """Write out the actual data, override called functions rather than this one."""
         self._begin_write_variants()
@@ -659,6 +724,81 @@ class CaseExporterTsv(CaseExporterBase):
             self.tmp_file.write(line.encode("utf-8"))
 
 
+def to_arrow_value(type_, val):
+    """Convert ``val`` for a Parquet column of the given header type, ``None`` if not possible."""
+    if val is None:
+        return None
+    elif type_ is list:
+        if isinstance(val, (list, set, tuple)):
+            return [to_str(x) for x in val]
+        return [to_str(val)]
+    elif type_ is str:
+        return to_str(val)
+    try:
+        return type_(val)
+    except (TypeError, ValueError):
+        return None
+
+
+class CaseExporterParquet(CaseExporterBase):
+    """Export a case to Parquet format with one typed column per header column."""
+
+    query_class_single_case = CaseExportTableQuery
+    query_class_project_cases = ProjectExportTableQuery
+
+    def __init__(self, job, case_or_project_or_cohort):
+        super().__init__(job, case_or_project_or_cohort)
+        #: The ``pyarrow.parquet.ParquetWriter`` to use for writing.
+        self.parquet_writer = None
+        #: The Arrow schema of the columns.
+        self.schema = None
+
+    def _get_named_temporary_file_args(self):
+        return {"suffix": ".parquet"}
+
+    def _write_variants_header(self):
+        """Fill with actions to write the variant header."""
+        self.schema = pa.schema(
+            [pa.field(column["name"], ARROW_TYPES[column["type"]]) for column in self.columns]
+        )
+        self.parquet_writer = pq.ParquetWriter(self.tmp_file.name, self.schema, compression="zstd")
+
+    def _write_row_group(self, values):
+        self.parquet_writer.write_table(
+            pa.Table.from_pydict(
+                {column["name"]: vals for column, vals in zip(self.columns, values)},
+                schema=self.schema,
+            )
+        )
+
+    def _write_variants_data(self):
+        """Fill with actions to write the variant data."""
+        values = [[] for _ in self.columns]
+        for small_var in self._yield_smallvars():
+            for column, vals in zip(self.columns, values):
+                if column["name"] == "chromosome":
+                    val = "chr" + small_var.chromosome
+                elif column["fixed"]:
+                    val = getattr(small_var, column["name"])
+                else:
+                    member, field = column["name"].rsplit(".", 1)
+                    genotype = small_var.genotype.get(member, {})
+                    if field == "aaf":
+                        dp = genotype.get("dp", 0)
+                        val = genotype.get("ad", 0) / dp if dp else 0.0
+                    else:
+                        val = genotype.get(field)
+                vals.append(to_arrow_value(column["type"], val))
+            if len(values[0]) == PARQUET_ROW_GROUP_SIZE:
+                self._write_row_group(values)
+                values = [[] for _ in self.columns]
+        if values[0]:
+            self._write_row_group(values)
+
+    def _end_write_variants(self):
+        self.parquet_writer.close()
+
+
 class CaseExporterXlsx(CaseExporterBase):
     """Export a case to Excel (XLSX) format."""
 
@@ -669,8 +809,10 @@ class CaseExporterXlsx(CaseExporterBase):
         super().__init__(job, case_or_project_or_cohort)
         #: The ``Workbook`` object to use for writing.
         self.workbook = None
-        #: The sheet with the variants.
+        #: The sheet with the variants, continued in further sheets beyond ``XLSX_MAX_ROWS``.
         self.variant_sheet = None
+        #: The number of sheets with variants.
+        self.variant_sheet_count = 0
         #: The sheet with the meta data.
         self.meta_data_sheet = None
         #: The sheet with comments
@@ -680,7 +822,11 @@ class CaseExporterXlsx(CaseExporterBase):
         return {"suffix": ".xlsx"}
 
     def _open(self):
-        self.workbook = xlsxwriter.Workbook(self.tmp_file.name, {"remove_timezone": True})
+        # Use constant memory mode, which flushes each row to disk once the next row is started.
+        # Thus, all sheets must be written row by row.
+        self.workbook = xlsxwriter.Workbook(
+            self.tmp_file.name, {"remove_timezone": True, "constant_memory": True}
+        )
         # setup formats
         self.header_format = self.workbook.add_format({"bold": True})
         # setup sheets
@@ -756,36 +902,43 @@ class CaseExporterXlsx(CaseExporterBase):
 
     def _write_metadata_sheet(self):
         # Write out meta data sheet.
-        self.meta_data_sheet.write_column(
-            0,
-            0,
-            ["Case", "", "Date", "", "Versions", "", "Settings"] + list(self.query_args.keys()),
-            self.header_format,
-        )
-        self.meta_data_sheet.write_column(
-            0,
-            1,
-            [
-                "TODO: URL to case",
-                "",
-                str(datetime.datetime.now()),
-                "",
-                "TODO: Write out software and all database versions etc." "",
-                "",
-                "",
-            ]
-            + list(map(self.__class__._unblank, map(str, self.query_args.values()))),
-        )
+        keys = ["Case", "", "Date", "", "Versions", "", "Settings"] + list(self.query_args.keys())
+        values = [
+            "TODO: URL to case",
+            "",
+            str(datetime.datetime.now()),
+            "",
+            "TODO: Write out software and all database versions etc." "",
+            "",
+            "",
+        ] + list(map(self.__class__._unblank, map(str, self.query_args.values())))
+        for row_no, (key, value) in enumerate(zip(keys, values)):
+            self.meta_data_sheet.write(row_no, 0, key, self.header_format)
+            self.meta_data_sheet.write(row_no, 1, value)
 
     def _write_variants_header(self):
         """Fill with actions to write the variant header."""
+        self.variant_sheet_count += 1
         self.variant_sheet.write_row(0, 0, [x["title"] for x in self.columns], self.header_format)
 
+    def _end_variant_sheet(self, num_rows):
+        # Freeze first row and first four columns and setup auto-filter.
+        self.variant_sheet.freeze_panes(1, 4)
+        self.variant_sheet.autofilter(0, 0, num_rows, len(self.columns))
+
     def _write_variants_data(self):
         """Fill with actions to write the variant data."""
-        # Write data to Excel sheet
+        # Write data to Excel sheet, continuing in a new sheet once the row limit is reached.
         num_rows = 0
-        for num_rows, small_var in enumerate(self._yield_smallvars()):
+        for small_var in self._yield_smallvars():
+            if num_rows + 1 == XLSX_MAX_ROWS:
+                self._end_variant_sheet(num_rows)
+                self.variant_sheet = self.workbook.add_worksheet(
+                    "Variants (%d)" % (self.variant_sheet_count + 1)
+                )
+                self._write_variants_header()
+                self.job.add_log_entry("Continuing in sheet %s..." % self.variant_sheet.name)
+                num_rows = 0
             row = []
             for column in self.columns:
                 if column["name"] == "chromosome":
@@ -804,10 +957,9 @@ class CaseExporterXlsx(CaseExporterBase):
                 if isinstance(row[-1], list):
                     row[-1] = to_str(row[-1])
             fmt = self.styles.get(flag_class(small_var))
-            self.variant_sheet.write_row(1 + num_rows, 0, list(map(str, row)), fmt)
-        # Freeze first row and first four columns and setup auto-filter.
-        self.variant_sheet.freeze_panes(1, 4)
-        self.variant_sheet.autofilter(0, 0, num_rows + 1, len(self.columns))
+            num_rows += 1
+            self.variant_sheet.write_row(num_rows, 0, list(map(str, row)), fmt)
+        self._end_variant_sheet(num_rows)
 
 
 class CaseExporterVcf(CaseExporterBase):
@@ -869,19 +1021,37 @@ class CaseExporterVcf(CaseExporterBase):
     def _end_write_variants(self):
         self.vcf_writer.close()
 
+    def generate_index(self):
+        """Build the tabix index of the block-gzipped VCF file and return it."""
+        path_index = "%s.tbi" % pysam.tabix_index(
+            self.tmp_file.name, preset="vcf", force=True, keep_original=True
+        )
+        try:
+            with open(path_index, "rb") as inputf:
+                return inputf.read()
+        finally:
+            os.remove(path_index)
+
     def _yield_smallvars(self):
-        if self.case:
-            yield from super()._yield_smallvars()
-        else:
-            joined_variants = {}
-            for i in super()._yield_smallvars():
-                key = (i.release, i.chromosome, i.start, i.end, i.reference, i.alternative)
-                if key in joined_variants:
-                    joined_variants[key].add_genotype(i.genotype)
-                else:
-                    joined_variants[key] = i
-            for key, value in joined_variants.items():
-                yield value
+        """Stream the small variants from the database in coordinate order.
+
+        The VCF file only holds coordinates and genotypes, so the annotation steps of the base class
+        are skipped and records are written while the query result is read.  For projects and
+        cohorts, the rows of the cases are merged by coordinate.
+        """
+        prev_chrom = None
+        self.job.add_log_entry("Executing database query...")
+        with transaction.atomic(), contextlib.closing(
+            self.query.run(self.query_args, stream_results=True)
+        ) as result:
+            self.job.add_log_entry("Writing output file...")
+            if self.project_or_cohort:
+                result = join_rows_by_coordinate(result)
+            for small_var in result:
+                if small_var.chromosome != prev_chrom:
+                    self.job.add_log_entry("Now on chromosome chr{}".format(small_var.chromosome))
+                    prev_chrom = small_var.chromosome
+                yield small_var
 
     def _write_variants_data(self):
         for small_var in self._yield_smallvars():
@@ -939,7 +1109,12 @@ class CaseExporterVcf(CaseExporterBase):
 
 
 #: Dict mapping file type to writer class.
-EXPORTERS = {"tsv": CaseExporterTsv, "vcf": CaseExporterVcf, "xlsx": CaseExporterXlsx}
+EXPORTERS = {
+    "tsv": CaseExporterTsv,
+    "vcf": CaseExporterVcf,
+    "xlsx": CaseExporterXlsx,
+    "parquet": CaseExporterParquet,
+}
 
 
 def export_case(job):
@@ -963,6 +1138,7 @@ def export_case(job):
                 job=job,
                 expiry_time=timezone.now() + timedelta(days=EXPIRY_DAYS),
                 payload=exporter.generate(),
+                index_payload=exporter.generate_index(),
             )
     except Exception as e:
         job.mark_error(e)
@@ -1002,6 +1178,7 @@ def export_project_cases(job):
                 job=job,
                 expiry_time=timezone.now() + timedelta(days=EXPIRY_DAYS),
                 payload=exporter.generate(),
+                index_payload=exporter.generate_index(),
             )
     except Exception as e:
         job.mark_error(e)
@@ -109,7 +109,12 @@ PATHO_SCORES_MAPPING = {
 class ExportFileResubmitForm(forms.Form):
     file_type = forms.ChoiceField(
         initial="xlsx",
-        choices=(("xlsx", "Excel (.xlsx)"), ("tsv", "TSV (.tsv)"), ("vcf", "VCF (.vcf.gz)")),
+        choices=(
+            ("xlsx", "Excel (.xlsx)"),
+            ("tsv", "TSV (.tsv)"),
+            ("vcf", "VCF (.vcf.gz)"),
+            ("parquet", "Parquet (.parquet)"),
+        ),
         widget=forms.Select(attrs={"class": "form-control"}),
     )
 
@@ -121,6 +126,7 @@ class ExportProjectCasesFileResubmitForm(forms.Form):
             ("xlsx", "Excel (.xlsx)"),
             ("tsv", "TSV (.tsv)"),
             ("vcf", "VCF (.vcf.gz)"),
+            ("parquet", "Parquet (.parquet)"),
         ),
         widget=forms.Select(attrs={"class": "form-control"}),
     )
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("variants", "0114_alter_quickpresets_inheritance"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GenePrioritizationScoreCache",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "last_retrieved",
+                    models.DateTimeField(auto_now=True, help_text="DateTime of last modification"),
+                ),
+                (
+                    "prio_algorithm",
+                    models.CharField(help_text="The prioritization algorithm", max_length=64),
+                ),
+                (
+                    "hpo_terms",
+                    models.TextField(help_text="Sorted, comma-separated HPO terms"),
+                ),
+                (
+                    "data_version",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        help_text="Data version of the prioritizer",
+                        max_length=64,
+                    ),
+                ),
+                (
+                    "gene_id",
+                    models.CharField(help_text="Entrez gene ID", max_length=64),
+                ),
+                (
+                    "gene_symbol",
+                    models.CharField(blank=True, help_text="The gene symbol", max_length=128),
+                ),
+                (
+                    "priority_type",
+                    models.CharField(blank=True, help_text="The priority type", max_length=64),
+                ),
+                ("score", models.FloatField(help_text="The gene score", null=True)),
+            ],
+            options={
+                "unique_together": {("prio_algorithm", "hpo_terms", "data_version", "gene_id")},
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+import varfish.utils
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projectroles", "0001_squashed_0032_alter_appsetting_value"),
+        ("variants", "0115_geneprioritizationscorecache"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProjectQcOverview",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "date_created",
+                    models.DateTimeField(auto_now_add=True, help_text="DateTime of creation"),
+                ),
+                ("data", varfish.utils.JSONField(help_text="The QC overview document")),
+                (
+                    "etag",
+                    models.CharField(
+                        help_text="Entity tag of the QC overview document",
+                        max_length=64,
+                    ),
+                ),
+                (
+                    "project",
+                    models.OneToOneField(
+                        help_text="The project of the QC overview",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="qc_overview",
+                        to="projectroles.project",
+                    ),
+                ),
+            ],
+        ),
+    ]
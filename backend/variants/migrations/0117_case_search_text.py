@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:06
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+from django.db import migrations, models
+
+#: Fill ``search_text`` from the case name, pedigree member names, and search tokens.
+SQL_BACKFILL_SEARCH_TEXT = r"""
+UPDATE variants_case
+SET search_text = (
+    SELECT coalesce(string_agg(value, ' ' ORDER BY ord), '')
+    FROM (
+        SELECT value, min(ord) AS ord
+        FROM (
+            SELECT lower(variants_case.name) AS value, 0 AS ord
+            UNION ALL
+            SELECT lower(member->>'patient'), ord
+            FROM jsonb_array_elements(variants_case.pedigree) WITH ORDINALITY AS m(member, ord)
+            WHERE coalesce(member->>'patient', '') != ''
+            UNION ALL
+            SELECT token, 1000000 + ord
+            FROM unnest(variants_case.search_tokens) WITH ORDINALITY AS t(token, ord)
+        ) AS values_
+        GROUP BY value
+    ) AS unique_values
+)
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("variants", "0116_projectqcoverview"),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.TrigramExtension(),
+        migrations.AddField(
+            model_name="case",
+            name="search_text",
+            field=models.TextField(blank=True, default="", help_text="Search text"),
+        ),
+        migrations.RunSQL(SQL_BACKFILL_SEARCH_TEXT, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name="case",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_text"],
+                name="variants_case_search_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
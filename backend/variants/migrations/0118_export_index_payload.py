@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("variants", "0117_case_search_text"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="exportfilejobresult",
+            name="index_payload",
+            field=models.BinaryField(
+                blank=True, help_text="Index of the exported file, if any", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="exportprojectcasesfilebgjobresult",
+            name="index_payload",
+            field=models.BinaryField(
+                blank=True, help_text="Index of the exported file, if any", null=True
+            ),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("variants", "0118_export_index_payload"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="exportfilebgjob",
+            name="file_type",
+            field=models.CharField(
+                choices=[
+                    ("tsv", "TSV File"),
+                    ("xlsx", "Excel File (XLSX)"),
+                    ("vcf", "VCF File"),
+                    ("parquet", "Parquet File"),
+                ],
+                help_text="File types for exported file",
+                max_length=32,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="exportprojectcasesfilebgjob",
+            name="file_type",
+            field=models.CharField(
+                choices=[
+                    ("tsv", "TSV File"),
+                    ("xlsx", "Excel File (XLSX)"),
+                    ("vcf", "VCF File"),
+                    ("parquet", "Parquet File"),
+                ],
+                help_text="File types for exported file",
+                max_length=32,
+            ),
+        ),
+    ]
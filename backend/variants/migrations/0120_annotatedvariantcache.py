@@ -0,0 +1,70 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:04
+
+from django.db import migrations, models
+import django.utils.timezone
+
+import varfish.utils
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("variants", "0119_export_parquet"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AnnotatedVariantCache",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "last_used",
+                    models.DateTimeField(
+                        db_index=True,
+                        default=django.utils.timezone.now,
+                        help_text="DateTime of last use",
+                    ),
+                ),
+                (
+                    "source",
+                    models.CharField(help_text="The annotation source", max_length=64),
+                ),
+                (
+                    "data_version",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        help_text="Data version of the annotation source",
+                        max_length=64,
+                    ),
+                ),
+                ("release", models.CharField(max_length=32)),
+                ("chromosome", models.CharField(max_length=32)),
+                ("start", models.IntegerField()),
+                ("reference", models.CharField(max_length=512)),
+                ("alternative", models.CharField(max_length=512)),
+                ("payload", varfish.utils.JSONField(help_text="The annotation")),
+            ],
+            options={
+                "unique_together": {
+                    (
+                        "source",
+                        "data_version",
+                        "release",
+                        "chromosome",
+                        "start",
+                        "reference",
+                        "alternative",
+                    )
+                },
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:11
+
+from django.db import migrations
+
+import varfish.utils
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("variants", "0120_annotatedvariantcache"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="filterbgjob",
+            name="progress",
+            field=varfish.utils.JSONField(
+                default=dict, help_text="Per-stage progress and timing of the job"
+            ),
+        ),
+        migrations.AddField(
+            model_name="projectcasesfilterbgjob",
+            name="progress",
+            field=varfish.utils.JSONField(
+                default=dict, help_text="Per-stage progress and timing of the job"
+            ),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:17
+
+import uuid
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+import varfish.utils
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("variants", "0121_filterbgjob_progress"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SmallVariantQueryProfile",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "sodar_uuid",
+                    models.UUIDField(default=uuid.uuid4, help_text="Record UUID", unique=True),
+                ),
+                (
+                    "date_created",
+                    models.DateTimeField(auto_now_add=True, help_text="DateTime of creation"),
+                ),
+                (
+                    "stages",
+                    varfish.utils.JSONField(
+                        default=list,
+                        help_text="Wall time and row counts of the job stages",
+                    ),
+                ),
+                (
+                    "statements",
+                    varfish.utils.JSONField(
+                        default=list,
+                        help_text="Compiled SQL, query plan, and row count of the job's queries",
+                    ),
+                ),
+                (
+                    "result_set",
+                    models.OneToOneField(
+                        help_text="The result set created by the profiled job",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="profile",
+                        to="variants.smallvariantqueryresultset",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:30
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("variants", "0122_smallvariantqueryprofile"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="geneprioritizationscorecache",
+            name="last_used",
+            field=models.DateTimeField(
+                db_index=True,
+                default=django.utils.timezone.now,
+                help_text="DateTime of last use",
+            ),
+        ),
+    ]
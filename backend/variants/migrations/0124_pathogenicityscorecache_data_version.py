@@ -0,0 +1,71 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:49
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("variants", "0123_geneprioritizationscorecache_last_used"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="caddpathogenicityscorecache",
+            name="data_version",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="Data version of the scorer",
+                max_length=64,
+            ),
+        ),
+        migrations.AddField(
+            model_name="caddpathogenicityscorecache",
+            name="last_used",
+            field=models.DateTimeField(
+                db_index=True,
+                default=django.utils.timezone.now,
+                help_text="DateTime of last use",
+            ),
+        ),
+        migrations.AddField(
+            model_name="mutationtasterpathogenicityscorecache",
+            name="data_version",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="Data version of the scorer",
+                max_length=64,
+            ),
+        ),
+        migrations.AddField(
+            model_name="mutationtasterpathogenicityscorecache",
+            name="last_used",
+            field=models.DateTimeField(
+                db_index=True,
+                default=django.utils.timezone.now,
+                help_text="DateTime of last use",
+            ),
+        ),
+        migrations.AddField(
+            model_name="umdpathogenicityscorecache",
+            name="data_version",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="Data version of the scorer",
+                max_length=64,
+            ),
+        ),
+        migrations.AddField(
+            model_name="umdpathogenicityscorecache",
+            name="last_used",
+            field=models.DateTimeField(
+                db_index=True,
+                default=django.utils.timezone.now,
+                help_text="DateTime of last use",
+            ),
+        ),
+    ]
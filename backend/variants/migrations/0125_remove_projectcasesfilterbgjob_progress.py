@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:52
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("variants", "0124_pathogenicityscorecache_data_version"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="projectcasesfilterbgjob",
+            name="progress",
+        ),
+    ]
@@ -19,14 +19,19 @@ from bgjobs.models import (
 from bgjobs.plugins import BackgroundJobsPluginPoint
 from django.contrib.auth import get_user_model
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.cache import cache
 from django.db import models, transaction
 from django.db.models import Q
-from django.db.models.signals import pre_delete
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 from django.urls import reverse
 from django.utils import timezone
 from postgres_copy import CopyManager
 from projectroles.app_settings import AppSettingAPI
+from projectroles.models import AppSetting
 from projectroles.plugins import get_backend_api
 from sqlalchemy import and_, func, select
 
@@ -94,29 +99,45 @@ class CoreCase(models.Model):
         abstract = True
 
 
-class CaseManager(models.Manager):
-    """Manager for custom table-level Case queries"""
+class CaseQuerySet(models.QuerySet):
+    """QuerySet with support for the trigram-indexed case search"""
 
-    # TODO: properly test searching..
+    def search(self, search_terms):
+        """Filter to cases matching any of ``search_terms``, ranked by similarity.
 
-    def find(self, search_terms, _keywords=None):
-        """
-        Return objects or links matching the query.
-        :param search_terms: Search terms (list of string)
-        :param _keywords: Optional search keywords as key/value pairs (dict)
-        :return: Python list of BaseFilesfolderClass objects
+        A case matches if its name equals a term (case-insensitive) or a term or its
+        normalized search token is contained in ``search_text``.  The substring matches
+        are served by the trigram index on ``search_text``.  Results are ordered by the
+        best trigram word similarity of the search tokens to ``search_text``, then by name.
         """
-        objects = super().get_queryset().order_by("name")
         term_query = Q()
-        search_tokens = map(lambda x: re.sub(r"[^a-zA-Z0-9]", "", x), search_terms)
-
+        search_tokens = []
         for t in search_terms:
             term_query.add(Q(name__iexact=t), Q.OR)
+            for value in dict.fromkeys((t.lower(), re.sub(r"[^a-zA-Z0-9]", "", t).lower())):
+                if value:
+                    term_query.add(Q(search_text__contains=value), Q.OR)
+                    search_tokens.append(value)
+
+        result = self.filter(term_query)
+        if not search_tokens:
+            return result.order_by("name")
+        similarities = [TrigramWordSimilarity(token, "search_text") for token in search_tokens]
+        search_rank = similarities[0] if len(similarities) == 1 else Greatest(*similarities)
+        return result.annotate(search_rank=search_rank).order_by("-search_rank", "name")
 
-        for t in search_tokens:
-            term_query.add(Q(search_tokens__icontains=t), Q.OR)
 
-        return objects.filter(term_query)
+class CaseManager(models.Manager.from_queryset(CaseQuerySet)):
+    """Manager for custom table-level Case queries"""
+
+    def find(self, search_terms, _keywords=None):
+        """
+        Return objects or links matching the query, ranked by relevance.
+        :param search_terms: Search terms (list of string)
+        :param _keywords: Optional search keywords as key/value pairs (dict)
+        :return: Python list of BaseFilesfolderClass objects
+        """
+        return self.get_queryset().select_related("project").search(search_terms)
 
 
 class Case(CoreCase):
@@ -140,7 +161,12 @@ class Case(CoreCase):
 
     class Meta:
         ordering = ("-date_modified",)
-        indexes = [models.Index(fields=["name"])]
+        indexes = [
+            models.Index(fields=["name"]),
+            GinIndex(
+                fields=["search_text"], opclasses=["gin_trgm_ops"], name="variants_case_search_trgm"
+            ),
+        ]
 
     #: DateTime of creation
     date_created = models.DateTimeField(auto_now_add=True, help_text="DateTime of creation")
@@ -189,6 +215,8 @@ class Case(CoreCase):
         db_index=True,
         help_text="Search tokens",
     )
+    #: Lower-case names and ``search_tokens`` joined by spaces, for the trigram-indexed search
+    search_text = models.TextField(default="", blank=True, help_text="Search text")
 
     #: The ``PresetSet`` to use for filtering this case.  When this is ``None``, the factory defaults are used.
     presetset = models.ForeignKey(
@@ -258,6 +286,11 @@ class Case(CoreCase):
         self.search_tokens = [x.lower() for x in self.search_tokens]
         # Strip non-alphanumeric characters
         self.search_tokens = [re.sub(r"[^a-zA-Z0-9]", "", x) for x in self.search_tokens]
+        # Raw names and tokens for the trigram search
+        names = [self.name] + [x["patient"] for x in self.pedigree if x.get("patient")]
+        self.search_text = " ".join(
+            dict.fromkeys([x.lower() for x in names] + self.search_tokens).keys()
+        )
 
     def get_sex(self, sample):
         """Return ``int``-value sex for the given ``sample`` in ``pedigree``."""
@@ -554,6 +587,49 @@ def delete_case_cascaded(sender, instance, **kwargs):
                     bgjob.bg_job.delete()
 
 
+#: Cache key for the IDs of projects excluded from the in-house database.
+INHOUSE_DB_EXCLUDED_PROJECT_IDS_CACHE_KEY = "variants:inhouse_db_excluded_project_ids"
+
+
+def get_inhouse_db_excluded_project_ids() -> frozenset[int]:
+    """Return IDs of projects with the ``exclude_from_inhouse_db`` setting enabled.
+
+    The setting is resolved for all projects with a single query on the app settings
+    table rather than with one ``get_app_setting()`` call per project.  The result is
+    cached and the cache is invalidated whenever an ``AppSetting`` is saved or deleted.
+    """
+    result = cache.get(INHOUSE_DB_EXCLUDED_PROJECT_IDS_CACHE_KEY)
+    if result is None:
+        result = frozenset(
+            AppSetting.objects.filter(
+                app_plugin__name="variants",
+                name="exclude_from_inhouse_db",
+                value="1",
+                project__isnull=False,
+            ).values_list("project_id", flat=True)
+        )
+        cache.set(INHOUSE_DB_EXCLUDED_PROJECT_IDS_CACHE_KEY, result, None)
+    return result
+
+
+def get_inhouse_db_excluded_case_ids() -> frozenset[int]:
+    """Return IDs of cases whose project is excluded from the in-house database."""
+    excluded_project_ids = get_inhouse_db_excluded_project_ids()
+    if not excluded_project_ids:
+        return frozenset()
+    return frozenset(
+        Case.objects.filter(project_id__in=excluded_project_ids).values_list("id", flat=True)
+    )
+
+
+@receiver(post_save, sender=AppSetting)
+@receiver(post_delete, sender=AppSetting)
+def invalidate_inhouse_db_excluded_ids(sender, instance, **kwargs):
+    """Signal handler for invalidating the cached in-house database exclusions."""
+    if instance.name == "exclude_from_inhouse_db":
+        cache.delete(INHOUSE_DB_EXCLUDED_PROJECT_IDS_CACHE_KEY)
+
+
 class CaseComments(models.Model):
     """Comments associated with a case."""
 
@@ -13,10 +13,12 @@ from variants.models.projectroles import Project
 EXPORT_TYPE_CHOICE_TSV = "tsv"
 EXPORT_TYPE_CHOICE_XLSX = "xlsx"
 EXPORT_TYPE_CHOICE_VCF = "vcf"
+EXPORT_TYPE_CHOICE_PARQUET = "parquet"
 EXPORT_FILE_TYPE_CHOICES = (
     (EXPORT_TYPE_CHOICE_TSV, "TSV File"),
     (EXPORT_TYPE_CHOICE_XLSX, "Excel File (XLSX)"),
     (EXPORT_TYPE_CHOICE_VCF, "VCF File"),
+    (EXPORT_TYPE_CHOICE_PARQUET, "Parquet File"),
 )
 
 
@@ -94,6 +96,9 @@ class ExportFileJobResult(models.Model):
     )
     expiry_time = models.DateTimeField(help_text="Time at which the file download expires")
     payload = models.BinaryField(help_text="Resulting exported file")
+    index_payload = models.BinaryField(
+        null=True, blank=True, help_text="Index of the exported file, if any"
+    )
 
 
 class ExportProjectCasesFileBgJob(ExportFileBgJobBase):
@@ -132,3 +137,6 @@ class ExportProjectCasesFileBgJobResult(models.Model):
     )
     expiry_time = models.DateTimeField(help_text="Time at which the file download expires")
     payload = models.BinaryField(help_text="Resulting exported file")
+    index_payload = models.BinaryField(
+        null=True, blank=True, help_text="Index of the exported file, if any"
+    )
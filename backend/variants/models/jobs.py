@@ -1,7 +1,9 @@
 """Models and related code for execution SmallVariant query jobs."""
 
+import contextlib
 from datetime import datetime, timedelta
 from decimal import Decimal
+import functools
 from itertools import islice
 import json
 import traceback
@@ -30,6 +32,7 @@ from variants.models.queries import (
     SmallVariantQueryResultSet,
 )
 from variants.models.variants import SmallVariantSet
+from variants.profiling import QueryProfiler, is_profiling_enabled
 from variants.queries import CaseLoadPrefetchedQuery
 from variants.submit_filter import CaseFilter
 
@@ -91,6 +94,8 @@ def run_query_bg_job(pk):
     query_model.query_state = SmallVariantQuery.QueryState.RUNNING
     query_model.save()
 
+    profiler = QueryProfiler(enabled=is_profiling_enabled(filter_job.project))
+
     timeline = get_backend_api("timeline_backend")
     tl_event = None
 
@@ -114,6 +119,8 @@ def run_query_bg_job(pk):
         pedia_scores=None,
     ):
         """Read and yield ``SmallVariantQueryResultRow`` objects by reading ``inputf`` for the given ``SmallVariantQueryResultSet``."""
+        # Load the gnomAD constraints once per gene.
+        load_gene_constraints = functools.lru_cache(maxsize=None)(load_gnomad_constraints)
 
         for line in inputf:
             payload = dict(line)
@@ -141,7 +148,8 @@ def run_query_bg_job(pk):
                         payload["pathogenicity_score"] * payload["phenotype_score"]
                     )
 
-            constraints = load_gnomad_constraints(line.hgnc_id)
+            with profiler.timed("annotation"):
+                constraints = load_gene_constraints(line.hgnc_id)
             oe_lof_upper = constraints.get("oeLofUpper", None)
             payload["gnomad_pLI"] = constraints.get("pli", None)
             payload["gnomad_mis_z"] = constraints.get("misZ", None)
@@ -172,7 +180,8 @@ def run_query_bg_job(pk):
         filter_job.add_log_entry("Starting SmallVariant database query")
         start_time = timezone.now()
 
-        CaseFilter(filter_job, query_model).run()
+        case_filter = CaseFilter(filter_job, query_model, profiler=profiler)
+        case_filter.run(later_stages=("result_rows",))
 
         end_time = timezone.now()
         filter_job.add_log_entry("... done running the worker")
@@ -216,30 +225,42 @@ def run_query_bg_job(pk):
                 if row.gene_id
             }
 
-        with transaction.atomic():
+        result_row_count = query_model.query_results.count()
+        # The rows are read from a server-side cursor, which requires the transaction.
+        with transaction.atomic(), case_filter.progress.stage(
+            "result_rows", total=result_row_count
+        ) as progress:
             smallvariantqueryresultset = SmallVariantQueryResultSet.objects.create(
                 case=query_model.case,
                 smallvariantquery=query_model,
-                result_row_count=query_model.query_results.count(),
+                result_row_count=result_row_count,
                 start_time=start_time,
                 end_time=end_time,
                 elapsed_seconds=(end_time - start_time).total_seconds(),
             )
 
-            for batch in batched(
-                _read_records(
-                    CaseLoadPrefetchedQuery(query_model.case, get_engine(), query_model.id).run(
-                        query_model.query_settings
+            load_query = CaseLoadPrefetchedQuery(query_model.case, get_engine(), query_model.id)
+            profiler.explain("load", load_query, query_model.query_settings, rows=result_row_count)
+            with contextlib.closing(
+                load_query.run(query_model.query_settings, stream_results=True)
+            ) as records:
+                done = 0
+                for batch in batched(
+                    _read_records(
+                        records,
+                        smallvariantqueryresultset,
+                        pathogenicity_scores=pathogenicity_scores,
+                        phenotype_scores=phenotype_scores,
+                        gm_scores=gm_scores,
+                        pedia_scores=pedia_scores,
                     ),
-                    smallvariantqueryresultset,
-                    pathogenicity_scores=pathogenicity_scores,
-                    phenotype_scores=phenotype_scores,
-                    gm_scores=gm_scores,
-                    pedia_scores=pedia_scores,
-                ),
-                n=1000,
-            ):
-                SmallVariantQueryResultRow.objects.bulk_create(batch)
+                    n=1000,
+                ):
+                    with profiler.timed("row_writes", rows=len(batch)):
+                        SmallVariantQueryResultRow.objects.bulk_create(batch)
+                    done += len(batch)
+                    progress.advance("result_rows", done)
+        profiler.save(smallvariantqueryresultset, filter_job.progress)
         filter_job.add_log_entry("... done creating result set and importing worker results")
 
     try:
@@ -177,6 +177,35 @@ class SmallVariantQueryResultSet(models.Model):
         ordering = ("-date_created", "pk")
 
 
+class SmallVariantQueryProfile(models.Model):
+    """Profile of the filter job that created a ``SmallVariantQueryResultSet``.
+
+    Only recorded for projects with the ``query_profiling_enabled`` setting, see
+    ``variants.profiling``.
+    """
+
+    #: Record UUID.
+    sodar_uuid = models.UUIDField(default=uuid_object.uuid4, unique=True, help_text="Record UUID")
+    #: DateTime of record creation.
+    date_created = models.DateTimeField(auto_now_add=True, help_text="DateTime of creation")
+
+    #: The result set created by the profiled job.
+    result_set = models.OneToOneField(
+        SmallVariantQueryResultSet,
+        on_delete=models.CASCADE,
+        related_name="profile",
+        help_text="The result set created by the profiled job",
+    )
+
+    #: Wall time and row counts of the job stages.
+    stages = JSONField(default=list, help_text="Wall time and row counts of the job stages")
+
+    #: Compiled SQL, query plan, and row count of the job's queries.
+    statements = JSONField(
+        default=list, help_text="Compiled SQL, query plan, and row count of the job's queries"
+    )
+
+
 class SmallVariantQueryResultRow(models.Model):
     """A row in ``SmallVariantQueryResultSet``.
 
@@ -272,6 +301,9 @@ class FilterBgJob(JobModelMessageMixin, models.Model):
         SmallVariantQuery, on_delete=models.CASCADE, null=False, help_text="Query that is executed."
     )
 
+    #: Per-stage progress and timing, see ``variants.submit_filter.FilterProgress``
+    progress = JSONField(default=dict, help_text="Per-stage progress and timing of the job")
+
     def get_human_readable_type(self):
         return "Single-case query results"
 
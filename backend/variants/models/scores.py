@@ -1,6 +1,9 @@
 """Code supporting scoring of variants by pathogenicity or phenotype."""
 
+from datetime import timedelta
+from functools import reduce
 import json
+import operator
 import re
 import time
 
@@ -8,7 +11,9 @@ import binning
 from django.conf import settings
 from django.contrib.postgres.fields import ArrayField
 from django.db import models
+from django.db.models import Q
 from django.forms import model_to_dict
+from django.utils import timezone
 from django.utils.html import strip_tags
 import pandas as pd
 from projectroles.app_settings import AppSettingAPI
@@ -17,6 +22,7 @@ from sqlalchemy.exc import NoSuchColumnError
 import wrapt
 
 from ext_gestaltmatcher.models import SmallVariantQueryGestaltMatcherScores
+from varfish.backend_client import get_client
 from varfish.utils import JSONField
 
 _app_settings = AppSettingAPI()
@@ -45,7 +51,7 @@ def load_molecular_impact(kwargs):
     except NoSuchColumnError:
         pass
     try:
-        res = requests.request(method="get", url=url)
+        res = get_client("mehari").get(url)
         if not res.status_code == 200:
             raise ConnectionError(
                 "ERROR: Server responded with status {} and message {}".format(
@@ -70,7 +76,7 @@ def load_gnomad_constraints(hgnc_id=None):
     url = "{base_url}/genes/info?hgnc_id={hgnc_id}".format(base_url=base_url, hgnc_id=hgnc_id)
 
     try:
-        res = requests.request(method="get", url=url)
+        res = get_client("annonars").get(url)
         if not res.status_code == 200:
             raise ConnectionError(
                 "ERROR: Server responded with status {} and message {}".format(
@@ -195,10 +201,23 @@ class ProjectCasesSmallVariantQueryVariantScores(models.Model):
 
 
 class PathogenicityScoreCacheBase(models.Model):
-    """Base model class for the pathogenicity scoring caches to store the API results."""
+    """Base model class for the pathogenicity scoring caches to store the API results.
+
+    Only entries of the configured ``data_version`` of the scorer are used.  ``last_used`` is
+    updated when an entry is read so ``clear_annotated_variant_cache()`` can evict the least
+    recently used entries.
+    """
 
     #: Date of last retrieval
     last_retrieved = models.DateTimeField(auto_now=True, help_text="DateTime of last modification")
+    #: Date of last use
+    last_used = models.DateTimeField(
+        default=timezone.now, db_index=True, help_text="DateTime of last use"
+    )
+    #: The data version of the scorer
+    data_version = models.CharField(
+        max_length=64, blank=True, default="", help_text="Data version of the scorer"
+    )
     #: Genome build
     release = models.CharField(max_length=32)
     #: Variant coordinates - chromosome
@@ -273,6 +292,215 @@ class MutationTasterPathogenicityScoreCache(PathogenicityScoreCacheBase):
     polymorphism = models.CharField(max_length=32, null=True)
 
 
+#: The pathogenicity score caches by score type.
+PATHOGENICITY_SCORE_CACHES = {
+    "cadd": CaddPathogenicityScoreCache,
+    "mutationtaster": MutationTasterPathogenicityScoreCache,
+    "umd": UmdPathogenicityScoreCache,
+}
+
+
+class AnnotatedVariantCache(models.Model):
+    """Site-wide cache of per-variant annotations (mehari transcripts).
+
+    Pathogenicity scores are cached in the ``PathogenicityScoreCacheBase`` models of the scorers.
+
+    Entries are keyed by the annotation ``source``, its ``data_version``, and the variant so the
+    annotation of a variant is shared by all cases carrying it.  ``last_used`` is updated when an
+    entry is read so ``clear_annotated_variant_cache()`` can evict the least recently used entries.
+    """
+
+    #: Date of last use
+    last_used = models.DateTimeField(
+        default=timezone.now, db_index=True, help_text="DateTime of last use"
+    )
+    #: The annotation source, e.g., ``mehari``
+    source = models.CharField(max_length=64, help_text="The annotation source")
+    #: The data version of the source
+    data_version = models.CharField(
+        max_length=64, blank=True, default="", help_text="Data version of the annotation source"
+    )
+    #: Genome build
+    release = models.CharField(max_length=32)
+    #: Variant coordinates - chromosome
+    chromosome = models.CharField(max_length=32)
+    #: Variant coordinates - 1-based start position
+    start = models.IntegerField()
+    #: Variant coordinates - reference
+    reference = models.CharField(max_length=512)
+    #: Variant coordinates - alternative
+    alternative = models.CharField(max_length=512)
+    #: The annotation
+    payload = JSONField(help_text="The annotation")
+
+    class Meta:
+        unique_together = (
+            (
+                "source",
+                "data_version",
+                "release",
+                "chromosome",
+                "start",
+                "reference",
+                "alternative",
+            ),
+        )
+
+
+#: The fields identifying a variant in ``AnnotatedVariantCache``.
+ANNOTATION_CACHE_KEY_FIELDS = ("release", "chromosome", "start", "reference", "alternative")
+
+#: Number of variants to look up in ``AnnotatedVariantCache`` with one query.
+ANNOTATION_CACHE_CHUNK_SIZE = 500
+
+#: Entries are only marked as used again after this time to save writes.
+ANNOTATION_CACHE_TOUCH_INTERVAL = timedelta(hours=1)
+
+
+def annotation_cache_key(variant):
+    """Return the ``AnnotatedVariantCache`` key of ``variant``, a result row or mapping."""
+    return tuple(variant[field] for field in ANNOTATION_CACHE_KEY_FIELDS)
+
+
+def annotation_data_version(source):
+    """Return the configured data version of the annotation ``source``.
+
+    ``source`` is ``mehari`` or a pathogenicity score type.  Sources without a configured version
+    get ``""``, so their cached annotations are only invalidated when a version is configured.
+    """
+    data_versions = {
+        "cadd": settings.VARFISH_CADD_REST_API_CADD_VERSION,
+        **settings.VARFISH_ANNOTATION_CACHE_DATA_VERSIONS,
+    }
+    return data_versions.get(source, "")
+
+
+def get_cached_annotations(source, keys):
+    """Return the cached annotations of ``source`` for the ``annotation_cache_key()``s in ``keys``.
+
+    The result maps keys to payloads, keys that are not cached are missing.
+    """
+    if not settings.VARFISH_ANNOTATION_CACHE_ENABLED:
+        return {}
+    keys = list(dict.fromkeys(keys))
+    data_version = annotation_data_version(source)
+    now = timezone.now()
+    result = {}
+    touched = []
+    for offset in range(0, len(keys), ANNOTATION_CACHE_CHUNK_SIZE):
+        condition = reduce(
+            operator.or_,
+            (
+                Q(**dict(zip(ANNOTATION_CACHE_KEY_FIELDS, key)))
+                for key in keys[offset : offset + ANNOTATION_CACHE_CHUNK_SIZE]
+            ),
+        )
+        for entry in AnnotatedVariantCache.objects.filter(
+            condition, source=source, data_version=data_version
+        ):
+            key = tuple(getattr(entry, field) for field in ANNOTATION_CACHE_KEY_FIELDS)
+            result[key] = entry.payload
+            if entry.last_used < now - ANNOTATION_CACHE_TOUCH_INTERVAL:
+                touched.append(entry.id)
+    if touched:
+        AnnotatedVariantCache.objects.filter(id__in=touched).update(last_used=now)
+    return result
+
+
+def store_cached_annotations(source, payloads):
+    """Store the annotations of ``source`` in ``payloads``, a mapping from key to payload."""
+    if not settings.VARFISH_ANNOTATION_CACHE_ENABLED or not payloads:
+        return
+    data_version = annotation_data_version(source)
+    AnnotatedVariantCache.objects.bulk_create(
+        [
+            AnnotatedVariantCache(
+                source=source,
+                data_version=data_version,
+                payload=payload,
+                **dict(zip(ANNOTATION_CACHE_KEY_FIELDS, key)),
+            )
+            for key, payload in payloads.items()
+        ],
+        batch_size=ANNOTATION_CACHE_CHUNK_SIZE,
+        update_conflicts=True,
+        unique_fields=("source", "data_version", *ANNOTATION_CACHE_KEY_FIELDS),
+        update_fields=("payload", "last_used"),
+    )
+
+
+def _clear_least_recently_used(queryset):
+    """Remove the least recently used entries of ``queryset`` beyond the maximal number."""
+    excess = queryset.count() - settings.VARFISH_ANNOTATION_CACHE_MAX_ENTRIES
+    if excess > 0:
+        return queryset.filter(
+            id__in=queryset.order_by("last_used", "id").values("id")[:excess]
+        ).delete()[0]
+    return 0
+
+
+def clear_annotated_variant_cache():
+    """Remove outdated and least recently used entries from the per-variant annotation caches.
+
+    This covers ``AnnotatedVariantCache`` and the pathogenicity score caches.  Entries whose data
+    version differs from the configured one are removed, then the least recently used entries
+    beyond ``settings.VARFISH_ANNOTATION_CACHE_MAX_ENTRIES`` of each cache.  Return the number of
+    removed entries.
+    """
+    removed = 0
+    sources = AnnotatedVariantCache.objects.values_list("source", flat=True).distinct()
+    for source in list(sources):
+        removed += (
+            AnnotatedVariantCache.objects.filter(source=source)
+            .exclude(data_version=annotation_data_version(source))
+            .delete()[0]
+        )
+    removed += _clear_least_recently_used(AnnotatedVariantCache.objects.all())
+    for score_type, cache_model in PATHOGENICITY_SCORE_CACHES.items():
+        removed += cache_model.objects.exclude(
+            data_version=annotation_data_version(score_type)
+        ).delete()[0]
+        removed += _clear_least_recently_used(cache_model.objects.all())
+    return removed
+
+
+class GenePrioritizationScoreCache(models.Model):
+    """Model to cache the results of the gene prioritization APIs (Exomiser and CADA).
+
+    Gene scores only depend on the prioritization algorithm, the set of HPO terms and the
+    version of the data used by the prioritizer.  Genes for which the prioritizer did not return
+    a score are stored with a ``score`` of ``None`` so they are not queried again.  ``last_used``
+    is updated when an entry is read so ``clear_gene_prioritization_score_cache()`` can remove
+    entries of outdated data versions and entries that were not used for a long time.
+    """
+
+    #: Date of last retrieval
+    last_retrieved = models.DateTimeField(auto_now=True, help_text="DateTime of last modification")
+    #: Date of last use
+    last_used = models.DateTimeField(
+        default=timezone.now, db_index=True, help_text="DateTime of last use"
+    )
+    #: The prioritization algorithm
+    prio_algorithm = models.CharField(max_length=64, help_text="The prioritization algorithm")
+    #: The sorted, comma-separated HPO terms
+    hpo_terms = models.TextField(help_text="Sorted, comma-separated HPO terms")
+    #: The data version of the prioritizer
+    data_version = models.CharField(
+        max_length=64, blank=True, default="", help_text="Data version of the prioritizer"
+    )
+    #: The Entrez gene ID
+    gene_id = models.CharField(max_length=64, help_text="Entrez gene ID")
+    #: The gene symbol
+    gene_symbol = models.CharField(max_length=128, blank=True, help_text="The gene symbol")
+    #: The priority type
+    priority_type = models.CharField(max_length=64, blank=True, help_text="The priority type")
+    #: The score, ``None`` if the prioritizer returned no score for the gene
+    score = models.FloatField(null=True, help_text="The gene score")
+
+    class Meta:
+        unique_together = (("prio_algorithm", "hpo_terms", "data_version", "gene_id"),)
+
+
 # TODO: Improve wrapper so we can assign obj.phenotype_rank and score
 class RowWithPhenotypeScore(wrapt.ObjectProxy):
     """Wrap a result row and add members for phenotype score and rank."""
@@ -588,10 +816,23 @@ def annotate_with_pedia_scores(rows, pedia_scores):
 
 
 def annotate_with_transcripts(rows, database):
-    """Annotate the results in ``rows`` with transcripts (RefSeq or Ensembl)"""
+    """Annotate the results in ``rows`` with transcripts (RefSeq or Ensembl).
+
+    The mehari consequences are looked up once per variant and shared through
+    ``AnnotatedVariantCache``.
+    """
     rows = [RowWithTranscripts(row, database) for row in rows]
+    use_cache = bool(settings.VARFISH_BACKEND_URL_MEHARI)
+    if use_cache:
+        impacts = get_cached_annotations("mehari", map(annotation_cache_key, rows))
+    else:
+        impacts = {}
+    fetched = {}
     for row in rows:
-        transcripts = load_molecular_impact(row)
+        key = annotation_cache_key(row)
+        if key not in impacts:
+            impacts[key] = fetched[key] = load_molecular_impact(row)
+        transcripts = impacts[key]
         row.transcripts = "\n".join(
             [
                 "{};{};{};{}".format(
@@ -603,6 +844,8 @@ def annotate_with_transcripts(rows, database):
                 for t in transcripts
             ]
         )
+    if use_cache:
+        store_cached_annotations("mehari", fetched)
 
     return rows
 
@@ -610,9 +853,13 @@ def annotate_with_transcripts(rows, database):
 def annotate_with_gnomad_constraints(rows):
     """Annotate the results in ``rows`` with gnomAD constraints."""
     rows = [RowWithGnomadConstraints(row) for row in rows]
+    gene_constraints = {}
     for row in rows:
-        # Get the gnomAD constraint for the gene
-        constraints = load_gnomad_constraints(row.hgnc_id if hasattr(row, "hgnc_id") else None)
+        # Get the gnomAD constraint for the gene, once per gene
+        hgnc_id = row.hgnc_id if hasattr(row, "hgnc_id") else None
+        if hgnc_id not in gene_constraints:
+            gene_constraints[hgnc_id] = load_gnomad_constraints(hgnc_id)
+        constraints = gene_constraints[hgnc_id]
         # Add the constraint to the row
         oe_lof_upper = constraints.get("oeLofUpper", None)
         row.gnomad_pLI = constraints.get("pli", None)
@@ -903,9 +1150,20 @@ def prioritize_genes(entrez_ids, hpo_terms, prio_algorithm, logging=lambda text:
     """Perform gene prioritization query.
 
     Yield quadruples (gene id, gene symbol, score, priority type) for the given gene list and query settings.
+
+    If ``settings.VARFISH_GENE_PRIO_CACHE_ENABLED`` is set then the results are served from and
+    stored in ``GenePrioritizationScoreCache`` and only genes not covered by the cache yet are
+    sent to the prioritizer.
     """
     # TODO: properly test
 
+    if settings.VARFISH_GENE_PRIO_CACHE_ENABLED:
+        yield from _prioritize_genes_cached(entrez_ids, hpo_terms, prio_algorithm, logging)
+    else:
+        yield from _prioritize_genes_uncached(entrez_ids, hpo_terms, prio_algorithm, logging)
+
+
+def _prioritize_genes_uncached(entrez_ids, hpo_terms, prio_algorithm, logging):
     if prio_algorithm == "CADA":
         logging("Prioritize genes with CADA ...")
         yield from prio_cada(hpo_terms)
@@ -915,6 +1173,114 @@ def prioritize_genes(entrez_ids, hpo_terms, prio_algorithm, logging=lambda text:
         yield from prio_exomiser(entrez_ids, hpo_terms, prio_algorithm)
 
 
+#: Cached gene scores are only marked as used again after this time to save writes.
+GENE_PRIO_CACHE_TOUCH_INTERVAL = timedelta(hours=1)
+
+
+def _gene_prio_data_version(prio_algorithm):
+    """Return the configured data version of the prioritizer for ``prio_algorithm``."""
+    if prio_algorithm == "CADA":
+        return settings.VARFISH_CADA_DATA_VERSION
+    else:
+        return settings.VARFISH_EXOMISER_PRIORITISER_DATA_VERSION
+
+
+def _prioritize_genes_cached(entrez_ids, hpo_terms, prio_algorithm, logging):
+    if prio_algorithm == "CADA":
+        if not settings.VARFISH_ENABLE_CADA or not hpo_terms:
+            return
+    elif not settings.VARFISH_ENABLE_EXOMISER_PRIORITISER or not entrez_ids or not hpo_terms:
+        return
+
+    cache_key = {
+        "prio_algorithm": prio_algorithm,
+        "hpo_terms": ",".join(sorted(set(hpo_terms))),
+        "data_version": _gene_prio_data_version(prio_algorithm),
+    }
+    cached = GenePrioritizationScoreCache.objects.filter(**cache_key)
+    now = timezone.now()
+
+    if prio_algorithm == "CADA":
+        # CADA scores all genes at once, so any cached entry means the HPO term set is covered.
+        uncached = []
+        cached = list(cached)
+        if not cached:
+            logging("Prioritize genes with CADA ...")
+            fetched = list(prio_cada(hpo_terms))
+        else:
+            fetched = []
+    else:
+        gene_ids = sorted(set(str(entrez_id) for entrez_id in entrez_ids if entrez_id))
+        cached = list(cached.filter(gene_id__in=gene_ids))
+        cached_gene_ids = {entry.gene_id for entry in cached}
+        uncached = [gene_id for gene_id in gene_ids if gene_id not in cached_gene_ids]
+        if uncached:
+            logging("Prioritize {} genes with Exomiser ...".format(len(uncached)))
+            fetched = list(prio_exomiser(uncached, hpo_terms, prio_algorithm))
+        else:
+            fetched = []
+    logging(
+        "Gene prioritization cache: {} genes cached, {} genes retrieved".format(
+            len(cached), len(fetched)
+        )
+    )
+    touched = [
+        entry.id for entry in cached if entry.last_used < now - GENE_PRIO_CACHE_TOUCH_INTERVAL
+    ]
+    if touched:
+        GenePrioritizationScoreCache.objects.filter(id__in=touched).update(last_used=now)
+
+    # Store API results in cache, including the genes that the prioritizer returned no score for.
+    fetched_gene_ids = {str(gene_id) for gene_id, _, _, _ in fetched}
+    GenePrioritizationScoreCache.objects.bulk_create(
+        [
+            GenePrioritizationScoreCache(
+                gene_id=str(gene_id),
+                gene_symbol=gene_symbol or "",
+                score=score,
+                priority_type=priority_type,
+                **cache_key,
+            )
+            for gene_id, gene_symbol, score, priority_type in fetched
+        ]
+        + [
+            GenePrioritizationScoreCache(gene_id=gene_id, score=None, **cache_key)
+            for gene_id in uncached
+            if gene_id not in fetched_gene_ids
+        ],
+        ignore_conflicts=True,
+    )
+
+    for entry in cached:
+        if entry.score is not None:
+            yield entry.gene_id, entry.gene_symbol, entry.score, entry.priority_type
+    yield from fetched
+
+
+def clear_gene_prioritization_score_cache():
+    """Remove outdated and unused entries from ``GenePrioritizationScoreCache``.
+
+    Entries whose data version differs from the configured one of their prioritizer are removed,
+    then the entries not used for ``settings.VARFISH_GENE_PRIO_CACHE_MAX_AGE_DAYS`` days.  Return
+    the number of removed entries.
+    """
+    removed = (
+        GenePrioritizationScoreCache.objects.filter(prio_algorithm="CADA")
+        .exclude(data_version=_gene_prio_data_version("CADA"))
+        .delete()[0]
+    )
+    removed += (
+        GenePrioritizationScoreCache.objects.exclude(prio_algorithm="CADA")
+        .exclude(data_version=_gene_prio_data_version(None))
+        .delete()[0]
+    )
+    max_age = timedelta(days=settings.VARFISH_GENE_PRIO_CACHE_MAX_AGE_DAYS)
+    removed += GenePrioritizationScoreCache.objects.filter(
+        last_used__lt=timezone.now() - max_age
+    ).delete()[0]
+    return removed
+
+
 def prioritize_genes_gm(gm_response, logging=lambda text: True):
     """Perform gene prioritization query.
 
@@ -941,7 +1307,7 @@ def prio_exomiser(entrez_ids, hpo_terms, prio_algorithm):
             "hiphive-mouse": ("hiphive", ["human", "mouse"]),
         }
         prio_algorithm, prio_params = algo_params.get(prio_algorithm, (prio_algorithm, []))
-        res = requests.post(
+        res = get_client("exomiser").post(
             settings.VARFISH_EXOMISER_PRIORITISER_API_URL,
             json={
                 "phenotypes": sorted(set(hpo_terms)),
@@ -949,6 +1315,7 @@ def prio_exomiser(entrez_ids, hpo_terms, prio_algorithm):
                 "prioritiser": prio_algorithm,
                 "prioritiserParams": ",".join(prio_params),
             },
+            idempotent=True,
         )
         if not res.status_code == 200:
             raise ConnectionError(
@@ -969,9 +1336,10 @@ def prio_cada(hpo_terms):
     if not settings.VARFISH_ENABLE_CADA or not hpo_terms:
         return
     try:
-        res = requests.post(
+        res = get_client("cada").post(
             settings.VARFISH_CADA_REST_API_URL,
             json=sorted(set(hpo_terms)),
+            idempotent=True,
         )
 
         if not res.status_code == 200:
@@ -999,9 +1367,10 @@ def prioritize_genes_pedia(
 
 def get_pedia_scores(inputJson):
     try:
-        res = requests.post(
+        res = get_client("pedia").post(
             settings.VARFISH_PEDIA_REST_API_URL,
             json=inputJson,
+            idempotent=True,
         )
 
         if not res.status_code == 200:
@@ -1055,23 +1424,41 @@ class VariantScoresBase:
             raise NotImplementedError("Please set ``cache_model``")
         return self.cache_model
 
+    def get_data_version(self):
+        return annotation_data_version(self.score_type)
+
     def _get_cached_and_uncached_variants(self):
-        cached = []
-        uncached = []
-        for variant in self.variants:
-            res = self.get_cache_model().objects.filter(
-                chromosome=variant[0],
-                start=variant[1],
-                reference=variant[2],
-                alternative=variant[3],
+        """Return the cache entries of the current data version and the uncached variants."""
+        fields = ("chromosome", "start", "reference", "alternative")
+        now = timezone.now()
+        found = {}
+        for offset in range(0, len(self.variants), ANNOTATION_CACHE_CHUNK_SIZE):
+            condition = reduce(
+                operator.or_,
+                (
+                    Q(**dict(zip(fields, variant)))
+                    for variant in self.variants[offset : offset + ANNOTATION_CACHE_CHUNK_SIZE]
+                ),
             )
-            if res:
-                cached.append(res.first())
-            else:
-                uncached.append(variant)
-        return cached, uncached
+            for entry in (
+                self.get_cache_model()
+                .objects.filter(condition, data_version=self.get_data_version())
+                .order_by("id")
+            ):
+                found.setdefault(tuple(getattr(entry, field) for field in fields), entry)
+        touched = [
+            entry.id
+            for entry in found.values()
+            if entry.last_used < now - ANNOTATION_CACHE_TOUCH_INTERVAL
+        ]
+        if touched:
+            self.get_cache_model().objects.filter(id__in=touched).update(last_used=now)
+        uncached = [variant for variant in self.variants if tuple(variant) not in found]
+        return list(found.values()), uncached
 
     def _cache_results(self, results):
+        for result in results:
+            result.data_version = self.get_data_version()
         self.get_cache_model().objects.bulk_create(results)
 
     def _build_yield_dict(self, record, score, info):
@@ -1102,8 +1489,15 @@ class VariantScoresUmd(VariantScoresBase):
 
         cached, uncached = self._get_cached_and_uncached_variants()
 
+        # Yield cached results
+        for item in cached:
+            item = model_to_dict(item)
+            yield self._build_yield_dict(item, item["pathogenicity_score"], {})
+        if not uncached:
+            return
+
         try:
-            res = requests.get(
+            res = get_client("umd").get(
                 settings.VARFISH_UMD_REST_API_URL,
                 params=dict(
                     batch=",".join(["_".join(map(str, var)) for var in uncached]), token=token
@@ -1137,10 +1531,6 @@ class VariantScoresUmd(VariantScoresBase):
             "pathogenicity_score",
             "conclusion",
         ]
-        # Yield cached results
-        for item in cached:
-            item = model_to_dict(item)
-            yield self._build_yield_dict(item, item["pathogenicity_score"], {})
         # Yield API results
         result = []
         for line in res.text.split("\n"):
@@ -1196,9 +1586,10 @@ class VariantScoresMutationTaster(VariantScoresBase):
     def _variant_scores_mutationtaster_loop(self, batch):
         batch_str = ",".join("{}:{}{}>{}".format(*var) for var in batch)
         try:
-            res = requests.post(
+            res = get_client("mutationtaster").post(
                 settings.VARFISH_MUTATIONTASTER_REST_API_URL,
                 dict(format="tsv", debug="0", variants=batch_str),
+                idempotent=True,
             )
         except requests.ConnectionError:
             raise ConnectionError(
@@ -1344,9 +1735,16 @@ class VariantScoresCadd(VariantScoresBase):
         cached, uncached = self._get_cached_and_uncached_variants()
         uncached = uncached[: settings.VARFISH_CADD_MAX_VARS]
 
+        # Yield cached results
+        for item in cached:
+            item = model_to_dict(item)
+            yield self._build_yield_dict(item, item["scores"][1], {})
+        if not uncached:
+            return
+
         # TODO: properly test
         try:
-            res = requests.post(
+            res = get_client("cadd").post(
                 settings.VARFISH_CADD_REST_API_URL + "/annotate/",
                 json={
                     "genome_build": self.genomebuild,
@@ -1369,8 +1767,10 @@ class VariantScoresCadd(VariantScoresBase):
         bgjob_uuid = res.json().get("uuid")
         while True:
             try:
-                res = requests.post(
-                    settings.VARFISH_CADD_REST_API_URL + "/result/", json={"bgjob_uuid": bgjob_uuid}
+                res = get_client("cadd").post(
+                    settings.VARFISH_CADD_REST_API_URL + "/result/",
+                    json={"bgjob_uuid": bgjob_uuid},
+                    idempotent=True,
                 )
             except requests.ConnectionError:
                 raise ConnectionError(
@@ -1392,11 +1792,6 @@ class VariantScoresCadd(VariantScoresBase):
             else:  # status == finished
                 break
 
-        # Yield cached results
-        for item in cached:
-            item = model_to_dict(item)
-            yield self._build_yield_dict(item, item["scores"][1], {})
-
         result = []
         for var, scores in res.json().get("scores", {}).items():
             chrom, pos, ref, alt = var.split("-")
@@ -6,9 +6,13 @@ import uuid as uuid_object
 from bgjobs.models import BackgroundJob, JobModelMessageMixin
 from django.contrib.postgres.fields import ArrayField
 from django.db import models
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
 from django.urls import reverse
+from projectroles.models import AppSetting
 
 from varfish.utils import JSONField
+from variants.models.case import Case
 from variants.models.projectroles import Project
 from variants.models.variants import SmallVariantSet
 
@@ -148,6 +152,95 @@ class ProjectVariantStats(models.Model):
     )
 
 
+class ProjectQcOverview(models.Model):
+    """Precomputed QC overview document of a project as served by ``CaseListQcStatsApiView``.
+
+    Built when the project-wide variant statistics are rebuilt (or on first access) and
+    removed when case variant statistics are rebuilt, a pedigree of the project changes, or the
+    pedigree sex check is toggled.  Importing or deleting variants rebuilds or removes the case
+    variant statistics, so this covers changes of the variant sets.
+    """
+
+    #: DateTime of creation.
+    date_created = models.DateTimeField(auto_now_add=True, help_text="DateTime of creation")
+
+    #: The related ``Project``.
+    project = models.OneToOneField(
+        Project,
+        null=False,
+        related_name="qc_overview",
+        help_text="The project of the QC overview",
+        on_delete=models.CASCADE,
+    )
+
+    #: The QC overview document.
+    data = JSONField(help_text="The QC overview document")
+
+    #: Entity tag of the document for conditional requests.
+    etag = models.CharField(max_length=64, help_text="Entity tag of the QC overview document")
+
+
+def invalidate_project_qc_overview(**filters):
+    """Remove the stored QC overviews matching the given filters."""
+    ProjectQcOverview.objects.filter(**filters).delete()
+
+
+@receiver(pre_save, sender=Case)
+def invalidate_project_qc_overview_on_pedigree_change(
+    sender, instance, update_fields=None, **kwargs
+):
+    """Invalidate the QC overview when a case is created or its pedigree changes.
+
+    Saves that do not write the pedigree are skipped, otherwise the pedigree is compared against
+    the stored one.
+    """
+    if update_fields is not None and "pedigree" not in update_fields:
+        return
+    if "pedigree" in instance.get_deferred_fields():
+        return
+    if (
+        instance._state.adding
+        or not Case.objects.filter(pk=instance.pk, pedigree=instance.pedigree).exists()
+    ):
+        invalidate_project_qc_overview(project_id=instance.project_id)
+
+
+@receiver(post_delete, sender=Case)
+def invalidate_project_qc_overview_on_case_delete(sender, instance, **kwargs):
+    """Invalidate the QC overview when a case is deleted."""
+    invalidate_project_qc_overview(project_id=instance.project_id)
+
+
+@receiver(post_save, sender=CaseVariantStats)
+@receiver(post_delete, sender=CaseVariantStats)
+def invalidate_project_qc_overview_on_case_stats_change(sender, instance, **kwargs):
+    """Invalidate the QC overview when case variant statistics are rebuilt."""
+    invalidate_project_qc_overview(project__case__smallvariantset=instance.variant_set_id)
+
+
+@receiver(post_save, sender=ProjectVariantStats)
+@receiver(post_delete, sender=ProjectVariantStats)
+def invalidate_project_qc_overview_on_project_stats_change(sender, instance, **kwargs):
+    """Invalidate the QC overview when project variant statistics are rebuilt."""
+    invalidate_project_qc_overview(project_id=instance.project_id)
+
+
+@receiver(post_save, sender=AppSetting)
+@receiver(post_delete, sender=AppSetting)
+def invalidate_project_qc_overview_on_setting_change(sender, instance, **kwargs):
+    """Invalidate the QC overview when the pedigree sex check is toggled or reset.
+
+    The sex errors in the overview are empty if the check is disabled.
+    """
+    if (
+        instance.name == "disable_pedigree_sex_check"
+        and instance.project_id
+        and instance.app_plugin_id
+        and instance.app_plugin.name == "variants"
+    ):
+        invalidate_project_qc_overview(project_id=instance.project_id)
+
+
 class ProjectRelatedness(BaseRelatedness):
     """Store relatedness information between two donors in a case/``Case``.."""
 
@@ -11,6 +11,7 @@ from django.db import models
 from django.utils.timezone import localtime
 import requests
 
+from varfish.backend_client import get_client
 from variants.models.variants import SmallVariant
 
 User = get_user_model()
@@ -43,7 +44,7 @@ class GetGeneSymbolsMixin:
             alternative=self.alternative,
         )
         try:
-            res = requests.request(method="get", url=url)
+            res = get_client("mehari").get(url)
             if not res.status_code == 200:
                 raise ConnectionError(
                     "ERROR: Server responded with status {} and message {}".format(
@@ -149,6 +149,17 @@ class ProjectAppPlugin(ProjectAppPluginPoint):
                 "The recommended value is <code>2.0-2.9</code>"
             ),
         },
+        "query_profiling_enabled": {
+            "scope": SODAR_CONSTANTS["APP_SETTING_SCOPE_PROJECT"],
+            "type": "BOOLEAN",
+            "default": False,
+            "label": "Profile filter queries",
+            "description": (
+                "Record the SQL, query plans, and stage timings of filter queries for diagnosing "
+                "slow queries.  Note that each query is run once more with "
+                "<code>EXPLAIN ANALYZE</code> for this."
+            ),
+        },
     }
 
     #: Additional columns to display for the projects.
@@ -264,9 +275,8 @@ class ProjectAppPlugin(ProjectAppPluginPoint):
         if not search_type:
             cases = Case.objects.find(search_terms, keywords)
             items = [case for case in cases if user.has_perm("variants.view_data", case.project)]
-            items.sort(key=lambda x: x.name.lower())
         elif search_type == "case":
-            items = Case.objects.find(search_terms, keywords).order_by("name")
+            items = Case.objects.find(search_terms, keywords)
 
         return {"all": {"title": "Cases", "search_types": ["case"], "items": items}}
 
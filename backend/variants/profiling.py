@@ -0,0 +1,88 @@
+"""Opt-in profiling of small variant filter jobs.
+
+Profiling is enabled per project with the ``query_profiling_enabled`` app setting.  The filter job
+then records the compiled SQL and ``EXPLAIN (ANALYZE, BUFFERS)`` output of its queries and the
+wall time and row counts of its stages in a ``SmallVariantQueryProfile`` next to the result set.
+"""
+
+import contextlib
+import time
+
+from projectroles.app_settings import AppSettingAPI
+
+from variants.models.queries import SmallVariantQueryProfile
+
+_app_settings = AppSettingAPI()
+
+#: The fields of the ``FilterProgress`` stages stored in the profile.
+STAGE_FIELDS = ("name", "state", "done", "total", "elapsed_seconds")
+
+
+def is_profiling_enabled(project):
+    """Return whether filter jobs in ``project`` are profiled."""
+    return bool(_app_settings.get("variants", "query_profiling_enabled", project=project))
+
+
+class QueryProfiler:
+    """Collect the statements and stage timings of one filter job.
+
+    A disabled profiler records nothing so the calls can stay in place.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        #: The statements with SQL and query plan.
+        self.statements = []
+        #: Accumulated timings of the steps that are run repeatedly, by name.
+        self.timings = {}
+
+    def explain(self, name, query, kwargs, rows=None):
+        """Record the SQL and query plan of ``query``, a ``CasePrefetchQuery`` run with ``kwargs``.
+
+        ``rows`` is the number of rows the query returned when run for the job.  The parameter
+        values are filled into the SQL, so it can be run as is.
+        """
+        if not self.enabled:
+            return
+        started = time.perf_counter()
+        sql, plan = query.explain(dict(kwargs))
+        self.statements.append(
+            {
+                "name": name,
+                "sql": sql,
+                "plan": plan,
+                "rows": rows,
+                "explain_seconds": time.perf_counter() - started,
+            }
+        )
+
+    @contextlib.contextmanager
+    def timed(self, name, rows=1):
+        """Add the wall time of the block and its ``rows`` to the timing ``name``."""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            timing = self.timings.setdefault(
+                name, {"name": name, "calls": 0, "rows": 0, "elapsed_seconds": 0.0}
+            )
+            timing["calls"] += 1
+            timing["rows"] += rows
+            timing["elapsed_seconds"] += time.perf_counter() - started
+
+    def save(self, result_set, progress):
+        """Store the profile for ``result_set`` with the stages from the job's ``progress``."""
+        if not self.enabled:
+            return None
+        stages = [
+            {field: stage.get(field) for field in STAGE_FIELDS}
+            for stage in progress.get("stages", [])
+        ]
+        return SmallVariantQueryProfile.objects.create(
+            result_set=result_set,
+            stages=stages + list(self.timings.values()),
+            statements=self.statements,
+        )
@@ -1,16 +1,19 @@
 # Note that we are using a lot of ``# noqa: E711`` here as for SQLAlchemy queries we need to test for NULL
 # with ``COLUMN == None`` and for True-ness with ``COLUMN == True`` etc.
 
+import contextlib
 from itertools import chain
 import typing
 
 import attr
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
-from sqlalchemy import Table, column, delete, literal_column, true, tuple_
+from sqlalchemy import Table, column, delete, literal_column, true
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.dialects.postgresql.array import OVERLAP
-from sqlalchemy.sql import and_, cast, func, not_, or_, select, union
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import and_, cast, func, not_, or_, select, tuple_, union
+from sqlalchemy.sql.expression import ClauseElement, Executable
 from sqlalchemy.sql.functions import GenericFunction, ReturnTypeFromArgs
 from sqlalchemy.types import VARCHAR, Float, Integer
 import sqlparse
@@ -59,6 +62,20 @@ class _ArrayAppend(GenericFunction):
     type = ARRAY(VARCHAR())
 
 
+class _ExplainAnalyze(Executable, ClauseElement):
+    """``EXPLAIN (ANALYZE, BUFFERS)`` of a statement, yields one row per line of the plan."""
+
+    inherit_cache = False
+
+    def __init__(self, stmt):
+        self.stmt = stmt
+
+
+@compiles(_ExplainAnalyze, "postgresql")
+def _compile_explain_analyze(element, compiler, **kwargs):
+    return "EXPLAIN (ANALYZE, BUFFERS) " + compiler.process(element.stmt, **kwargs)
+
+
 @attr.s(frozen=True, auto_attribs=True)
 class QueryParts:
     fields: typing.List[typing.Any] = attr.Factory(list)
@@ -1733,6 +1750,17 @@ def _chunked(arr, max_size):
 class CasePrefetchQuery:
     builder = QueryPartsBuilder
 
+    #: Columns that give a unique order of the result rows, used for paging with ``run_page()``.
+    KEYSET_COLUMNS = (
+        "chromosome_no",
+        "start",
+        "end",
+        "reference",
+        "alternative",
+        "family_name",
+        "id",
+    )
+
     def __init__(self, case_or_cases, engine, query_id=None):
         try:
             self.cases = list(iter(case_or_cases))
@@ -1741,7 +1769,8 @@ class CasePrefetchQuery:
         self.engine = engine
         self.query_id = query_id
 
-    def run(self, kwargs):
+    def build_stmt(self, kwargs):
+        """Return the query statement, ordered by coordinate."""
         order_by = [
             column("chromosome_no"),
             column("start"),
@@ -1765,7 +1794,15 @@ class CasePrefetchQuery:
             else:  # compound recessive not in kwargs or disabled
                 combiner = DefaultCombiner(case, self.builder, self.query_id)
             stmts.append(combiner.to_stmt(kwargs))
-        stmt = union(*stmts).order_by(*order_by)
+        return union(*stmts).order_by(*order_by)
+
+    def run(self, kwargs, stream_results=False):
+        """Run the query, ordered by coordinate.
+
+        With ``stream_results``, rows are fetched from a server-side cursor as they are consumed.
+        This requires the query to be run inside a transaction.
+        """
+        stmt = self.build_stmt(kwargs)
         if settings.DEBUG:
             print(
                 "\n"
@@ -1773,8 +1810,37 @@ class CasePrefetchQuery:
                     stmt.compile(self.engine).string, reindent=True, keyword_case="upper"
                 )
             )
+        engine = self.engine
+        if stream_results:
+            engine = engine.execution_options(stream_results=True)
+        return engine.execute(stmt)
+
+    def run_page(self, kwargs, limit, after=None):
+        """Run the query for one page of at most ``limit`` rows, ordered by ``KEYSET_COLUMNS``.
+
+        ``after`` holds the ``KEYSET_COLUMNS`` values of the last row of the previous page.  Each
+        page is a separate, bounded query, so no cursor stays open between pages.
+        """
+        rows = self.build_stmt(kwargs).order_by(None).alias("page_rows")
+        keys = [rows.c[name] for name in self.KEYSET_COLUMNS]
+        stmt = select([rows]).order_by(*keys).limit(limit)
+        if after is not None:
+            stmt = stmt.where(tuple_(*keys) > tuple_(*after))
         return self.engine.execute(stmt)
 
+    def explain(self, kwargs):
+        """Run the query with ``EXPLAIN (ANALYZE, BUFFERS)``.
+
+        Return the SQL with the parameter values filled in by the database driver and the lines of
+        the query plan.  Note that the query is executed once more for this.
+        """
+        stmt = self.build_stmt(kwargs)
+        plan = [row[0] for row in self.engine.execute(_ExplainAnalyze(stmt))]
+        compiled = stmt.compile(self.engine, compile_kwargs={"render_postcompile": True})
+        with self.engine.connect() as conn, contextlib.closing(conn.connection.cursor()) as cursor:
+            sql = cursor.mogrify(compiled.string, compiled.params)
+        return sql.decode(), plan
+
 
 class CaseLoadPrefetchedQuery(CasePrefetchQuery):
     builder = CaseLoadPrefetchedQueryPartsBuilder
@@ -1857,19 +1923,6 @@ class DeleteStructuralVariantsQuery:
 # Queries for pulling all user annotation for one or more cases from the database.
 
 
-@attr.s(auto_attribs=True, frozen=True)
-class _VariantInCase:
-    """Identifies a variant in a case."""
-
-    id: int
-    case_id: int
-    release: str
-    chromosome: str
-    start: int
-    reference: str
-    alternative: str
-
-
 @attr.s(auto_attribs=True, frozen=True)
 class AnnotatedSmallVariants:
     """Helper struct that contains small variants and their annotation only."""
@@ -1883,7 +1936,11 @@ class AnnotatedSmallVariants:
 class SmallVariantUserAnnotationQuery:
     """Query for all user annotated variants of one case, multiple cases, or all within a project."""
 
-    KEYS = ["id", "case_id", "release", "chromosome", "start", "reference", "alternative"]
+    #: Columns identifying a variant in a case, ``case_id`` is the partition key of ``SmallVariant``.
+    KEYS = ["case_id", "release", "chromosome", "start", "reference", "alternative"]
+
+    #: The user annotation models.
+    ANNOTATION_MODELS = [SmallVariantFlags, SmallVariantComment, AcmgCriteriaRating]
 
     def __init__(self, engine):
         #: The Aldjemy engine to use.
@@ -1898,63 +1955,33 @@ class SmallVariantUserAnnotationQuery:
         elif cases:
             case_ids = [c.id for c in cases]
         else:
-            case_ids = [c.id for c in Case.objects.filter(project=project)]
+            case_ids = list(Case.objects.filter(project=project).values_list("id", flat=True))
         return self._query(case_ids)
 
     def _query(self, case_ids: typing.List[int]):
-        def chunks(lst, n=50):
-            """Yield successive n-sized chunks from lst."""
-            for i in range(0, len(lst), n):
-                yield lst[i : i + n]
-
-        result_flags = self._query_model(SmallVariantFlags, case_ids)
-        result_comments = self._query_model(SmallVariantComment, case_ids)
-        result_ratings = self._query_model(AcmgCriteriaRating, case_ids)
-        variant_keys = list(
-            sorted(
-                set(map(self._variant_keys, result_flags))
-                | set(map(self._variant_keys, result_comments))
-                | set(map(self._variant_keys, result_ratings))
-            )
-        )
-
-        small_var_ids = []
-        for variant_keys_chunk in chunks(variant_keys):
-            keys = ["case_id", "release", "chromosome", "start", "reference", "alternative"]
-            stmt = (
-                select([SmallVariant.sa.id])
-                .select_from(SmallVariant.sa.table)
-                .where(
-                    tuple_(*[getattr(SmallVariant.sa, key) for key in keys]).in_(
-                        [[getattr(k, key) for key in keys] for k in variant_keys_chunk]
-                    )
-                )
-            )
-            small_var_ids += [rec.id for rec in self.engine.execute(stmt)]
-
-        flags_ids = [x["id"] for x in result_flags]
-        comments_ids = [x["id"] for x in result_comments]
-        ratings_ids = [x["id"] for x in result_ratings]
-
         return AnnotatedSmallVariants(
-            small_variants=list(SmallVariant.objects.filter(id__in=small_var_ids)),
-            small_variant_flags=list(SmallVariantFlags.objects.filter(id__in=flags_ids)),
+            small_variants=list(self._query_small_variants(case_ids)),
+            small_variant_flags=list(SmallVariantFlags.objects.filter(case_id__in=case_ids)),
             # for some reason, ordering in the model has no effect.
             small_variant_comments=list(
-                SmallVariantComment.objects.filter(id__in=comments_ids).order_by("date_created")
+                SmallVariantComment.objects.filter(case_id__in=case_ids).order_by("date_created")
             ),
-            acmg_criteria_rating=list(AcmgCriteriaRating.objects.filter(id__in=ratings_ids)),
+            acmg_criteria_rating=list(AcmgCriteriaRating.objects.filter(case_id__in=case_ids)),
         )
 
-    def _query_model(self, model: typing.Any, case_ids: typing.List[int]):
-        stmt = (
-            select([getattr(model.sa, key) for key in self.KEYS])
-            .select_from(model.sa.table)
-            .where(model.sa.case_id.in_(case_ids))
-        )
-        result = self.engine.execute(stmt)
-        return list(map(dict, result))
+    def _query_small_variants(self, case_ids: typing.List[int]):
+        """Return the small variants with a user annotation in one of the cases.
 
-    def _variant_keys(self, record: typing.Any):
-        """Extract identifier of the given variant in the given case."""
-        return _VariantInCase(**{key: record[key] for key in self.KEYS})
+        The distinct variant keys of all annotation tables are joined to ``SmallVariant`` on
+        ``case_id`` and coordinates in one statement.
+        """
+        keys = ", ".join(self.KEYS)
+        annotated = " UNION ".join(
+            "SELECT %s FROM %s WHERE case_id = ANY(%%s)" % (keys, model._meta.db_table)
+            for model in self.ANNOTATION_MODELS
+        )
+        return SmallVariant.objects.raw(
+            "SELECT sv.* FROM %s AS sv JOIN (%s) AS annotated USING (%s) WHERE sv.case_id = ANY(%%s)"
+            % (SmallVariant._meta.db_table, annotated, keys),
+            [case_ids] * (len(self.ANNOTATION_MODELS) + 1),
+        )
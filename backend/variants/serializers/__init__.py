@@ -16,12 +16,14 @@ from rest_framework import serializers
 from clinvar.models import Clinvar
 from extra_annos.models import ExtraAnno, ExtraAnnoField
 from genepanels.models import expand_panels_in_gene_list
+from varfish.backend_client import get_client
 from variants.models import (
     AcmgCriteriaRating,
     SmallVariant,
     SmallVariantComment,
     SmallVariantFlags,
     SmallVariantQuery,
+    SmallVariantQueryProfile,
     SmallVariantQueryResultRow,
     SmallVariantQueryResultSet,
 )
@@ -62,7 +64,7 @@ def query_settings_validator(value):
         url_tpl = "{base_url}/genes/lookup?q={gene_list_joined}"
         url = url_tpl.format(base_url=base_url, gene_list_joined=",".join(proc_gene_list))
         try:
-            res = requests.request(method="get", url=url)
+            res = get_client("annonars").get(url)
             if not res.status_code == 200:
                 raise ConnectionError(
                     "ERROR: Server responded with status {} and message {}".format(
@@ -379,6 +381,8 @@ class SmallVariantForExtendedResultSerializer(serializers.Serializer):
 class SmallVariantQueryWithLogsSerializer(SmallVariantQuerySerializer):
     #: Log messages
     logs = serializers.SerializerMethodField()
+    #: Per-stage progress and timing of the filter job
+    progress = serializers.SerializerMethodField()
 
     def get_logs(self, obj) -> typing.List[str]:
         jobs = obj.filterbgjob_set.all()
@@ -391,6 +395,13 @@ class SmallVariantQueryWithLogsSerializer(SmallVariantQuerySerializer):
                 for log_entry in the_bg_job.log_entries.all()
             ]
 
+    def get_progress(self, obj) -> typing.Dict[str, typing.Any]:
+        jobs = obj.filterbgjob_set.all()
+        if not jobs:
+            return {}
+        else:
+            return jobs[0].progress
+
     class Meta:
         model = SmallVariantQuery
         fields = (
@@ -404,6 +415,7 @@ class SmallVariantQueryWithLogsSerializer(SmallVariantQuerySerializer):
             "query_settings_version_major",
             "query_settings_version_minor",
             "logs",
+            "progress",
         )
         read_only_fields = fields
 
@@ -438,6 +450,27 @@ class SmallVariantQueryResultSetSerializer(SODARModelSerializer):
         read_only_fields = fields
 
 
+class SmallVariantQueryProfileSerializer(SODARModelSerializer):
+    """Serializer for the ``SmallVariantQueryProfile`` model.
+
+    This serializer is only used in a read-only context.
+    """
+
+    #: UUID of the related result set
+    result_set = serializers.ReadOnlyField(source="result_set.sodar_uuid")
+
+    class Meta:
+        model = SmallVariantQueryProfile
+        fields = (
+            "sodar_uuid",
+            "date_created",
+            "result_set",
+            "stages",
+            "statements",
+        )
+        read_only_fields = fields
+
+
 class SmallVariantQueryResultRowSerializer(SODARModelSerializer):
     """Serializer for the ``SmallVariantQueryResultRow`` model **with** the paylaod.
 
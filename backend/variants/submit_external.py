@@ -5,7 +5,8 @@ import re
 
 from bs4 import BeautifulSoup
 from projectroles.plugins import get_backend_api
-import requests
+
+from varfish.backend_client import get_client
 
 from .file_export import CaseExporterVcf
 
@@ -43,7 +44,7 @@ def submit_distiller(job):
             files = {"filename": exporter.write_tmp_file()}
             job.add_log_entry("Done creating temporary VCF file.")
             job.add_log_entry("Submitting to MutationDistiller.org...")
-            response = requests.post(DISTILLER_POST_URL, data=data, files=files)
+            response = get_client("distiller").post(DISTILLER_POST_URL, data=data, files=files)
             job.add_log_entry("Done submitting to MutationDistiller.org")
         if not response.ok:
             job.mark_error("HTTP status code: {}".format(response.status_code))
@@ -109,7 +110,7 @@ def submit_cadd(job):
             files = {"file": exporter.write_tmp_file()}
             job.add_log_entry("Done creating temporary VCF file.")
             job.add_log_entry("Submitting to %s ..." % CADD_POST_URL)
-            response = requests.post(CADD_POST_URL, data=data, files=files)
+            response = get_client("cadd_submission").post(CADD_POST_URL, data=data, files=files)
             job.add_log_entry("Done submitting to %s" % CADD_POST_URL)
         if not response.ok:
             job.mark_error("HTTP status code: {}".format(response.status_code))
@@ -168,12 +169,12 @@ def submit_spanr(job):
         job.add_log_entry("Getting submission form for CSRF (security) token")
         text_input = _submit_spanr_make_text(job)
         job.add_log_entry("Getting submission form for CSRF (security) token")
-        session = requests.Session()
-        csrf_token = _submit_spanr_obtain_csrf_token(job, session, timeline, tl_event)
+        client = get_client("spanr")
+        csrf_token, cookies = _submit_spanr_obtain_csrf_token(job, client, timeline, tl_event)
         if not csrf_token:
             return  # bail out!
         data = {"csrf_token": (None, csrf_token), "text_input": (None, text_input)}
-        job_id = _submit_spanr_post(data, job, session, timeline, tl_event)
+        job_id = _submit_spanr_post(data, cookies, job, client, timeline, tl_event)
         if not job_id:
             return  # bail out!
         # Get target URL
@@ -191,13 +192,14 @@ def submit_spanr(job):
             tl_event.set_status("OK", "SPANR submission complete for {case_name}")
 
 
-def _submit_spanr_post(data, job, session, timeline, tl_event):
+def _submit_spanr_post(data, cookies, job, client, timeline, tl_event):
     job.add_log_entry("Submitting to %s..." % SPANR_POST_URL)
     for k in ("job_name", "chrom", "pos", "variant_id", "ref", "alt"):
         data[k] = (None, "")
-    response = session.post(
+    response = client.post(
         SPANR_POST_URL,
         files=data,
+        cookies=cookies,
         headers={
             "Referer": SPANR_POST_URL,
             "Origin": SPANR_POST_URL[:-1],
@@ -241,18 +243,19 @@ def _submit_spanr_make_text(job):
     return text_input
 
 
-def _submit_spanr_obtain_csrf_token(job, session, timeline, tl_event):
-    response = session.get(SPANR_POST_URL)
+def _submit_spanr_obtain_csrf_token(job, client, timeline, tl_event):
+    """Return the CSRF token and the session cookies to submit it with."""
+    response = client.get(SPANR_POST_URL)
     if not response.ok:
         job.mark_error("HTTP status code: {}".format(response.status_code))
         if timeline:
             tl_event.set_status("FAILED", "SPANR submission failed for {case_name}")
-        return None
+        return None, None
     soup = BeautifulSoup(response.text, "html.parser")
     tag = soup.find(id="csrf_token")
     if not tag:
         job.mark_error("Could not extract CSRF token")
         if timeline:
             tl_event.set_status("FAILED", "SPANR submission failed for {case_name}")
-        return None
-    return tag.attrs.get("value")
+        return None, None
+    return tag.attrs.get("value"), response.cookies
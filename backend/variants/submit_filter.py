@@ -1,9 +1,14 @@
+from concurrent.futures import ThreadPoolExecutor
 import contextlib
+import copy
 from decimal import Decimal
 import json
+import threading
+import time
 
 from django.conf import settings
-from django.db import transaction
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.utils import timezone
 from projectroles.plugins import get_backend_api
 
 from variants.forms import PATHO_SCORES_MAPPING
@@ -15,13 +20,124 @@ from variants.models import (
     prioritize_genes_pedia,
 )
 
+from .profiling import QueryProfiler
 from .queries import CasePrefetchQuery, ProjectPrefetchQuery
 
 
+class FilterProgress:
+    """Per-stage progress and timing of a filter job, stored in the job's ``progress`` field.
+
+    The field has the form ``{"percent": ..., "stages": [{"name": ..., ...}, ...]}`` with the
+    stages in the order they were registered.  Each stage has a ``state`` (``pending``,
+    ``running``, ``done``, or ``failed``), the ``done`` and ``total`` work items if known, its
+    ``percent``, and ``started`` and ``elapsed_seconds`` once it has started.  The overall
+    ``percent`` is the mean of the stage percentages.  Stages may be updated from several threads.
+
+    Progress recorded within a transaction would only become visible on commit, so it is written
+    through a separate database connection then.  With ``persist=False``, the progress is only
+    kept in ``job.progress``.
+    """
+
+    def __init__(self, job, persist=True):
+        self.job = job
+        self.job.progress = {"percent": 0.0, "stages": []}
+        self.persist = persist
+        self._stages = {}
+        self._started = {}
+        self._lock = threading.Lock()
+        #: Separate connection for writing the progress from within a transaction.
+        self._connection = None
+
+    def _update(self, name, **values):
+        with self._lock:
+            if name not in self._stages:
+                self._stages[name] = {
+                    "name": name,
+                    "state": "pending",
+                    "done": 0,
+                    "total": None,
+                    "percent": 0.0,
+                }
+                self.job.progress["stages"].append(self._stages[name])
+            stage = self._stages[name]
+            stage.update(values)
+            if name in self._started:
+                stage["elapsed_seconds"] = time.perf_counter() - self._started[name]
+            if stage["state"] == "done":
+                stage["percent"] = 100.0
+            elif stage["total"]:
+                stage["percent"] = round(100.0 * stage["done"] / stage["total"], 1)
+            self.job.progress["percent"] = round(
+                sum(stage["percent"] for stage in self._stages.values()) / len(self._stages), 1
+            )
+            if self.persist:
+                self._save(copy.deepcopy(self.job.progress))
+
+    def _save(self, progress):
+        """Write ``progress`` to the job, called with the lock held.
+
+        Within a transaction, the progress is written through the separate connection.  The row is
+        skipped there if it is locked, so that connection never waits for the transaction.  If the
+        row is locked or not visible (e.g., because the transaction created or changed it), the
+        progress is written within the transaction instead.
+        """
+        model = type(self.job)
+        if connection.in_atomic_block:
+            if self._connection is None:
+                self._connection = connections.create_connection(DEFAULT_DB_ALIAS)
+                self._connection.inc_thread_sharing()
+            table = self._connection.ops.quote_name(model._meta.db_table)
+            with self._connection.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE {table} SET progress = %s WHERE id = "
+                    "(SELECT id FROM {table} WHERE id = %s FOR UPDATE SKIP LOCKED)".format(
+                        table=table
+                    ),
+                    [json.dumps(progress), self.job.pk],
+                )
+                if cursor.rowcount:
+                    return
+        model.objects.filter(pk=self.job.pk).update(progress=progress)
+
+    def close(self):
+        """Close the separate connection, if any."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def add(self, *names):
+        """Register the pending stages ``names``."""
+        for name in names:
+            self._update(name)
+
+    def advance(self, name, done, total=None):
+        """Record that ``done`` of ``total`` work items of stage ``name`` are finished."""
+        if total is None:
+            self._update(name, done=done)
+        else:
+            self._update(name, done=done, total=total)
+
+    @contextlib.contextmanager
+    def stage(self, name, total=None):
+        """Context manager for running stage ``name`` with ``total`` work items."""
+        self._started[name] = time.perf_counter()
+        self._update(name, state="running", total=total, started=timezone.now().isoformat())
+        try:
+            yield self
+        except Exception:
+            self._update(name, state="failed")
+            raise
+        else:
+            self._update(name, state="done")
+        finally:
+            self.close()
+
+
 class FilterBase:
     """Base class for filtering and storing case query results."""
 
-    def __init__(self, job, variant_query):
+    def __init__(self, job, variant_query, profiler=None):
         """Constructor"""
         #: The ``StoreQueryResultsBgJob`` to use for logging.  Variants are obtained from ``case_or_project``.
         self.job = job
@@ -31,6 +147,16 @@ class FilterBase:
         self._alchemy_engine = None
         #: Is set in inherited classes
         self.assembled_query = self._get_assembled_query()
+        #: Progress of the stages of ``run()``.
+        self.progress = FilterProgress(job, persist=self.store_progress)
+        #: Records SQL and timings if profiling is enabled.
+        self.profiler = profiler or QueryProfiler(enabled=False)
+
+    #: Number of work items after which the progress of a stage is updated.
+    PROGRESS_INTERVAL = 1_000
+
+    #: Whether the job stores the progress in its ``progress`` field.
+    store_progress = True
 
     def _get_assembled_query(self):
         """Override me!"""
@@ -46,20 +172,61 @@ class FilterBase:
             self._alchemy_engine = get_engine()
         return self._alchemy_engine
 
-    def run(self, kwargs={}):
-        """Run filter query"""
+    def run(self, kwargs={}, later_stages=(), workers=None):
+        """Run filter query, store the results, and run the prioritization stages.
+
+        The gene phenotype, variant pathogenicity, and GestaltMatcher stages only depend on the
+        query results and run concurrently in up to ``workers`` threads (defaults to
+        ``settings.FILTER_STAGE_WORKERS``), PEDIA combines their scores and runs last.  When called
+        within a transaction, the stages run sequentially so their changes become part of it.
+
+        ``later_stages`` names the stages that the caller runs afterwards, they are registered
+        upfront so that the overall progress covers them.
+        """
+        stages = {
+            "gene_phenotype": self._prioritize_gene_phenotype,
+            "variant_pathogenicity": self._prioritize_variant_pathogenicity,
+            "gene_gm": self._prioritize_gene_gm,
+        }
+        self.progress.add("query", "store", *stages, "gene_pedia", *later_stages)
         # Patch query args, if available
         query_args = {**self.variant_query.query_settings, **kwargs}
         # Run query, store results, and run prioritization query.
         self.job.add_log_entry("Running database query ...")
-        with contextlib.closing(self.assembled_query.run(query_args)) as results:
-            _results = tuple(results)
+        with self.progress.stage("query"):
+            with contextlib.closing(self.assembled_query.run(query_args)) as results:
+                _results = tuple(results)
+        self.profiler.explain("query", self.assembled_query, query_args, rows=len(_results))
+        with self.progress.stage("store", total=len(_results)):
             self._store_results(_results)
-            self._prioritize_gene_phenotype(_results)
-            self._prioritize_variant_pathogenicity(_results)
-            self._prioritize_gene_gm(_results)
+        self._run_stages(stages, _results, workers)
+        with self.progress.stage("gene_pedia"):
             self._prioritize_gene_pedia(_results)
 
+    def _run_stages(self, stages, results, workers=None):
+        """Run the independent ``stages`` on ``results``, in parallel if possible."""
+        if workers is None:
+            workers = settings.FILTER_STAGE_WORKERS
+        if workers > 1 and len(stages) > 1 and not connection.in_atomic_block:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(self._run_stage_in_thread, name, func, results)
+                    for name, func in stages.items()
+                ]
+                for future in futures:
+                    future.result()
+        else:
+            for name, func in stages.items():
+                with self.progress.stage(name):
+                    func(results)
+
+    def _run_stage_in_thread(self, name, func, results):
+        try:
+            with self.progress.stage(name):
+                func(results)
+        finally:
+            connection.close()
+
     def _store_results(self, results):
         """Store results in ManyToMany field."""
         self.job.add_log_entry("Storing results ({} rows)...".format(len(results)))
@@ -183,10 +350,13 @@ class FilterBase:
                 scorer = scorer_factory.get_scorer(
                     self._get_genomebuild(), patho_score, variants, self.job.bg_job.user
                 )
-                for score in scorer.score():
+                self.progress.advance("variant_pathogenicity", 0, len(variants))
+                for i, score in enumerate(scorer.score(), 1):
                     getattr(
                         self.variant_query, "%svariantscores_set" % self.variant_query.query_type()
-                    ).create(**score),
+                    ).create(**score)
+                    if i % self.PROGRESS_INTERVAL == 0:
+                        self.progress.advance("variant_pathogenicity", i)
         except ConnectionError as e:
             self.job.add_log_entry(e)
 
@@ -212,6 +382,9 @@ class CaseFilter(FilterBase):
 class ProjectCasesFilter(FilterBase):
     """Class for storing query results for cases of a project."""
 
+    #: Project-wide jobs do not store their progress.
+    store_progress = False
+
     def _get_genomebuild(self):
         if self.job.cohort:
             cases = [
@@ -64,6 +64,16 @@ def clear_expired_exported_files(_self):
     file_export.clear_expired_exported_files()
 
 
+@app.task(bind=True)
+def clear_annotated_variant_cache(_self):
+    models.clear_annotated_variant_cache()
+
+
+@app.task(bind=True)
+def clear_gene_prioritization_score_cache(_self):
+    models.clear_gene_prioritization_score_cache()
+
+
 @app.task(bind=True)
 def create_queryresultset(_self, case_uuid, project_uuid, all_):
     utils.create_queryresultset(case_uuid, project_uuid, all_)
@@ -138,3 +148,11 @@ def setup_periodic_tasks(sender, **_kwargs):
     )
     # Clear out kiosk cases nightly (lasting period is defined in signature function)
     sender.add_periodic_task(schedule=crontab(hour=2, minute=22), sig=clear_old_kiosk_cases.s())
+    # Clear outdated and least recently used annotations nightly.
+    sender.add_periodic_task(
+        schedule=crontab(hour=3, minute=33), sig=clear_annotated_variant_cache.s()
+    )
+    # Clear outdated and unused gene prioritization scores nightly.
+    sender.add_periodic_task(
+        schedule=crontab(hour=3, minute=44), sig=clear_gene_prioritization_score_cache.s()
+    )
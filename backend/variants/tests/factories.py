@@ -44,6 +44,7 @@ from ..models import (
     SmallVariantComment,
     SmallVariantFlags,
     SmallVariantQuery,
+    SmallVariantQueryProfile,
     SmallVariantQueryResultRow,
     SmallVariantQueryResultSet,
     SmallVariantSet,
@@ -825,6 +826,21 @@ class SmallVariantQueryResultSetFactory(factory.django.DjangoModelFactory):
     result_row_count = 0
 
 
+class SmallVariantQueryProfileFactory(factory.django.DjangoModelFactory):
+    """Factory for ``SmallVariantQueryProfile`` model."""
+
+    class Meta:
+        model = SmallVariantQueryProfile
+
+    result_set = factory.SubFactory(SmallVariantQueryResultSetFactory)
+    stages = factory.LazyFunction(
+        lambda: [{"name": "query", "calls": 1, "rows": 0, "elapsed_seconds": 0.1}]
+    )
+    statements = factory.LazyFunction(
+        lambda: [{"name": "query", "sql": "SELECT 1", "plan": ["Result"], "rows": 0}]
+    )
+
+
 class SmallVariantQueryResultRowFactory(factory.django.DjangoModelFactory):
     """Factory for ``SmallVariantQueryResultRow`` model."""
 
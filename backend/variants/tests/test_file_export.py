@@ -4,7 +4,9 @@ from datetime import timedelta
 import gzip
 import io
 import json
+import os
 import tempfile
+from types import SimpleNamespace
 from unittest.mock import patch
 
 from bgjobs.models import BackgroundJob
@@ -13,6 +15,9 @@ from django.conf import settings
 from django.utils import timezone
 import openpyxl
 from projectroles.models import Project
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pysam
 from requests_mock import Mocker
 from test_plus.test import TestCase
 from timeline.models import TimelineEvent
@@ -29,7 +34,15 @@ from variants.tests.factories import (
 )
 
 from .. import file_export
-from ..models import Case, CaseAwareProject, ExportFileBgJob, ExportProjectCasesFileBgJob
+from ..models import (
+    AnnotatedVariantCache,
+    CaddPathogenicityScoreCache,
+    Case,
+    CaseAwareProject,
+    ExportFileBgJob,
+    ExportProjectCasesFileBgJob,
+    clear_annotated_variant_cache,
+)
 
 
 class MehariMockerMixin:
@@ -459,6 +472,88 @@ class CaseExporterTest(MehariMockerMixin, AnnonarsMockerMixin, ExportTestBase):
             )
         self.assertEquals(content[3], "")
 
+    @patch("django.conf.settings.VARFISH_BACKEND_URL_MEHARI", "https://mehari.com")
+    @patch("django.conf.settings.VARFISH_BACKEND_URL_ANNONARS", "https://annonars.com")
+    @Mocker()
+    def test_export_transcripts_cached(self, mock_):
+        self._set_mehari_mocker(mock_)
+        self._set_annonars_mocker(mock_)
+        self.export_job.query_args["database_select"] = "refseq"
+        with file_export.CaseExporterTsv(self.export_job, self.export_job.case) as exporter:
+            first = exporter.generate()
+        mehari_calls = [r for r in mock_.request_history if r.hostname == "mehari.com"]
+        self.assertEqual(len(mehari_calls), 3)
+        self.assertEqual(AnnotatedVariantCache.objects.filter(source="mehari").count(), 3)
+        # The second export is served from the cache.
+        with file_export.CaseExporterTsv(self.export_job, self.export_job.case) as exporter:
+            second = exporter.generate()
+        mehari_calls = [r for r in mock_.request_history if r.hostname == "mehari.com"]
+        self.assertEqual(len(mehari_calls), 3)
+        self.assertEqual(first, second)
+
+    @patch("django.conf.settings.VARFISH_ENABLE_CADD", True)
+    @patch("django.conf.settings.VARFISH_CADD_REST_API_URL", "https://cadd.com")
+    @Mocker()
+    def test_fetch_variant_scores_cached(self, mock_):
+        mock_.post(
+            "https://cadd.com/annotate/",
+            status_code=200,
+            text=json.dumps({"uuid": "xxxxxxxx-xxxx-xxxx-xxxxxxxxxxxx"}),
+        )
+        mock_.post(
+            "https://cadd.com/result/",
+            status_code=200,
+            text=json.dumps(
+                {
+                    "status": "finished",
+                    "info": {},
+                    "scores": {
+                        "%s-%d-%s-%s"
+                        % (s.chromosome, s.start, s.reference, s.alternative): [0.345179, 7.773]
+                        for s in self.small_vars[1:]
+                    },
+                }
+            ),
+        )
+        self.export_job.query_args["patho_enabled"] = True
+        self.export_job.query_args["patho_score"] = "cadd"
+        for small_var, data_version in zip(self.small_vars, ("v1.6", "v1.5")):
+            CaddPathogenicityScoreCache.objects.create(
+                release=small_var.release,
+                chromosome=small_var.chromosome,
+                start=small_var.start,
+                end=small_var.end,
+                bin=small_var.bin,
+                reference=small_var.reference,
+                alternative=small_var.alternative,
+                info={"cached": True},
+                scores=[0.1, 1.0],
+                data_version=data_version,
+            )
+        variants = [
+            (small_var.chromosome, small_var.start, small_var.reference, small_var.alternative)
+            for small_var in self.small_vars
+        ]
+        keys = ["-".join(map(str, ("GRCh37", *variant))) for variant in variants]
+        with file_export.CaseExporterTsv(self.export_job, self.export_job.case) as exporter:
+            scores = exporter._fetch_variant_scores(variants)
+            # Only the uncached variants and the variant of the outdated version were sent to CADD.
+            self.assertEqual(
+                sorted(mock_.request_history[0].json()["variant"]),
+                sorted("-".join(map(str, variant)) for variant in variants[1:]),
+            )
+            self.assertEqual(scores[keys[0]], (1.0, {}))
+            self.assertEqual(scores[keys[1]], (7.773, {}))
+            self.assertEqual(
+                CaddPathogenicityScoreCache.objects.filter(data_version="v1.6").count(), 3
+            )
+            # All variants are cached now.
+            self.assertEqual(exporter._fetch_variant_scores(variants), scores)
+        self.assertEqual(len(mock_.request_history), 2)
+        # The outdated entry is removed by the nightly cleanup.
+        self.assertEqual(clear_annotated_variant_cache(), 1)
+        self.assertFalse(CaddPathogenicityScoreCache.objects.exclude(data_version="v1.6").exists())
+
     @patch("django.conf.settings.VARFISH_ENABLE_GESTALT_MATCHER", True)
     @patch("django.conf.settings.VARFISH_ENABLE_PEDIA", True)
     @patch("django.conf.settings.VARFISH_ENABLE_CADD", True)
@@ -677,6 +772,23 @@ class ProjectExportTest(TestCase):
         )
         self.assertEquals(content[3], "")
 
+    @patch("django.conf.settings.VARFISH_BACKEND_URL_MEHARI", None)
+    @patch("django.conf.settings.VARFISH_BACKEND_URL_ANNONARS", None)
+    def test_export_vcf_index(self):
+        with file_export.CaseExporterVcf(self.export_job, self.project) as exporter:
+            result = exporter.generate()
+            index = exporter.generate_index()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "export.vcf.gz")
+            with open(path, "wb") as outputf:
+                outputf.write(result)
+            with open(path + ".tbi", "wb") as outputf:
+                outputf.write(index)
+            with pysam.TabixFile(path) as tabix_file:
+                records = list(tabix_file.fetch(self.small_vars1[0].chromosome))
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0].split("\t")[1], str(self.small_vars1[0].start))
+
     @patch("django.conf.settings.VARFISH_BACKEND_URL_MEHARI", None)
     @patch("django.conf.settings.VARFISH_BACKEND_URL_ANNONARS", None)
     def test_export_xlsx(self):
@@ -692,6 +804,128 @@ class ProjectExportTest(TestCase):
             arrs = [[cell.value for cell in row] for row in variants_sheet.rows]
             self._test_tabular(arrs, False)
 
+    @patch("django.conf.settings.VARFISH_BACKEND_URL_MEHARI", None)
+    @patch("django.conf.settings.VARFISH_BACKEND_URL_ANNONARS", None)
+    @patch.object(file_export, "PARQUET_ROW_GROUP_SIZE", 3)
+    def test_export_parquet(self):
+        with file_export.CaseExporterParquet(self.export_job, self.project) as exporter:
+            result = exporter.generate()
+        parquet_file = pq.ParquetFile(io.BytesIO(result))
+        self.assertEqual(parquet_file.metadata.num_rows, 4)
+        self.assertEqual(parquet_file.metadata.num_row_groups, 2)
+        table = parquet_file.read()
+        self.assertEqual(table.column_names, [column["name"] for column in exporter.columns])
+        self.assertEqual(table.schema.field("start").type, pa.int64())
+        self.assertEqual(table.schema.field("var_type").type, pa.list_(pa.string()))
+        rows = table.to_pylist()
+        for small_var in self.small_vars1:
+            member = list(small_var.genotype.keys())[0]
+            row = next(
+                row
+                for row in rows
+                if row["start"] == small_var.start and row["sample_name"] == member
+            )
+            self.assertEqual(row["chromosome"], "chr" + small_var.chromosome)
+            self.assertEqual(row["sample.gt"], small_var.genotype[member]["gt"])
+            self.assertEqual(row["sample.dp"], small_var.genotype[member]["dp"])
+            self.assertAlmostEqual(
+                row["sample.aaf"],
+                small_var.genotype[member]["ad"] / small_var.genotype[member]["dp"],
+            )
+
+    @patch("django.conf.settings.VARFISH_BACKEND_URL_MEHARI", None)
+    @patch("django.conf.settings.VARFISH_BACKEND_URL_ANNONARS", None)
+    @patch.object(file_export, "XLSX_MAX_ROWS", 3)
+    def test_export_xlsx_split_sheets(self):
+        with file_export.CaseExporterXlsx(self.export_job, self.project) as exporter:
+            result = exporter.generate()
+        with tempfile.NamedTemporaryFile(suffix=".xlsx") as temp_file:
+            temp_file.write(result)
+            temp_file.flush()
+            workbook = openpyxl.load_workbook(temp_file.name)
+            self.assertEquals(
+                workbook.sheetnames, ["Variants", "Comments", "Metadata", "Variants (2)"]
+            )
+            arrs = [
+                [cell.value for cell in row]
+                for name in ("Variants", "Variants (2)")
+                for row in workbook[name].rows
+            ]
+            self.assertEqual(arrs[3], arrs[0])
+            self._test_tabular(arrs[:3] + arrs[4:], False)
+
+    @patch("django.conf.settings.VARFISH_BACKEND_URL_MEHARI", None)
+    @patch("django.conf.settings.VARFISH_BACKEND_URL_ANNONARS", None)
+    def test_export_tsv_chunked(self):
+        with file_export.CaseExporterTsv(self.export_job, self.project) as exporter:
+            expected = exporter.generate()
+        with patch.object(file_export, "EXPORT_CHUNK_SIZE", 1), patch.object(
+            file_export.CaseExporterTsv,
+            "_annotate_smallvars",
+            autospec=True,
+            side_effect=file_export.CaseExporterTsv._annotate_smallvars,
+        ) as mock_annotate:
+            with file_export.CaseExporterTsv(self.export_job, self.project) as exporter:
+                result = exporter.generate()
+        self.assertEqual(result, expected)
+        self.assertEqual(mock_annotate.call_count, 4)
+
+    @patch("django.conf.settings.VARFISH_ENABLE_CADD", True)
+    @patch("django.conf.settings.VARFISH_BACKEND_URL_MEHARI", None)
+    @patch("django.conf.settings.VARFISH_BACKEND_URL_ANNONARS", None)
+    def test_export_tsv_ranked_not_chunked(self):
+        self.export_job.query_args["patho_enabled"] = True
+        self.export_job.query_args["patho_score"] = "cadd"
+        with patch.object(file_export, "EXPORT_CHUNK_SIZE", 1), patch.object(
+            file_export.CaseExporterTsv, "_fetch_variant_scores", return_value={}
+        ) as mock_fetch, patch.object(
+            file_export.CaseExporterTsv,
+            "_annotate_smallvars",
+            autospec=True,
+            side_effect=file_export.CaseExporterTsv._annotate_smallvars,
+        ) as mock_annotate:
+            with file_export.CaseExporterTsv(self.export_job, self.project) as exporter:
+                exporter.generate()
+        # The ranks are computed over the whole result, so the backend is called only once.
+        self.assertEqual(mock_annotate.call_count, 1)
+        self.assertEqual(mock_fetch.call_count, 1)
+
+
+class JoinRowsByCoordinateTest(TestCase):
+    """Test the ``join_rows_by_coordinate()`` function."""
+
+    @staticmethod
+    def _row(start, sample):
+        return SimpleNamespace(
+            release="GRCh37",
+            chromosome="1",
+            start=start,
+            end=start,
+            reference="A",
+            alternative="G",
+            genotype={sample: {"gt": "0/1"}},
+        )
+
+    def test_join(self):
+        rows = [self._row(100, "a"), self._row(100, "b"), self._row(200, "a")]
+        result = list(file_export.join_rows_by_coordinate(iter(rows)))
+        self.assertEqual([row.start for row in result], [100, 200])
+        self.assertEqual(set(result[0].genotype), {"a", "b"})
+        self.assertEqual(set(result[1].genotype), {"a"})
+
+    def test_streaming(self):
+        consumed = []
+
+        def _rows():
+            for row in (self._row(100, "a"), self._row(100, "b"), self._row(200, "a")):
+                consumed.append(row.start)
+                yield row
+            self.fail("rows must not be read beyond the next variant")
+
+        first = next(file_export.join_rows_by_coordinate(_rows()))
+        self.assertEqual(first.start, 100)
+        self.assertEqual(consumed, [100, 100, 200])
+
 
 class CohortExporterTest(TestCohortBase):
     def _create_bgjob(self, user, cohort):
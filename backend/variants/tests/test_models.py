@@ -5,10 +5,14 @@ from unittest.mock import patch
 import uuid
 
 from django.conf import settings
-from projectroles.models import SODAR_CONSTANTS, Project
+from django.core.cache import cache
+from django.utils import timezone
+from projectroles.app_settings import AppSettingAPI
+from projectroles.models import SODAR_CONSTANTS, AppSetting, Project
 from test_plus.test import TestCase
 
 from variants.tests.factories import (
+    CaseFactory,
     CaseGeneAnnotationEntryFactory,
     CaseWithVariantSetFactory,
     ProjectFactory,
@@ -17,12 +21,21 @@ from variants.tests.factories import (
 )
 
 from ..models import (
+    ANNOTATION_CACHE_KEY_FIELDS,
+    AnnotatedVariantCache,
     Case,
+    GenePrioritizationScoreCache,
     SmallVariant,
     SmallVariantFlags,
     SmallVariantSet,
     cleanup_variant_sets,
+    clear_annotated_variant_cache,
+    clear_gene_prioritization_score_cache,
     clear_old_kiosk_cases,
+    get_cached_annotations,
+    get_inhouse_db_excluded_case_ids,
+    get_inhouse_db_excluded_project_ids,
+    store_cached_annotations,
 )
 
 
@@ -35,6 +48,37 @@ class TestSmallVariantFlags(TestCase):
         self.assertEquals(SmallVariantFlags.objects.count(), 1)
 
 
+class TestCaseSearch(TestCase):
+    """Tests for the trigram-indexed case search."""
+
+    def setUp(self):
+        super().setUp()
+        self.case_exact = CaseFactory(name="smith")
+        self.case_prefix = CaseFactory(name="smithson-family")
+        self.case_other = CaseFactory(name="doe")
+
+    def test_search_text(self):
+        self.assertEqual(
+            self.case_prefix.search_text,
+            " ".join(
+                dict.fromkeys(
+                    ["smithson-family", self.case_prefix.index.lower()]
+                    + self.case_prefix.search_tokens
+                )
+            ),
+        )
+
+    def test_find_ranked(self):
+        self.assertEqual(list(Case.objects.find(["smith"])), [self.case_exact, self.case_prefix])
+
+    def test_find_token(self):
+        self.assertEqual(list(Case.objects.find(["Smithson Family"])), [self.case_prefix])
+
+    def test_find_pedigree_member(self):
+        member = self.case_other.pedigree[0]["patient"]
+        self.assertEqual(list(Case.objects.find([member])), [self.case_other])
+
+
 class TestCleanupVariantSets(TestCase):
     def setUp(self):
         self.superuser = self.make_user("superuser")
@@ -114,3 +158,153 @@ class TestClearOldKioskCases(TestCase):
 class TestCaseGeneAnnotationEntry(TestCase):
     def test_instantiate_smoke_test(self):
         CaseGeneAnnotationEntryFactory()
+
+
+class TestInhouseDbExcludedIds(TestCase):
+    """Tests for the bulk resolution of ``exclude_from_inhouse_db``."""
+
+    def setUp(self):
+        cache.clear()
+        self.setting_api = AppSettingAPI()
+        self.case_included = CaseFactory()
+        self.case_excluded = CaseFactory()
+
+    def testNoneExcluded(self):
+        self.assertEqual(get_inhouse_db_excluded_project_ids(), frozenset())
+        self.assertEqual(get_inhouse_db_excluded_case_ids(), frozenset())
+
+    def testExcluded(self):
+        self.setting_api.set(
+            "variants", "exclude_from_inhouse_db", True, project=self.case_excluded.project
+        )
+        self.assertEqual(
+            get_inhouse_db_excluded_project_ids(), frozenset([self.case_excluded.project.id])
+        )
+        self.assertEqual(get_inhouse_db_excluded_case_ids(), frozenset([self.case_excluded.id]))
+
+    def testOtherAppSettingIgnored(self):
+        AppSetting.objects.create(
+            app_plugin=None,
+            project=self.case_excluded.project,
+            name="exclude_from_inhouse_db",
+            type="BOOLEAN",
+            value="1",
+        )
+        self.assertEqual(get_inhouse_db_excluded_project_ids(), frozenset())
+
+    def testInvalidatedOnSettingChange(self):
+        self.assertEqual(get_inhouse_db_excluded_project_ids(), frozenset())
+        self.setting_api.set(
+            "variants", "exclude_from_inhouse_db", True, project=self.case_excluded.project
+        )
+        self.assertEqual(
+            get_inhouse_db_excluded_project_ids(), frozenset([self.case_excluded.project.id])
+        )
+        self.setting_api.set(
+            "variants", "exclude_from_inhouse_db", False, project=self.case_excluded.project
+        )
+        self.assertEqual(get_inhouse_db_excluded_project_ids(), frozenset())
+
+
+class TestAnnotatedVariantCache(TestCase):
+    """Tests for the site-wide ``AnnotatedVariantCache``."""
+
+    def setUp(self):
+        super().setUp()
+        self.key = ("GRCh37", "1", 100, "A", "G")
+        self.other_key = ("GRCh37", "1", 200, "C", "T")
+
+    def test_store_and_get(self):
+        store_cached_annotations("mehari", {self.key: [{"feature_id": "NM_1"}]})
+        store_cached_annotations("umd", {self.other_key: [1.0, {}]})
+        with self.assertNumQueries(1):
+            result = get_cached_annotations("mehari", [self.key, self.other_key])
+        self.assertEqual(result, {self.key: [{"feature_id": "NM_1"}]})
+
+    def test_store_updates(self):
+        store_cached_annotations("mehari", {self.key: []})
+        store_cached_annotations("mehari", {self.key: [{"feature_id": "NM_2"}]})
+        self.assertEqual(AnnotatedVariantCache.objects.count(), 1)
+        self.assertEqual(
+            get_cached_annotations("mehari", [self.key]), {self.key: [{"feature_id": "NM_2"}]}
+        )
+
+    def test_get_touches_last_used(self):
+        store_cached_annotations("mehari", {self.key: []})
+        AnnotatedVariantCache.objects.update(last_used=timezone.now() - timedelta(days=2))
+        get_cached_annotations("mehari", [self.key])
+        self.assertGreater(
+            AnnotatedVariantCache.objects.get().last_used, timezone.now() - timedelta(minutes=1)
+        )
+
+    @patch("django.conf.settings.VARFISH_ANNOTATION_CACHE_DATA_VERSIONS", {"mehari": "v2"})
+    def test_get_other_data_version(self):
+        AnnotatedVariantCache.objects.create(
+            source="mehari",
+            data_version="v1",
+            payload=[],
+            **dict(zip(ANNOTATION_CACHE_KEY_FIELDS, self.key))
+        )
+        self.assertEqual(get_cached_annotations("mehari", [self.key]), {})
+
+    @patch("django.conf.settings.VARFISH_ANNOTATION_CACHE_ENABLED", False)
+    def test_disabled(self):
+        store_cached_annotations("mehari", {self.key: []})
+        self.assertEqual(AnnotatedVariantCache.objects.count(), 0)
+
+    @patch("django.conf.settings.VARFISH_ANNOTATION_CACHE_DATA_VERSIONS", {"mehari": "v2"})
+    def test_clear_outdated(self):
+        AnnotatedVariantCache.objects.create(
+            source="mehari",
+            data_version="v1",
+            payload=[],
+            **dict(zip(ANNOTATION_CACHE_KEY_FIELDS, self.key))
+        )
+        store_cached_annotations("mehari", {self.key: []})
+        self.assertEqual(clear_annotated_variant_cache(), 1)
+        self.assertEqual(AnnotatedVariantCache.objects.get().data_version, "v2")
+
+    @patch("django.conf.settings.VARFISH_ANNOTATION_CACHE_MAX_ENTRIES", 1)
+    def test_clear_least_recently_used(self):
+        store_cached_annotations("mehari", {self.key: [], self.other_key: []})
+        AnnotatedVariantCache.objects.filter(start=100).update(
+            last_used=timezone.now() - timedelta(days=2)
+        )
+        self.assertEqual(clear_annotated_variant_cache(), 1)
+        self.assertEqual(AnnotatedVariantCache.objects.get().start, 200)
+
+
+class TestGenePrioritizationScoreCache(TestCase):
+    """Tests for pruning the ``GenePrioritizationScoreCache``."""
+
+    def _create(self, prio_algorithm, gene_id, data_version=""):
+        return GenePrioritizationScoreCache.objects.create(
+            prio_algorithm=prio_algorithm,
+            hpo_terms="HP:0000001",
+            data_version=data_version,
+            gene_id=gene_id,
+            score=0.5,
+        )
+
+    @patch("django.conf.settings.VARFISH_EXOMISER_PRIORITISER_DATA_VERSION", "14.0")
+    @patch("django.conf.settings.VARFISH_CADA_DATA_VERSION", "1.1")
+    def test_clear_outdated(self):
+        self._create("phenix", "1", "13.0")
+        self._create("phenix", "2", "14.0")
+        self._create("CADA", "1", "14.0")
+        self._create("CADA", "2", "1.1")
+        self.assertEqual(clear_gene_prioritization_score_cache(), 2)
+        self.assertEqual(
+            set(GenePrioritizationScoreCache.objects.values_list("prio_algorithm", "gene_id")),
+            {("phenix", "2"), ("CADA", "2")},
+        )
+
+    @patch("django.conf.settings.VARFISH_GENE_PRIO_CACHE_MAX_AGE_DAYS", 30)
+    def test_clear_unused(self):
+        self._create("phenix", "1")
+        self._create("phenix", "2")
+        GenePrioritizationScoreCache.objects.filter(gene_id="1").update(
+            last_used=timezone.now() - timedelta(days=31)
+        )
+        self.assertEqual(clear_gene_prioritization_score_cache(), 1)
+        self.assertEqual(GenePrioritizationScoreCache.objects.get().gene_id, "2")
@@ -26,3 +26,23 @@ class TestCaseUserAnnotatedVariantsAjaxView(ProjectAPIPermissionTestBase):
         self.assert_response(url, good_users, 200, method="GET")
         self.assert_response(url, bad_users_401, 401, method="GET")
         self.assert_response(url, bad_users_403, 403, method="GET")
+
+
+class TestProjectUserAnnotatedVariantsAjaxView(ProjectAPIPermissionTestBase):
+    def test_get(self):
+        url = reverse(
+            "variants:ajax-smallvariant-userannotatedproject",
+            kwargs={"project": self.project.sodar_uuid},
+        )
+        good_users = [
+            self.superuser,
+            self.user_owner,
+            self.user_delegate,
+            self.user_contributor,
+            self.user_guest,
+        ]
+        bad_users_401 = [self.anonymous]
+        bad_users_403 = [self.user_no_roles]
+        self.assert_response(url, good_users, 200, method="GET")
+        self.assert_response(url, bad_users_401, 401, method="GET")
+        self.assert_response(url, bad_users_403, 403, method="GET")
@@ -5493,6 +5493,37 @@ class TestSmallVariantUserAnnotationQueryWithAcmgOnly(TestBase):
         self.assertEqual(len(res.acmg_criteria_rating), 1)
 
 
+class TestSmallVariantUserAnnotationQueryMultiple(TestBase):
+    """Test the SmallVariantUserAnnotationQuery class with several annotations per variant."""
+
+    def setUp(self):
+        super().setUp()
+        self.case, variant_set, _ = CaseWithVariantSetFactory.get("small")
+        self.small_vars = SmallVariantFactory.create_batch(3, variant_set=variant_set)
+        for small_var in self.small_vars[:2]:
+            SmallVariantFlagsFactory(case=self.case, **self._coords(small_var))
+            SmallVariantCommentFactory(case=self.case, **self._coords(small_var))
+        # Annotation of the same variant in another case.
+        SmallVariantFlagsFactory(**self._coords(self.small_vars[2]))
+
+    def _coords(self, small_var):
+        keys = ("release", "chromosome", "start", "end", "bin", "reference", "alternative")
+        return {key: getattr(small_var, key) for key in keys}
+
+    def test_run_with_case(self):
+        query = SmallVariantUserAnnotationQuery(get_engine())
+        with self.assertNumQueries(4):
+            res = query.run(case=self.case)
+        self.assertEqual(
+            sorted(small_var.id for small_var in res.small_variants),
+            sorted(small_var.id for small_var in self.small_vars[:2]),
+        )
+        self.assertEqual(res.small_variants[0].genotype, self.small_vars[0].genotype)
+        self.assertEqual(len(res.small_variant_flags), 2)
+        self.assertEqual(len(res.small_variant_comments), 2)
+        self.assertEqual(len(res.acmg_criteria_rating), 0)
+
+
 class TestCaseOneFlagsFilterBase(SupportQueryTestBase):
     """Base class for flags filter tests."""
 
@@ -1,9 +1,11 @@
 """Tests for the ``file_export`` module."""
 
 import json
+import threading
 from unittest.mock import patch
 
 from django.conf import settings
+from projectroles.app_settings import AppSettingAPI
 from requests_mock import Mocker
 from test_plus.test import TestCase
 
@@ -18,12 +20,18 @@ from variants.tests.factories import (
 
 from ..models import (
     CaddPathogenicityScoreCache,
+    FilterBgJob,
+    GenePrioritizationScoreCache,
     MutationTasterPathogenicityScoreCache,
     ProjectCasesSmallVariantQuery,
     SmallVariantQuery,
+    SmallVariantQueryProfile,
+    SmallVariantQueryResultRow,
+    SmallVariantQueryResultSet,
     UmdPathogenicityScoreCache,
 )
-from ..submit_filter import CaseFilter, ProjectCasesFilter
+from ..models.jobs import run_query_bg_job
+from ..submit_filter import CaseFilter, FilterProgress, ProjectCasesFilter
 
 
 class CaseFilterTest(TestCase):
@@ -145,6 +153,53 @@ class CaseFilterTest(TestCase):
         self.assertEqual(SmallVariantQuery.objects.count(), 1)
         self.assertEqual(SmallVariantQuery.objects.first().query_results.count(), 3)
 
+    @patch("django.conf.settings.VARFISH_ENABLE_EXOMISER_PRIORITISER", True)
+    @patch("django.conf.settings.VARFISH_EXOMISER_PRIORITISER_API_URL", "https://exomiser.com")
+    @Mocker()
+    def test_submit_case_filter_exomiser_cached(self, mock):
+        mock.post(
+            settings.VARFISH_EXOMISER_PRIORITISER_API_URL,
+            status_code=200,
+            text=json.dumps(
+                {
+                    "results": [
+                        {
+                            "geneId": self.small_vars[0].refseq_gene_id,
+                            "geneSymbol": "API",
+                            "score": "0.1",
+                            "priorityType": "PHENIX_PRIORITY",
+                        },
+                    ]
+                }
+            ),
+        )
+
+        self.bgjob.smallvariantquery.query_settings["prio_hpo_terms"] = [self.hpo_id]
+        self.bgjob.smallvariantquery.query_settings["prio_hpo_terms_curated"] = [self.hpo_id]
+        self.bgjob.smallvariantquery.query_settings["prio_enabled"] = True
+        self.bgjob.smallvariantquery.query_settings["prio_algorithm"] = "phenix"
+        self.bgjob.smallvariantquery.save()
+
+        # Run query twice, the second run is served from the cache
+        CaseFilter(self.bgjob, self.bgjob.smallvariantquery).run()
+        self.bgjob.smallvariantquery.smallvariantquerygenescores_set.all().delete()
+        CaseFilter(self.bgjob, self.bgjob.smallvariantquery).run()
+
+        self.assertEqual(mock.call_count, 1)
+        self.assertEqual(GenePrioritizationScoreCache.objects.count(), 2)
+        self.assertEqual(
+            GenePrioritizationScoreCache.objects.get(
+                gene_id=self.small_vars[1].refseq_gene_id
+            ).score,
+            None,
+        )
+        gene_scores = SmallVariantQueryGeneScores.objects.all()
+        self.assertEqual(len(gene_scores), 1)
+        self.assertEqual(gene_scores[0].gene_id, self.small_vars[0].refseq_gene_id)
+        self.assertEqual(gene_scores[0].gene_symbol, "API")
+        self.assertEqual(gene_scores[0].priority_type, "PHENIX_PRIORITY")
+        self.assertEqual(gene_scores[0].score, 0.1)
+
     @patch("django.conf.settings.VARFISH_ENABLE_EXOMISER_PRIORITISER", True)
     @patch("django.conf.settings.VARFISH_ENABLE_CADD", True)
     @patch("django.conf.settings.VARFISH_EXOMISER_PRIORITISER_API_URL", "https://exomiser.com")
@@ -279,6 +334,91 @@ class CaseFilterTest(TestCase):
         self.assertEqual(SmallVariantQuery.objects.first().query_results.count(), 3)
         self.assertEqual(CaddPathogenicityScoreCache.objects.count(), 3)
 
+        progress = FilterBgJob.objects.get(pk=self.bgjob.pk).progress
+        stages = {stage["name"]: stage for stage in progress["stages"]}
+        self.assertEqual(stages["variant_pathogenicity"]["total"], 3)
+        self.assertEqual(stages["variant_pathogenicity"]["state"], "done")
+
+    def test_progress(self):
+        CaseFilter(self.bgjob, self.bgjob.smallvariantquery).run(later_stages=("result_rows",))
+
+        progress = FilterBgJob.objects.get(pk=self.bgjob.pk).progress
+        stages = {stage["name"]: stage for stage in progress["stages"]}
+        self.assertEqual(
+            list(stages),
+            [
+                "query",
+                "store",
+                "gene_phenotype",
+                "variant_pathogenicity",
+                "gene_gm",
+                "gene_pedia",
+                "result_rows",
+            ],
+        )
+        for name in ("query", "store", "gene_pedia"):
+            self.assertEqual(stages[name]["state"], "done")
+            self.assertEqual(stages[name]["percent"], 100.0)
+            self.assertGreaterEqual(stages[name]["elapsed_seconds"], 0.0)
+        self.assertEqual(stages["store"]["total"], 3)
+        self.assertEqual(stages["result_rows"]["state"], "pending")
+        self.assertEqual(progress["percent"], round(600 / 7, 1))
+
+    def test_progress_failed(self):
+        case_filter = CaseFilter(self.bgjob, self.bgjob.smallvariantquery)
+        with self.assertRaises(ValueError):
+            with case_filter.progress.stage("store", total=10) as progress:
+                progress.advance("store", 5)
+                raise ValueError("error")
+
+        (stage,) = FilterBgJob.objects.get(pk=self.bgjob.pk).progress["stages"]
+        self.assertEqual(stage["state"], "failed")
+        self.assertEqual(stage["percent"], 50.0)
+
+    @patch("variants.submit_filter.connections.create_connection")
+    def test_progress_separate_connection(self, create_connection):
+        cursor = create_connection.return_value.cursor.return_value.__enter__.return_value
+        cursor.rowcount = 1
+        case_filter = CaseFilter(self.bgjob, self.bgjob.smallvariantquery)
+        with case_filter.progress.stage("store", total=10) as progress:
+            progress.advance("store", 5)
+
+        # Within the test's transaction, the progress is written through the separate connection.
+        sql, (payload, pk) = cursor.execute.call_args.args
+        self.assertIn("SKIP LOCKED", sql)
+        self.assertEqual(pk, self.bgjob.pk)
+        self.assertEqual(json.loads(payload)["stages"][0]["state"], "done")
+        self.assertEqual(FilterBgJob.objects.get(pk=self.bgjob.pk).progress, {})
+        create_connection.return_value.close.assert_called_once_with()
+
+    @patch.object(FilterProgress, "_update")
+    @patch("variants.submit_filter.connection")
+    def test_run_stages_parallel(self, _connection, _update):
+        _connection.in_atomic_block = False
+        barrier = threading.Barrier(2, timeout=5)
+        results = []
+
+        def _stage(rows):
+            # Both stages must be running at the same time to pass the barrier.
+            barrier.wait()
+            results.append(rows)
+
+        case_filter = CaseFilter(self.bgjob, self.bgjob.smallvariantquery)
+        case_filter._run_stages({"first": _stage, "second": _stage}, ("row",), workers=2)
+        self.assertEqual(results, [("row",), ("row",)])
+
+    @patch.object(FilterProgress, "_update")
+    @patch("variants.submit_filter.connection")
+    def test_run_stages_parallel_error(self, _connection, _update):
+        _connection.in_atomic_block = False
+
+        def _stage(rows):
+            raise ConnectionResetError("backend gone")
+
+        case_filter = CaseFilter(self.bgjob, self.bgjob.smallvariantquery)
+        with self.assertRaises(ConnectionResetError):
+            case_filter._run_stages({"first": _stage, "second": len}, (), workers=2)
+
     @patch("django.conf.settings.VARFISH_MUTATIONTASTER_REST_API_URL", "https://mutationtaster.com")
     @Mocker()
     def test_submit_case_filter_mutationtaster(self, mock):
@@ -416,6 +556,63 @@ class CaseFilterTest(TestCase):
         self.assertEqual(UmdPathogenicityScoreCache.objects.count(), 3)
 
 
+class RunQueryBgJobTest(TestCase):
+    """Test running the single-case filter job including the result set creation."""
+
+    def setUp(self):
+        super().setUp()
+        self.case, self.variant_set, _ = CaseWithVariantSetFactory.get("small")
+        self.superuser = self.make_user("superuser")
+        SmallVariantFactory.create_batch(3, variant_set=self.variant_set)
+        self.bgjob = FilterBgJobFactory(case=self.case, user=self.superuser)
+
+    def test_run(self):
+        run_query_bg_job(self.bgjob.pk)
+
+        query = SmallVariantQuery.objects.get()
+        self.assertEqual(query.query_state, SmallVariantQuery.QueryState.DONE)
+        self.assertEqual(
+            SmallVariantQueryResultRow.objects.filter(
+                smallvariantqueryresultset__smallvariantquery=query
+            ).count(),
+            3,
+        )
+        progress = FilterBgJob.objects.get(pk=self.bgjob.pk).progress
+        self.assertEqual(progress["percent"], 100.0)
+        self.assertEqual(
+            progress["stages"][-1],
+            {**progress["stages"][-1], "name": "result_rows", "done": 3, "total": 3},
+        )
+
+    def test_run_profiled(self):
+        AppSettingAPI().set("variants", "query_profiling_enabled", True, project=self.case.project)
+
+        run_query_bg_job(self.bgjob.pk)
+
+        profile = SmallVariantQueryProfile.objects.get()
+        self.assertEqual(profile.result_set, SmallVariantQueryResultSet.objects.get())
+        self.assertEqual([s["name"] for s in profile.statements], ["query", "load"])
+        for statement in profile.statements:
+            self.assertIn("SELECT", statement["sql"])
+            # The parameter values are filled into the SQL.
+            self.assertNotIn("%(", statement["sql"])
+            self.assertNotIn("POSTCOMPILE", statement["sql"])
+            self.assertTrue(statement["plan"])
+            self.assertEqual(statement["rows"], 3)
+        self.assertIn(
+            "variants_smallvariant.case_id = %d" % self.case.pk, profile.statements[0]["sql"]
+        )
+        stages = {stage["name"]: stage for stage in profile.stages}
+        self.assertEqual(stages["result_rows"]["done"], 3)
+        self.assertEqual(stages["row_writes"]["rows"], 3)
+        self.assertEqual(stages["annotation"]["calls"], 3)
+
+    def test_run_not_profiled(self):
+        run_query_bg_job(self.bgjob.pk)
+
+        self.assertFalse(SmallVariantQueryProfile.objects.exists())
+
+
 class ProjectCasesFilterTest(TestCase):
     """Test running joint cases filter job."""
 
@@ -2,7 +2,9 @@
 
 import json
 
+from django.db import connection
 from django.forms import model_to_dict
+from django.test.utils import CaptureQueriesContext
 from test_plus.test import TestCase
 
 from svs.models import (
@@ -1208,6 +1210,65 @@ class TestFillSmQueryResultSet(TestCase):
         self.assertEqual(orphans, expected_orphans)
         self.assertEqual(case_result_set.smallvariantqueryresultrow_set.count(), 0)
 
+    def _fill_annotated(self, case, num_vars):
+        small_vars = SmallVariantFactory.create_batch(num_vars, case_id=case.id)
+        query_result_set = SmallVariantQueryResultSetFactory(
+            case=case, smallvariantquery=SmallVariantQueryFactory(case=case)
+        )
+        case_result_set = SmallVariantQueryResultSetFactory(case=case, smallvariantquery=None)
+        for small_var in small_vars:
+            coords = {
+                "release": small_var.release,
+                "chromosome": small_var.chromosome,
+                "start": small_var.start,
+                "end": small_var.end,
+                "reference": small_var.reference,
+                "alternative": small_var.alternative,
+            }
+            SmallVariantFlagsFactory(case=case, **coords)
+            SmallVariantCommentFactory(case=case, **coords)
+            SmallVariantQueryResultRowFactory(smallvariantqueryresultset=query_result_set, **coords)
+        with CaptureQueriesContext(connection) as queries:
+            count, _, _, _ = fill_sm_queryresultset(case_result_set)
+        case_result_set.refresh_from_db()
+        self.assertEqual(count["added"], num_vars)
+        self.assertEqual(case_result_set.result_row_count, num_vars)
+        return len(queries)
+
+    def test_sms_fill_query_count(self):
+        self.assertEqual(
+            self._fill_annotated(self.case1, 1),
+            self._fill_annotated(self.case2, 5),
+        )
+
+    def test_sms_duplicates_reported_once(self):
+        small_var = SmallVariantFactory(case_id=self.case1.id)
+        case_result_set = SmallVariantQueryResultSetFactory(case=self.case1, smallvariantquery=None)
+        coords = {
+            "release": small_var.release,
+            "chromosome": small_var.chromosome,
+            "start": small_var.start,
+            "end": small_var.end,
+            "reference": small_var.reference,
+            "alternative": small_var.alternative,
+        }
+        SmallVariantFlagsFactory(case=self.case1, **coords)
+        SmallVariantCommentFactory(case=self.case1, **coords)
+        SmallVariantQueryResultRowFactory.create_batch(
+            2, smallvariantqueryresultset=case_result_set, **coords
+        )
+
+        count, salvable, duplicates, orphans = fill_sm_queryresultset(case_result_set)
+
+        expected_count, expected_salvable, _, expected_orphans = create_expected_skeleton_sm()
+        self.assertEqual(count, expected_count)
+        self.assertEqual(salvable, expected_salvable)
+        self.assertEqual(orphans, expected_orphans)
+        self.assertEqual(len(duplicates), 2)
+        self.assertEqual(
+            {duplicate["case_uuid"] for duplicate in duplicates}, {str(self.case1.sodar_uuid)}
+        )
+
 
 class TestFillSvQueryResultSet(TestCase):
     def setUp(self):
@@ -642,6 +642,40 @@ class TestExportProjectCasesFileJobDownloadViewResult(ViewTestBase):
             self.assertEqual(response.status_code, 200)
             self.assertEqual(response.content, self.results.payload)
 
+    def test_download_index(self):
+        """Test index download"""
+        self.results.index_payload = b"TBI\x01"
+        self.results.save()
+        with self.login(self.superuser):
+            response = self.client.get(
+                reverse(
+                    "variants:project-cases-export-job-download",
+                    kwargs={
+                        "project": self.results.job.project.sodar_uuid,
+                        "job": self.results.job.sodar_uuid,
+                    },
+                ),
+                {"index": "1"},
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, b"TBI\x01")
+            self.assertIn(".tbi", response["Content-Disposition"])
+
+    def test_download_index_missing(self):
+        """Test index download for file without index"""
+        with self.login(self.superuser):
+            response = self.client.get(
+                reverse(
+                    "variants:project-cases-export-job-download",
+                    kwargs={
+                        "project": self.results.job.project.sodar_uuid,
+                        "job": self.results.job.sodar_uuid,
+                    },
+                ),
+                {"index": "1"},
+            )
+            self.assertEqual(response.status_code, 404)
+
 
 # Todo create project stats job tests
 # class TestProjectStatsJobDetailView(ViewTestBase):
@@ -1,5 +1,14 @@
+from unittest.mock import patch
+
 from rest_framework.reverse import reverse
 
+from variants.tests.factories import (
+    CaseWithVariantSetFactory,
+    ProjectFactory,
+    SmallVariantFactory,
+    SmallVariantFlagsFactory,
+)
+from variants.tests.helpers import ApiViewTestBase
 from variants.tests.test_views_api import TestSmallVariantQueryBase
 
 
@@ -15,3 +24,71 @@ class TestSmallVariantQueryListAjaxView(TestSmallVariantQueryBase):
                 reverse("variants:ajax-query-case-list", kwargs={"case": self.case.sodar_uuid})
             )
             self.assertEqual(response.status_code, 200)
+
+
+class TestUserAnnotatedVariantsAjaxView(ApiViewTestBase):
+    """Tests for streaming user-annotated variants of a case or project."""
+
+    def setUp(self):
+        super().setUp()
+        self.case, variant_set, _ = CaseWithVariantSetFactory.get("small", project=self.project)
+        self.small_vars = SmallVariantFactory.create_batch(3, variant_set=variant_set)
+        keys = ("release", "chromosome", "start", "end", "bin", "reference", "alternative")
+        for small_var in self.small_vars[:2]:
+            SmallVariantFlagsFactory(
+                case=self.case, **{key: getattr(small_var, key) for key in keys}
+            )
+
+    def _get(self, url):
+        with self.login(self.superuser):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    @patch("variants.views.ajax.annos.UserAnnotatedVariantsAjaxViewBase.PAGE_SIZE", 1)
+    def test_get_case(self):
+        url = reverse(
+            "variants:ajax-smallvariant-userannotatedcase",
+            kwargs={"case": self.case.sodar_uuid},
+        )
+        rows = []
+        while url:
+            result = self._get(url)
+            self.assertLessEqual(len(result["rows"]), 1)
+            self.assertIn("time_elapsed", result)
+            rows += result["rows"]
+            url = result["next"]
+        self.assertEqual(
+            [row["start"] for row in rows],
+            sorted(small_var.start for small_var in self.small_vars[:2]),
+        )
+        self.assertTrue(all(row["flag_bookmarked"] for row in rows))
+
+    def test_get_case_invalid_cursor(self):
+        url = reverse(
+            "variants:ajax-smallvariant-userannotatedcase",
+            kwargs={"case": self.case.sodar_uuid},
+        )
+        with self.login(self.superuser):
+            response = self.client.get(url, {"cursor": "invalid"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_project(self):
+        result = self._get(
+            reverse(
+                "variants:ajax-smallvariant-userannotatedproject",
+                kwargs={"project": self.project.sodar_uuid},
+            )
+        )
+        self.assertEqual(len(result["rows"]), 2)
+        self.assertEqual({row["case_uuid"] for row in result["rows"]}, {str(self.case.sodar_uuid)})
+
+    def test_get_project_empty(self):
+        project = ProjectFactory()
+        result = self._get(
+            reverse(
+                "variants:ajax-smallvariant-userannotatedproject",
+                kwargs={"project": project.sodar_uuid},
+            )
+        )
+        self.assertEqual(result["rows"], [])
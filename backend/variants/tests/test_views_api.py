@@ -4,11 +4,14 @@ from django.conf import settings
 from django.forms import model_to_dict
 from django.urls import reverse
 from freezegun import freeze_time
+from projectroles.app_settings import AppSettingAPI
+from projectroles.models import AppSetting
 from projectroles.tests.test_views_api import EMPTY_KNOX_TOKEN
 
 from cases_qc.tests.helpers import flatten_via_json
 from svs.tests.factories import SvQueryResultSetFactory
-from variants.models.case import Case
+from variants.models.case import Case, only_source_name
+from variants.models.stats import ProjectQcOverview
 
 from ..query_schemas import SCHEMA_QUERY, DefaultValidatingDraft7Validator
 from .factories import (
@@ -18,6 +21,7 @@ from .factories import (
     SmallVariantCommentFactory,
     SmallVariantFlagsFactory,
     SmallVariantQueryFactory,
+    SmallVariantQueryProfileFactory,
     SmallVariantQueryResultSetFactory,
 )
 from .helpers import VARFISH_INVALID_MIMETYPE, VARFISH_INVALID_VERSION, ApiViewTestBase
@@ -167,6 +171,23 @@ class TestCaseApiViews(ApiViewTestBase):
                 response_content.append(dict(entry))
             self.assertEquals(flatten_via_json(response_content), flatten_via_json(expected))
 
+    def test_list_search(self):
+        CaseFactory(project=self.case.project, name="other")
+        with self.login(self.superuser):
+            response = self.request_knox(
+                reverse(
+                    "cases:api-case-list",
+                    kwargs={"project": str(self.case.project.sodar_uuid)},
+                )
+                + "?q="
+                + self.case.name,
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            [entry["sodar_uuid"] for entry in response.data["results"]],
+            [str(self.case.sodar_uuid)],
+        )
+
     def _test_retrieve_with_invalid_x(self, media_type=None, version=None):
         with self.login(self.superuser):
             response = self.request_knox(
@@ -330,6 +351,55 @@ class TestSmallVariantQueryListApiView(TestSmallVariantQueryBase):
             self.assertEqual(response.status_code, 401, "user = %s" % user)
 
 
+class TestSmallVariantQueryProfileRetrieveApiView(TestSmallVariantQueryBase):
+    def setUp(self):
+        super().setUp()
+        self.profile = SmallVariantQueryProfileFactory(
+            result_set__case=self.case, result_set__smallvariantquery=None
+        )
+        self.url = reverse(
+            "variants:api-query-result-set-profile",
+            kwargs={"smallvariantqueryresultset": self.profile.result_set.sodar_uuid},
+        )
+
+    def test_get(self):
+        response = self.request_knox(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["sodar_uuid"], str(self.profile.sodar_uuid))
+        self.assertEqual(response.data["result_set"], self.profile.result_set.sodar_uuid)
+        self.assertEqual(response.data["stages"], self.profile.stages)
+        self.assertEqual(response.data["statements"], self.profile.statements)
+
+    def test_get_not_found(self):
+        self.profile.delete()
+        response = self.request_knox(self.url)
+        self.assertEqual(response.status_code, 404)
+
+    def test_get_access_forbidden(self):
+        user_staff = self.make_user("user_staff")
+        user_staff.is_staff = True
+        user_staff.save()
+        bad_users = [
+            self.user_owner,
+            self.user_delegate,
+            self.user_contributor,
+            self.user_guest,
+            user_staff,
+            None,
+        ]
+
+        for user in bad_users:
+            if user:
+                token = self.get_token(user)
+                expected = 403
+            else:
+                token = EMPTY_KNOX_TOKEN
+                expected = 401
+            response = self.request_knox(self.url, token=token)
+            self.assertEqual(response.status_code, expected, "user = %s" % user)
+
+
 # TODO reuse?
 # class TestSmallVariantQueryCreateApiView(TestSmallVariantQueryBase):
 #     def test_post_valid(self):
@@ -1448,3 +1518,62 @@ class TestAcmgCriteriaRatingListCreateApiView(TestSmallVariantQueryBase):
 
     def test_get_acmg_criteria_rating_guest(self):
         self._test_get_acmg_criteria_rating_as_user(self.user_guest)
+
+
+class TestCaseListQcStatsApiView(ApiViewTestBase):
+    """Tests for the ``CaseListQcStatsApiView``."""
+
+    def setUp(self):
+        super().setUp()
+        self.case, self.variant_set, _ = CaseWithVariantSetFactory.get("small")
+        self.url = reverse(
+            "variants:api-project-qc", kwargs={"project": self.case.project.sodar_uuid}
+        )
+
+    def test_retrieve(self):
+        response = self.request_knox(self.url)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data["pedigree"][0]["patient"], only_source_name(self.case.index))
+        self.assertEqual(response["ETag"], '"%s"' % self.case.project.qc_overview.etag)
+
+    def test_retrieve_not_modified(self):
+        etag = self.request_knox(self.url)["ETag"]
+        response = self.request_knox(self.url, header={"HTTP_IF_NONE_MATCH": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_retrieve_pedigree_changed(self):
+        etag = self.request_knox(self.url)["ETag"]
+        self.case.pedigree = [{**self.case.pedigree[0], "sex": 2}]
+        self.case.save()
+        response = self.request_knox(self.url, header={"HTTP_IF_NONE_MATCH": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["pedigree"][0]["sex"], 2)
+
+    def test_retrieve_pedigree_changed_in_place(self):
+        self.request_knox(self.url)
+        case = Case.objects.get(pk=self.case.pk)
+        case.pedigree[0]["sex"] = 2
+        case.save()
+        self.assertFalse(ProjectQcOverview.objects.filter(project=self.case.project).exists())
+
+    def test_case_saved_unchanged(self):
+        self.request_knox(self.url)
+        case = Case.objects.get(pk=self.case.pk)
+        case.save()
+        case.notes = "changed"
+        with self.assertNumQueries(1):
+            case.save(update_fields=["notes"])
+        self.assertTrue(ProjectQcOverview.objects.filter(project=self.case.project).exists())
+
+    def test_sex_check_setting_changed(self):
+        app_settings = AppSettingAPI()
+        self.request_knox(self.url)
+        app_settings.set("variants", "disable_pedigree_sex_check", True, project=self.case.project)
+        self.assertFalse(ProjectQcOverview.objects.filter(project=self.case.project).exists())
+        self.request_knox(self.url)
+        AppSetting.objects.filter(
+            project=self.case.project, name="disable_pedigree_sex_check"
+        ).delete()
+        self.assertFalse(ProjectQcOverview.objects.filter(project=self.case.project).exists())
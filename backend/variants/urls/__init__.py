@@ -218,6 +218,11 @@ ajax_urlpatterns = [
         view=views_ajax.SmallVariantQueryDownloadGenerateAjaxView.as_view(),
         name="ajax-query-case-download-generate-xlsx",
     ),
+    path(
+        "ajax/query-case/download/generate/parquet/<uuid:smallvariantquery>/",
+        view=views_ajax.SmallVariantQueryDownloadGenerateAjaxView.as_view(),
+        name="ajax-query-case-download-generate-parquet",
+    ),
     path(
         "ajax/query-case/download/serve/<uuid:exportfilebgjob>/",
         view=views_ajax.SmallVariantQueryDownloadServeAjaxView.as_view(),
@@ -331,6 +336,11 @@ api_urlpatterns = [
         view=views_api.SmallVariantQueryResultSetRetrieveApiView.as_view(),
         name="api-query-result-set-retrieve",
     ),
+    path(
+        "api/query-result-set/profile/<uuid:smallvariantqueryresultset>/",
+        view=views_api.SmallVariantQueryProfileRetrieveApiView.as_view(),
+        name="api-query-result-set-profile",
+    ),
     path(
         "api/query-result-row/list/<uuid:smallvariantqueryresultset>/",
         view=views_api.SmallVariantQueryResultRowListApiView.as_view(),
@@ -376,6 +386,11 @@ api_urlpatterns = [
         view=views_api.SmallVariantQueryDownloadGenerateApiView.as_view(),
         name="api-query-case-download-generate-xlsx",
     ),
+    path(
+        "api/query-case/download/generate/parquet/<uuid:smallvariantquery>/",
+        view=views_api.SmallVariantQueryDownloadGenerateApiView.as_view(),
+        name="api-query-case-download-generate-parquet",
+    ),
     path(
         "api/query-case/download/serve/<uuid:exportfilebgjob>/",
         view=views_api.SmallVariantQueryDownloadServeApiView.as_view(),
@@ -2,7 +2,10 @@
 
 from django.urls import path
 
-from variants.views.ajax.annos import CaseUserAnnotatedVariantsAjaxView
+from variants.views.ajax.annos import (
+    CaseUserAnnotatedVariantsAjaxView,
+    ProjectUserAnnotatedVariantsAjaxView,
+)
 
 ui_urlpatterns = []
 
@@ -12,6 +15,11 @@ ajax_urlpatterns = [
         view=CaseUserAnnotatedVariantsAjaxView.as_view(),
         name="ajax-smallvariant-userannotatedcase",
     ),
+    path(
+        "ajax/smallvariant/user-annotated-project/<uuid:project>/",
+        view=ProjectUserAnnotatedVariantsAjaxView.as_view(),
+        name="ajax-smallvariant-userannotatedproject",
+    ),
 ]
 
 api_urlpatterns = []
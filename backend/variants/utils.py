@@ -1,8 +1,14 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import reduce
 import importlib
 from itertools import chain
 import json
+import operator
 import uuid
 
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
 from django.forms import model_to_dict
 
 from svs.models import (
@@ -17,9 +23,20 @@ from variants.models import (
     SmallVariant,
     SmallVariantComment,
     SmallVariantFlags,
+    SmallVariantQueryResultRow,
     SmallVariantQueryResultSet,
 )
 
+#: Fields identifying a small variant in user annotations and query result rows.
+SM_COORD_FIELDS = ("release", "chromosome", "start", "end", "reference", "alternative")
+
+#: Small variant user annotation models by their key in the result set reports.
+SM_ANNOTATION_MODELS = {
+    "flags": SmallVariantFlags,
+    "comments": SmallVariantComment,
+    "acmg_ratings": AcmgCriteriaRating,
+}
+
 
 def class_from_string(dot_path):
     """Load a class from the given dot path."""
@@ -32,9 +49,8 @@ def class_from_string(dot_path):
     return getattr(m, class_name)
 
 
-def create_queryresultset(case_uuid=None, project_uuid=None, all=False):
-    """Create a SmallVariantQueryResultSet for the given case or project."""
-
+def _empty_queryresultset_report():
+    """Return an empty ``(count, salvable, duplicates, orphans)`` report of result set creation."""
     count = {
         "svqueryresultset": 0,  # SvQueryResultSet's created
         "smallvariantqueryresultset": 0,  # SmallVariantQueryResultSet's created
@@ -81,6 +97,30 @@ def create_queryresultset(case_uuid=None, project_uuid=None, all=False):
             "acmg_ratings": [],
         },
     }
+    return count, salvable, duplicates, orphans
+
+
+def _merge_queryresultset_report(report, other):
+    """Add the result set creation report ``other`` to ``report``."""
+    count, salvable, duplicates, orphans = report
+    other_count, other_salvable, other_duplicates, other_orphans = other
+    count["svqueryresultset"] += other_count["svqueryresultset"]
+    count["smallvariantqueryresultset"] += other_count["smallvariantqueryresultset"]
+    for kind in ("sms", "svs"):
+        count[kind]["added"] += other_count[kind]["added"]
+        count[kind]["removed"] += other_count[kind]["removed"]
+        for i in ("salvable", "lost"):
+            for obj_type in count[kind][i]:
+                count[kind][i][obj_type] += other_count[kind][i][obj_type]
+        duplicates[kind].extend(other_duplicates[kind])
+        for obj_type in orphans[kind]:
+            orphans[kind][obj_type].extend(other_orphans[kind][obj_type])
+    salvable.update(other_salvable)
+
+
+def _create_queryresultset_for_cases(cases):
+    """Create and fill the annotation result sets of the given cases."""
+    count, salvable, duplicates, orphans = _empty_queryresultset_report()
 
     def _perform_create(_case):
         _sm_result_set = _case.smallvariantqueryresultset_set.filter(smallvariantquery=None)
@@ -158,24 +198,99 @@ def create_queryresultset(case_uuid=None, project_uuid=None, all=False):
         _perform_clear(sm_result_set, sv_result_set)
         _perform_fill(sm_result_set, sv_result_set)
 
+    for _case in cases:
+        _handle_case(_case)
+
+    return count, salvable, duplicates, orphans
+
+
+def _create_queryresultset_for_project(project_id):
+    """Create and fill the annotation result sets of a project in a worker thread."""
+    try:
+        with transaction.atomic():
+            return _create_queryresultset_for_cases(Case.objects.filter(project_id=project_id))
+    finally:
+        connection.close()
+
+
+def create_queryresultset(case_uuid=None, project_uuid=None, all=False, workers=None):
+    """Create a SmallVariantQueryResultSet for the given case or project.
+
+    With ``all``, the projects are processed by up to ``workers`` threads (defaults to
+    ``settings.RESULT_SET_WORKERS``), each in its own transaction.  When called within a
+    transaction, the cases are processed sequentially so the changes become part of it.
+    """
     if bool(case_uuid) + bool(project_uuid) + bool(all) != 1:
         return
 
     if case_uuid:
-        _case = Case.objects.get(sodar_uuid=case_uuid)
-        _handle_case(_case)
+        cases = [Case.objects.get(sodar_uuid=case_uuid)]
     elif project_uuid:
-        for _case in Case.objects.filter(project__sodar_uuid=project_uuid):
-            _handle_case(_case)
-    elif all:
-        for _case in Case.objects.all():
-            _handle_case(_case)
+        cases = Case.objects.filter(project__sodar_uuid=project_uuid)
+    else:
+        if workers is None:
+            workers = settings.RESULT_SET_WORKERS
+        if workers > 1 and not connection.in_atomic_block:
+            project_ids = list(
+                Case.objects.order_by("project_id").values_list("project_id", flat=True).distinct()
+            )
+            report = _empty_queryresultset_report()
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for other in executor.map(_create_queryresultset_for_project, project_ids):
+                    _merge_queryresultset_report(report, other)
+            return report
+        cases = Case.objects.all()
+
+    with transaction.atomic():
+        return _create_queryresultset_for_cases(cases)
+
+
+def _report_entry(case, obj, **kwargs):
+    """Return the orphan or duplicate report entry for the annotation or result row ``obj``."""
+    from variants.views import UUIDEncoder
+
+    return {
+        "case_uuid": str(case.sodar_uuid),
+        "case_name": case.name,
+        "project": case.project.full_title,
+        "chromosome": obj.chromosome,
+        "start": obj.start,
+        "end": obj.end,
+        **kwargs,
+        "json": json.dumps(model_to_dict(obj, exclude=("id",)), cls=UUIDEncoder),
+    }
 
-    return count, salvable, duplicates, orphans
+
+def _sm_coords(obj):
+    return tuple(getattr(obj, field) for field in SM_COORD_FIELDS)
+
+
+def _sm_outer_coords():
+    return {field: OuterRef(field) for field in SM_COORD_FIELDS}
+
+
+def _sm_variant_exists(case):
+    """Condition on the outer row's small variant being present in ``case``."""
+    return Exists(SmallVariant.objects.filter(case_id=case.id, **_sm_outer_coords()))
+
+
+def _sm_annotation_exists(case):
+    """Condition on the outer row's small variant carrying a user annotation in ``case``."""
+    return reduce(
+        operator.or_,
+        (
+            Exists(model.objects.filter(case=case, **_sm_outer_coords()))
+            for model in SM_ANNOTATION_MODELS.values()
+        ),
+    )
 
 
 def fill_sm_queryresultset(result_set):
-    """Fill a SmallVariantQueryResultSet for the given case or project."""
+    """Fill a SmallVariantQueryResultSet for the given case or project.
+
+    The user annotations of the case are matched against its small variants and the result rows
+    in one query each, missing rows are copied from the case's query results in bulk.
+    """
     case = result_set.case
     count = {
         "added": 0,
@@ -199,113 +314,82 @@ def fill_sm_queryresultset(result_set):
         "acmg_ratings": [],
     }
 
-    def _perform_create(obj):
-        obj_type = None
-        if isinstance(obj, SmallVariantFlags):
-            obj_type = "flags"
-        elif isinstance(obj, SmallVariantComment):
-            obj_type = "comments"
-        elif isinstance(obj, AcmgCriteriaRating):
-            obj_type = "acmg_ratings"
-        coords = {
-            "release": obj.release,
-            "chromosome": obj.chromosome,
-            "start": obj.start,
-            "end": obj.end,
-            "reference": obj.reference,
-            "alternative": obj.alternative,
-        }
-        lost = True
-
-        # Sanity check
-        if SmallVariant.objects.filter(case_id=case.id, **coords).exists():
-            lost = False
-
-        result_rows = result_set.smallvariantqueryresultrow_set.filter(**coords)
-
-        if lost:
-            count["lost"][obj_type] += 1
-            from variants.views import UUIDEncoder
-
-            orphans[obj_type].append(
-                {
-                    "case_uuid": str(case.sodar_uuid),
-                    "case_name": case.name,
-                    "project": case.project.full_title,
-                    "chromosome": obj.chromosome,
-                    "start": obj.start,
-                    "end": obj.end,
-                    "lost": lost,
-                    "json": json.dumps(model_to_dict(obj, exclude=("id",)), cls=UUIDEncoder),
-                }
+    variant_exists = _sm_variant_exists(case)
+    annotations = [
+        (obj_type, obj)
+        for obj_type, model in SM_ANNOTATION_MODELS.items()
+        for obj in model.objects.filter(case=case).annotate(variant_exists=variant_exists)
+    ]
+    if not annotations:
+        return count, salvable, duplicates, orphans
+
+    result_rows = {}
+    for result_row in result_set.smallvariantqueryresultrow_set.filter(
+        _sm_annotation_exists(case)
+    ).order_by("id"):
+        result_rows.setdefault(_sm_coords(result_row), []).append(result_row)
+
+    # Annotated variants of the case without result row, mapped to the query result row to copy.
+    missing = {
+        _sm_coords(obj): None
+        for _, obj in annotations
+        if obj.variant_exists and _sm_coords(obj) not in result_rows
+    }
+    if missing:
+        query_result_rows = (
+            SmallVariantQueryResultRow.objects.filter(
+                _sm_annotation_exists(case),
+                smallvariantqueryresultset__smallvariantquery__case=case,
             )
-            for result_row in result_rows:
-                count["removed"] += 1
-                result_row.delete()
-        else:
-            if result_rows.count() == 0:
-                queries = case.small_variant_queries.filter(
-                    smallvariantqueryresultset__isnull=False
-                )
-                for query in queries:
-                    query_result_set = query.smallvariantqueryresultset_set.first()
-                    result_row = query_result_set.smallvariantqueryresultrow_set.filter(**coords)
-                    if not result_row.exists():
-                        continue
-                    result_row = result_row.first()
-                    result_row.pk = None
-                    result_row.sodar_uuid = uuid.uuid4()
-                    result_row.smallvariantqueryresultset = result_set
-                    result_row.save()
-                    count["added"] += 1
-                    break
-                else:
-                    # should exist as it was annotated.
-                    count["salvable"][obj_type] += 1
-                    salvable.append("{chromosome}:{start}-{end}".format(**coords))
-                    from variants.views import UUIDEncoder
-
-                    orphans[obj_type].append(
-                        {
-                            "case_uuid": str(case.sodar_uuid),
-                            "case_name": case.name,
-                            "project": case.project.full_title,
-                            "chromosome": obj.chromosome,
-                            "start": obj.start,
-                            "end": obj.end,
-                            "lost": lost,
-                            "json": json.dumps(
-                                model_to_dict(obj, exclude=("id",)), cls=UUIDEncoder
-                            ),
-                        }
-                    )
-            elif result_rows.count() > 1:
-                from variants.views import UUIDEncoder
-
-                for result_row in result_rows:
-                    duplicates.append(
-                        {
-                            "case_uuid": str(case.sodar_uuid),
-                            "case_name": case.name,
-                            "project": case.project.full_title,
-                            "chromosome": result_row.chromosome,
-                            "start": result_row.start,
-                            "end": result_row.end,
-                            "json": json.dumps(
-                                model_to_dict(result_row, exclude=("id",)), cls=UUIDEncoder
-                            ),
-                        }
+            .exclude(
+                Exists(
+                    SmallVariantQueryResultRow.objects.filter(
+                        smallvariantqueryresultset=result_set, **_sm_outer_coords()
                     )
-
-        result_set.result_row_count = result_set.smallvariantqueryresultrow_set.count()
-        result_set.save()
-
-    sm_flags = SmallVariantFlags.objects.filter(case=case)
-    sm_comments = SmallVariantComment.objects.filter(case=case)
-    acmg_rating = AcmgCriteriaRating.objects.filter(case=case)
-
-    for obj in chain(sm_flags, sm_comments, acmg_rating):
-        _perform_create(obj)
+                )
+            )
+            .order_by(*SM_COORD_FIELDS, "smallvariantqueryresultset_id", "id")
+            .distinct(*SM_COORD_FIELDS)
+        )
+        for result_row in query_result_rows:
+            coords = _sm_coords(result_row)
+            if coords in missing:
+                missing[coords] = result_row
+
+    removed_ids = []
+    duplicate_coords = set()
+    for obj_type, obj in annotations:
+        coords = _sm_coords(obj)
+        if not obj.variant_exists:
+            count["lost"][obj_type] += 1
+            orphans[obj_type].append(_report_entry(case, obj, lost=True))
+            removed_ids.extend(result_row.id for result_row in result_rows.pop(coords, ()))
+        elif coords in missing and missing[coords] is None:
+            # should exist as it was annotated.
+            count["salvable"][obj_type] += 1
+            salvable.append("{}:{}-{}".format(obj.chromosome, obj.start, obj.end))
+            orphans[obj_type].append(_report_entry(case, obj, lost=False))
+        elif len(result_rows.get(coords, ())) > 1 and coords not in duplicate_coords:
+            duplicate_coords.add(coords)
+            duplicates.extend(_report_entry(case, result_row) for result_row in result_rows[coords])
+
+    if removed_ids:
+        SmallVariantQueryResultRow.objects.filter(id__in=removed_ids).delete()
+        count["removed"] = len(removed_ids)
+
+    added_rows = []
+    for result_row in missing.values():
+        if result_row is not None:
+            result_row.pk = None
+            result_row.sodar_uuid = uuid.uuid4()
+            result_row.smallvariantqueryresultset = result_set
+            added_rows.append(result_row)
+    if added_rows:
+        SmallVariantQueryResultRow.objects.bulk_create(added_rows)
+        count["added"] = len(added_rows)
+
+    result_set.result_row_count = result_set.smallvariantqueryresultrow_set.count()
+    result_set.save()
 
     return count, salvable, duplicates, orphans
 
@@ -470,45 +554,11 @@ def fill_sv_queryresultset(result_set):
 
 
 def clear_sm_queryresultset(result_set):
-    count = 0
-    check_for_existence = [
-        SmallVariantFlags,
-        SmallVariantComment,
-        AcmgCriteriaRating,
-    ]
-
-    for row in result_set.smallvariantqueryresultrow_set.all():
-        row_deleted = False
-        for _class in check_for_existence:
-            obj = _class.objects.filter(
-                case=result_set.case,
-                release=row.release,
-                chromosome=row.chromosome,
-                start=row.start,
-                end=row.end,
-                reference=row.reference,
-                alternative=row.alternative,
-            )
-            if obj.exists():
-                break
-        else:
-            count += 1
-            row_deleted = True
-            row.delete()
-        if row_deleted:
-            continue
-        obj = SmallVariant.objects.filter(
-            case_id=result_set.case.id,
-            release=row.release,
-            chromosome=row.chromosome,
-            start=row.start,
-            end=row.end,
-            reference=row.reference,
-            alternative=row.alternative,
-        )
-        if not obj.exists():
-            count += 1
-            row.delete()
+    """Remove result rows without user annotation or without small variant in the case."""
+    case = result_set.case
+    count, _ = result_set.smallvariantqueryresultrow_set.exclude(
+        _sm_annotation_exists(case) & _sm_variant_exists(case)
+    ).delete()
     return count
 
 
@@ -1,15 +1,28 @@
 """Helper code for creating/updating ``CaseVariantStats`` and related records."""
 
+import hashlib
 from itertools import chain
+import json
 
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import transaction
+from django.forms import model_to_dict
 import numpy as np
 from projectroles.plugins import get_backend_api
 
 from var_stats_qc.qc import compute_het_hom_chrx, compute_relatedness, compute_relatedness_many
 
 from .forms import EFFECTS_NOT_IN_FILTER_FORM, FILTER_FORM_TRANSLATE_EFFECTS
-from .models import CaseVariantStats, ProjectVariantStats, SmallVariant
+from .models import (
+    CaseAwareProject,
+    CaseVariantStats,
+    Project,
+    ProjectQcOverview,
+    ProjectVariantStats,
+    SmallVariant,
+    SmallVariantSet,
+    only_source_name,
+)
 
 #: Effects to ignore when computing stats.
 IGNORE_EFFECTS = (
@@ -139,6 +152,154 @@ def gather_variant_stats(variant_set):  # noqa: C901
     )
 
 
+def build_rel_data(pedigree, relatedness):
+    """Yield relatedness records annotated with the parent-child/sibling status from ``pedigree``."""
+    rel_parent_child = set()
+
+    for line in pedigree:
+        if line["mother"] != "0":
+            rel_parent_child.add((line["patient"], line["mother"]))
+            rel_parent_child.add((line["mother"], line["patient"]))
+
+        if line["father"] != "0":
+            rel_parent_child.add((line["patient"], line["father"]))
+            rel_parent_child.add((line["father"], line["patient"]))
+
+    rel_siblings = set()
+
+    for line1 in pedigree:
+        for line2 in pedigree:
+            if (
+                line1["patient"] != line2["patient"]
+                and line1["mother"] != "0"
+                and line2["mother"] != "0"
+                and line1["father"] != "0"
+                and line2["father"] != "0"
+                and line1["father"] == line2["father"]
+                and line1["mother"] == line2["mother"]
+            ):
+                rel_siblings.add((line1["patient"], line2["patient"]))
+
+    for rel in relatedness:
+        yield {
+            "sample0": only_source_name(rel.sample1),
+            "sample1": only_source_name(rel.sample2),
+            "parentChild": (rel.sample1, rel.sample2) in rel_parent_child,
+            "sibSib": (rel.sample1, rel.sample2) in rel_siblings,
+            "ibs0": rel.n_ibs0,
+            "rel": rel.relatedness(),
+        }
+
+
+def build_sex_data(case_or_project):
+    """Return sex errors and chrX het/hom ratios of the samples."""
+    return {
+        "sexErrors": {only_source_name(k): v for k, v in case_or_project.sex_errors().items()},
+        "chrXHetHomRatio": {
+            only_source_name(line["patient"]): case_or_project.chrx_het_hom_ratio(line["patient"])
+            for line in case_or_project.get_filtered_pedigree_with_samples()
+        },
+    }
+
+
+def build_cov_data(cases):
+    """Return coverage and het. ratio statistics of the samples in ``cases``."""
+    dp_medians = []
+    het_ratios = []
+    dps = {}
+    dp_het_data = []
+
+    for case in cases:
+        try:
+            variant_set = case.latest_variant_set
+
+            if variant_set:
+                for stats in variant_set.variant_stats.sample_variant_stats.all():
+                    dp_medians.append(stats.ontarget_dp_quantiles[2])
+                    het_ratios.append(stats.het_ratio)
+                    dps[stats.sample_name] = {
+                        int(key): value for key, value in stats.ontarget_dps.items()
+                    }
+                    dp_het_data.append(
+                        {
+                            "x": stats.ontarget_dp_quantiles[2],
+                            "y": stats.het_ratio or 0.0,
+                            "sample": only_source_name(stats.sample_name),
+                        }
+                    )
+
+        except SmallVariantSet.variant_stats.RelatedObjectDoesNotExist:
+            pass  # swallow
+
+    # Catch against empty lists, numpy will complain otherwise.
+    if not dp_medians:
+        dp_medians = [0]
+
+    if not het_ratios:
+        het_ratios = [0]
+
+    result = {
+        "dps": dps,
+        "dpQuantiles": list(np.percentile(np.asarray(dp_medians), [0, 25, 50, 100])),
+        "hetRatioQuantiles": list(np.percentile(np.asarray(het_ratios), [0, 25, 50, 100])),
+        "dpHetData": dp_het_data,
+    }
+
+    return result
+
+
+def build_project_qc_overview(project):
+    """Compute the QC overview document of the ``CaseAwareProject`` ``project``."""
+    cases = list(
+        project.case_set.prefetch_related(
+            "smallvariantset_set__variant_stats__sample_variant_stats"
+        ).all()
+    )
+
+    try:
+        rel_data = list(
+            build_rel_data(
+                list(chain(*[case.pedigree for case in cases])),
+                project.variant_stats.relatedness.all(),
+            )
+        )
+    except Project.variant_stats.RelatedObjectDoesNotExist:
+        rel_data = []
+
+    return {
+        "pedigree": [
+            {**line, "patient": only_source_name(line["patient"])}
+            for case in cases
+            for line in case.pedigree
+        ],
+        "relData": rel_data,
+        **build_sex_data(project),
+        **build_cov_data(cases),
+        "varStats": [model_to_dict(s) for s in project.sample_variant_stats()],
+    }
+
+
+def store_project_qc_overview(project):
+    """Compute and store the ``ProjectQcOverview`` of the ``CaseAwareProject`` ``project``."""
+    data = json.loads(json.dumps(build_project_qc_overview(project), cls=DjangoJSONEncoder))
+    etag = hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+    overview, _ = ProjectQcOverview.objects.update_or_create(
+        project=project, defaults={"data": data, "etag": etag}
+    )
+    return overview
+
+
+def get_project_qc_overview(project):
+    """Return the ``ProjectQcOverview`` of the ``CaseAwareProject`` ``project``.
+
+    The overview is computed and stored if it does not exist yet.
+    """
+    try:
+        return ProjectQcOverview.objects.get(project=project)
+    except ProjectQcOverview.DoesNotExist:
+        return store_project_qc_overview(project)
+
+
 def rebuild_case_variant_stats(engine, variant_set, logger=lambda _: None):
     """Rebuild the ``CaseVariantStats`` for the given ``SmallVariantSet`` using the SQL Alchemy ``connection``."""
     # Compute statistics.
@@ -246,6 +407,8 @@ def rebuild_project_variant_stats(engine, project, user, logger=lambda _: None):
                     n_ibs1=ibs1[pair],
                     n_ibs2=ibs2[pair],
                 )
+            logger("Done saving statistics, now building QC overview")
+            store_project_qc_overview(CaseAwareProject.objects.get(pk=project.pk))
             if timeline:
                 tl_event.set_status("OK", "finished storing new project-wide variant statistics")
             return stats
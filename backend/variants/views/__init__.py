@@ -5,11 +5,8 @@ from bgjobs.models import BackgroundJob
 from bgjobs.views import DEFAULT_PAGINATION as BGJOBS_DEFAULT_PAGINATION
 from django.conf import settings
 from django.contrib import messages
-from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction
-from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, reverse
-from django.utils import timezone
 from django.views.generic import DetailView, FormView, ListView, RedirectView
 from django.views.generic.detail import SingleObjectMixin, SingleObjectTemplateResponseMixin
 from projectroles.app_settings import AppSettingAPI
@@ -49,6 +46,7 @@ from variants.tasks import (
     single_case_filter_task,
     spanr_submission_task,
 )
+from variants.views.download import export_file_response
 
 
 class UUIDEncoder(json.JSONEncoder):
@@ -228,25 +226,8 @@ class ExportProjectCasesFileJobDownloadView(
     slug_field = "sodar_uuid"
 
     def get(self, *args, **kwargs):
-        try:
-            content_types = {
-                "tsv": "text/tab-separated-values",
-                "vcf": "text/plain+gzip",
-                "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            }
-            extensions = {"tsv": ".tsv", "vcf": ".vcf.gz", "xlsx": ".xlsx"}
-            obj = self.get_object()
-            response = HttpResponse(
-                obj.export_result.payload, content_type=content_types[obj.file_type]
-            )
-            response["Content-Disposition"] = 'attachment; filename="%(name)s%(ext)s"' % {
-                "name": "varfish_%s_%s"
-                % (timezone.now().strftime("%Y-%m-%d_%H:%M:%S.%f"), obj.project.sodar_uuid),
-                "ext": extensions[obj.file_type],
-            }
-            return response
-        except ObjectDoesNotExist as e:
-            raise Http404("File has not been generated (yet)!") from e
+        obj = self.get_object()
+        return export_file_response(self.request, obj, obj.project.sodar_uuid)
 
 
 # TODO keep
@@ -330,25 +311,8 @@ class ExportFileJobDownloadView(
     slug_field = "sodar_uuid"
 
     def get(self, *args, **kwargs):
-        try:
-            content_types = {
-                "tsv": "text/tab-separated-values",
-                "vcf": "text/plain+gzip",
-                "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            }
-            extensions = {"tsv": ".tsv", "vcf": ".vcf.gz", "xlsx": ".xlsx"}
-            obj = self.get_object()
-            response = HttpResponse(
-                obj.export_result.payload, content_type=content_types[obj.file_type]
-            )
-            response["Content-Disposition"] = 'attachment; filename="%(name)s%(ext)s"' % {
-                "name": "varfish_%s_%s"
-                % (timezone.now().strftime("%Y-%m-%d_%H:%M:%S.%f"), obj.case.sodar_uuid),
-                "ext": extensions[obj.file_type],
-            }
-            return response
-        except ObjectDoesNotExist as e:
-            raise Http404("File has not been generated (yet)!") from e
+        obj = self.get_object()
+        return export_file_response(self.request, obj, obj.case.sodar_uuid)
 
 
 # TODO keep
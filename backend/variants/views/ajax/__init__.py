@@ -181,6 +181,8 @@ class SmallVariantQueryDownloadGenerateAjaxView(SmallVariantQueryDownloadGenerat
 
     **URL:** ``/variants/ajax/query-case/download/generate/xlsx/{query.sodar_uuid}``
 
+    **URL:** ``/variants/ajax/query-case/download/generate/parquet/{query.sodar_uuid}``
+
     **Methods:** See base API class.
 
     **Parameters:** See base API class.
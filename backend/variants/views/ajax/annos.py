@@ -1,40 +1,122 @@
+import base64
 import contextlib
+import json
 
 from django.utils import timezone
 from projectroles.views_api import SODARAPIProjectPermission
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 from varfish.api_utils import VarfishApiRenderer, VarfishApiVersioning
 from variants.helpers import get_engine
-from variants.models import Case
+from variants.models import Case, CaseAwareProject
 from variants.queries import CaseLoadUserAnnotatedQuery
 from variants.serializers import SmallVariantForResultSerializer
 
 
-class CaseUserAnnotatedVariantsAjaxView(ListAPIView):
-    lookup_field = "sodar_uuid"
-    lookup_url_kwarg = "case"
+class UserAnnotatedVariantsAjaxViewBase(ListAPIView):
+    """Base class for listing the user-annotated small variants of one or more cases.
+
+    The response has the form ``{"rows": [...], "next": ..., "time_elapsed": ...}`` and holds at
+    most ``PAGE_SIZE`` rows.  ``next`` is the URL of the next page or ``null`` on the last page.
+    Pages are selected with an opaque ``cursor`` that holds the ordering values of the last row
+    of the previous page, so each page is a separate query that does not depend on the others.
+    """
 
     renderer_classes = [VarfishApiRenderer]
     versioning_class = VarfishApiVersioning
 
     permission_classes = [SODARAPIProjectPermission]
-    queryset = Case.objects.all()
 
     schema = None
     serializer_class = SmallVariantForResultSerializer
 
+    #: Maximal number of rows per page.
+    PAGE_SIZE = 1_000
+    #: Query parameter for the page cursor.
+    cursor_query_param = "cursor"
+
     def get_permission_required(self):
         return "variants.view_data"
 
+    def get_cases(self):
+        """Return the cases to load the user-annotated variants for."""
+        raise NotImplementedError("Implement me!")
+
+    def encode_cursor(self, row) -> str:
+        values = [row[name] for name in CaseLoadUserAnnotatedQuery.KEYSET_COLUMNS]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if not isinstance(values, list) or len(values) != len(
+                CaseLoadUserAnnotatedQuery.KEYSET_COLUMNS
+            ):
+                raise ValueError("invalid cursor payload")
+            return values
+        except (TypeError, ValueError):
+            raise ValidationError({self.cursor_query_param: "Invalid cursor"})
+
     def get(self, request, *args, **kwargs):
-        # Build and run the query.
-        query = CaseLoadUserAnnotatedQuery(case_or_cases=self.get_object(), engine=get_engine())
+        cases = self.get_cases()
+        after = self.decode_cursor(request)
         started = timezone.now()
-        # Fetch all results and compute elapsed time
-        with contextlib.closing(query.run(kwargs={})) as results:
-            rows = list(map(lambda row: dict(row.items()), results.fetchall()))
+        rows = []
+        if cases:
+            query = CaseLoadUserAnnotatedQuery(case_or_cases=cases, engine=get_engine())
+            with contextlib.closing(
+                query.run_page(kwargs={}, limit=self.PAGE_SIZE + 1, after=after)
+            ) as results:
+                rows = [dict(row.items()) for row in results.fetchall()]
+        next_url = None
+        if len(rows) > self.PAGE_SIZE:
+            rows = rows[: self.PAGE_SIZE]
+            next_url = replace_query_param(
+                request.build_absolute_uri(), self.cursor_query_param, self.encode_cursor(rows[-1])
+            )
         time_elapsed = timezone.now() - started
-        return Response({"time_elapsed": time_elapsed, "rows": rows}, status=status.HTTP_200_OK)
+        return Response(
+            {"time_elapsed": time_elapsed, "next": next_url, "rows": rows},
+            status=status.HTTP_200_OK,
+        )
+
+
+class CaseUserAnnotatedVariantsAjaxView(UserAnnotatedVariantsAjaxViewBase):
+    """List the user-annotated small variants of a case.
+
+    **URL:** ``/variants/ajax/smallvariant/user-annotated-case/{case.sodar_uuid}/``
+
+    **Methods:** ``GET``
+    """
+
+    lookup_field = "sodar_uuid"
+    lookup_url_kwarg = "case"
+
+    queryset = Case.objects.all()
+
+    def get_cases(self):
+        return [self.get_object()]
+
+
+class ProjectUserAnnotatedVariantsAjaxView(UserAnnotatedVariantsAjaxViewBase):
+    """List the user-annotated small variants of all active cases in a project.
+
+    **URL:** ``/variants/ajax/smallvariant/user-annotated-project/{project.sodar_uuid}/``
+
+    **Methods:** ``GET``
+    """
+
+    lookup_field = "sodar_uuid"
+    lookup_url_kwarg = "project"
+
+    queryset = CaseAwareProject.objects.all()
+
+    def get_cases(self):
+        return self.get_object().get_active_smallvariant_cases()
@@ -1,6 +1,5 @@
 """API views for ``variants`` app."""
 
-from itertools import chain
 import sys
 import typing
 import uuid
@@ -12,15 +11,12 @@ from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction
 from django.db.models import Q
 from django.db.models.expressions import RawSQL
-from django.forms import model_to_dict
-from django.http import Http404, HttpResponse, JsonResponse
+from django.http import Http404, JsonResponse
 from django.urls import reverse
-from django.utils import timezone
-import numpy as np
-from projectroles.models import Project
+from django.utils.http import parse_etags, quote_etag
 from projectroles.templatetags.projectroles_common_tags import get_app_setting
 from projectroles.views_api import SODARAPIGenericProjectMixin, SODARAPIProjectPermission
-from rest_framework import views
+from rest_framework import status, views
 from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.generics import (
     DestroyAPIView,
@@ -32,6 +28,7 @@ from rest_framework.generics import (
     get_object_or_404,
 )
 from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.permissions import BasePermission
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
@@ -49,10 +46,9 @@ from variants.models import (
     SmallVariantComment,
     SmallVariantFlags,
     SmallVariantQuery,
+    SmallVariantQueryProfile,
     SmallVariantQueryResultRow,
     SmallVariantQueryResultSet,
-    SmallVariantSet,
-    only_source_name,
 )
 from variants.query_presets import (
     CHROMOSOME_PRESETS,
@@ -77,12 +73,15 @@ from variants.serializers import (
     SmallVariantCommentSerializer,
     SmallVariantFlagsProjectSerializer,
     SmallVariantFlagsSerializer,
+    SmallVariantQueryProfileSerializer,
     SmallVariantQueryResultRowSerializer,
     SmallVariantQueryResultSetSerializer,
     SmallVariantQuerySerializer,
     SmallVariantQueryWithLogsSerializer,
 )
 from variants.tasks import export_file_task, single_case_filter_task
+from variants.variant_stats import get_project_qc_overview
+from variants.views.download import export_file_response
 
 from .export import export_filter_settings, export_preset_settings  # noqa: F401
 
@@ -372,6 +371,37 @@ class SmallVariantQueryResultSetRetrieveApiView(RetrieveAPIView):
         return "variants.view_data"
 
 
+class SmallVariantQueryProfilePermission(BasePermission):
+    """Only allow superusers, who are the site admins in SODAR."""
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_superuser)
+
+
+class SmallVariantQueryProfileRetrieveApiView(RetrieveAPIView):
+    """API endpoint for retrieving the profile of the job that created a query result set.
+
+    Profiles are only recorded for projects with the ``query_profiling_enabled`` setting.  As they
+    contain the SQL and query plans, they are only available to site admins.
+
+    **URL:** ``/variants/api/query-result-set/profile/{smallvariantqueryresultset.sodar_uuid}/``
+
+    **Methods:** ``GET``
+    """
+
+    lookup_field = "result_set__sodar_uuid"
+    lookup_url_kwarg = "smallvariantqueryresultset"
+
+    renderer_classes = [VarfishApiRenderer]
+    versioning_class = VarfishApiVersioning
+    permission_classes = [SmallVariantQueryProfilePermission]
+
+    serializer_class = SmallVariantQueryProfileSerializer
+
+    def get_queryset(self):
+        return SmallVariantQueryProfile.objects.all().select_related("result_set")
+
+
 class SmallVariantQueryResultRowPagination(PageNumberPagination):
     page_size = 50
     max_page_size = 1000
@@ -769,6 +799,8 @@ class SmallVariantQueryDownloadGenerateApiView(VariantsApiBaseMixin, APIView):
 
     **URL:** ``/variants/api/query-case/download/generate/vcf/{query.sodar_uuid}``
 
+    **URL:** ``/variants/api/query-case/download/generate/parquet/{query.sodar_uuid}``
+
     **Methods:** ``GET``
 
     **Returns:**
@@ -798,6 +830,14 @@ class SmallVariantQueryDownloadGenerateApiView(VariantsApiBaseMixin, APIView):
             kwargs={"smallvariantquery": query.sodar_uuid},
         ):
             file_type = "vcf"
+        elif self.request.get_full_path() == reverse(
+            "variants:ajax-query-case-download-generate-parquet",
+            kwargs={"smallvariantquery": query.sodar_uuid},
+        ) or self.request.get_full_path() == reverse(
+            "variants:api-query-case-download-generate-parquet",
+            kwargs={"smallvariantquery": query.sodar_uuid},
+        ):
+            file_type = "parquet"
         else:
             file_type = "xlsx"
 
@@ -853,6 +893,10 @@ class SmallVariantQueryDownloadServeApiView(VariantsApiBaseMixin, APIView):
 
     **Methods:** ``GET``
 
+    **Parameters:**
+
+    - ``index`` - if set, serve the tabix index of a VCF file instead of the file itself
+
     **Returns:**
 
     """
@@ -862,25 +906,10 @@ class SmallVariantQueryDownloadServeApiView(VariantsApiBaseMixin, APIView):
 
     def get(self, request, *args, **kwargs):
         try:
-            content_types = {
-                "tsv": "text/tab-separated-values",
-                "vcf": "text/plain+gzip",
-                "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            }
-            extensions = {"tsv": ".tsv", "vcf": ".vcf.gz", "xlsx": ".xlsx"}
             job = ExportFileBgJob.objects.get(sodar_uuid=self.kwargs["exportfilebgjob"])
-            response = HttpResponse(
-                job.export_result.payload, content_type=content_types[job.file_type]
-            )
-            response["Content-Disposition"] = 'attachment; filename="%(name)s%(ext)s"' % {
-                "name": "varfish_%s_%s"
-                % (timezone.now().strftime("%Y-%m-%d_%H:%M:%S.%f"), job.case.sodar_uuid),
-                "ext": extensions[job.file_type],
-            }
-            return response
-
         except ObjectDoesNotExist as e:
             raise Http404("File has not been generated (yet)!") from e
+        return export_file_response(request, job, job.case.sodar_uuid)
 
 
 class SmallVariantCommentApiMixin(VariantsApiBaseMixin):
@@ -1579,102 +1608,12 @@ class ExtraAnnoFieldsApiView(
         return "variants.view_data"
 
 
-def build_rel_data(pedigree, relatedness):
-    """Return statistics"""
-    rel_parent_child = set()
-
-    for line in pedigree:
-        if line["mother"] != "0":
-            rel_parent_child.add((line["patient"], line["mother"]))
-            rel_parent_child.add((line["mother"], line["patient"]))
-
-        if line["father"] != "0":
-            rel_parent_child.add((line["patient"], line["father"]))
-            rel_parent_child.add((line["father"], line["patient"]))
-
-    rel_siblings = set()
-
-    for line1 in pedigree:
-        for line2 in pedigree:
-            if (
-                line1["patient"] != line2["patient"]
-                and line1["mother"] != "0"
-                and line2["mother"] != "0"
-                and line1["father"] != "0"
-                and line2["father"] != "0"
-                and line1["father"] == line2["father"]
-                and line1["mother"] == line2["mother"]
-            ):
-                rel_siblings.add((line1["patient"], line2["patient"]))
-
-    for rel in relatedness:
-        yield {
-            "sample0": only_source_name(rel.sample1),
-            "sample1": only_source_name(rel.sample2),
-            "parentChild": (rel.sample1, rel.sample2) in rel_parent_child,
-            "sibSib": (rel.sample1, rel.sample2) in rel_siblings,
-            "ibs0": rel.n_ibs0,
-            "rel": rel.relatedness(),
-        }
-
-
-def build_sex_data(case_or_project):
-    return {
-        "sexErrors": {only_source_name(k): v for k, v in case_or_project.sex_errors().items()},
-        "chrXHetHomRatio": {
-            only_source_name(line["patient"]): case_or_project.chrx_het_hom_ratio(line["patient"])
-            for line in case_or_project.get_filtered_pedigree_with_samples()
-        },
-    }
-
-
-def build_cov_data(cases):
-    dp_medians = []
-    het_ratios = []
-    dps = {}
-    dp_het_data = []
-
-    for case in cases:
-        try:
-            variant_set = case.latest_variant_set
-
-            if variant_set:
-                for stats in variant_set.variant_stats.sample_variant_stats.all():
-                    dp_medians.append(stats.ontarget_dp_quantiles[2])
-                    het_ratios.append(stats.het_ratio)
-                    dps[stats.sample_name] = {
-                        int(key): value for key, value in stats.ontarget_dps.items()
-                    }
-                    dp_het_data.append(
-                        {
-                            "x": stats.ontarget_dp_quantiles[2],
-                            "y": stats.het_ratio or 0.0,
-                            "sample": only_source_name(stats.sample_name),
-                        }
-                    )
-
-        except SmallVariantSet.variant_stats.RelatedObjectDoesNotExist:
-            pass  # swallow
-
-    # Catch against empty lists, numpy will complain otherwise.
-    if not dp_medians:
-        dp_medians = [0]
-
-    if not het_ratios:
-        het_ratios = [0]
-
-    result = {
-        "dps": dps,
-        "dpQuantiles": list(np.percentile(np.asarray(dp_medians), [0, 25, 50, 100])),
-        "hetRatioQuantiles": list(np.percentile(np.asarray(het_ratios), [0, 25, 50, 100])),
-        "dpHetData": dp_het_data,
-    }
-
-    return result
-
-
 class CaseListQcStatsApiView(RetrieveAPIView):
-    """Render JSON with project-wide case statistics"""
+    """Render JSON with project-wide case statistics.
+
+    The document is precomputed in ``ProjectQcOverview`` and served with an ``ETag`` header so
+    that clients can revalidate with ``If-None-Match``.
+    """
 
     renderer_classes = [VarfishApiRenderer]
     versioning_class = VarfishApiVersioning
@@ -1682,44 +1621,18 @@ class CaseListQcStatsApiView(RetrieveAPIView):
     serializer_class = CaseListQcStatsSerializer
 
     def get_object(self):
-        cases = Case.objects.filter(project__sodar_uuid=self.kwargs["project"]).prefetch_related(
-            "smallvariantset_set__variant_stats",
-            "smallvariantset_set__variant_stats__sample_variant_stats",
-            "project",
-        )
-        project = CaseAwareProject.objects.prefetch_related("variant_stats").get(
-            sodar_uuid=self.kwargs["project"]
-        )
-
-        try:
-            rel_data = list(
-                build_rel_data(
-                    list(chain(*[case.pedigree for case in cases])),
-                    project.variant_stats.relatedness.all(),
-                )
-            )
-        except Project.variant_stats.RelatedObjectDoesNotExist:
-            rel_data = []
-
-        result = {
-            "pedigree": [
-                {**line, "patient": only_source_name(line["patient"])}
-                for case in cases
-                for line in case.pedigree
-            ],
-            "relData": rel_data,
-            **build_sex_data(project),
-            **build_cov_data(
-                list(
-                    project.case_set.prefetch_related(
-                        "smallvariantset_set__variant_stats__sample_variant_stats"
-                    ).all()
-                )
-            ),
-            "varStats": [model_to_dict(s) for s in project.sample_variant_stats()],
-        }
+        project = CaseAwareProject.objects.get(sodar_uuid=self.kwargs["project"])
+        return get_project_qc_overview(project)
 
-        return result
+    def retrieve(self, request, *args, **kwargs):
+        overview = self.get_object()
+        etag = quote_etag(overview.etag)
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(self.get_serializer(overview.data).data)
+        response["ETag"] = etag
+        return response
 
 
 class ProjectSettingsRetrieveApiView(SODARAPIGenericProjectMixin, RetrieveAPIView):
@@ -0,0 +1,43 @@
+"""Shared handling for serving the files generated by the export background jobs."""
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import Http404, HttpResponse
+from django.utils import timezone
+
+#: Content types of the export files by file type.
+EXPORT_CONTENT_TYPES = {
+    "tsv": "text/tab-separated-values",
+    "vcf": "text/plain+gzip",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+#: File name extensions of the export files by file type.
+EXPORT_EXTENSIONS = {"tsv": ".tsv", "vcf": ".vcf.gz", "xlsx": ".xlsx", "parquet": ".parquet"}
+
+
+def export_file_response(request, job, sodar_uuid):
+    """Return ``HttpResponse`` with the file generated by the export ``job``.
+
+    If the ``index`` query parameter is set, the tabix index is served instead of the file.  The
+    ``sodar_uuid`` of the case or project is used in the file name.  Raises ``Http404`` if the
+    file or the index has not been generated.
+    """
+    try:
+        payload = job.export_result.payload
+        content_type = EXPORT_CONTENT_TYPES[job.file_type]
+        extension = EXPORT_EXTENSIONS[job.file_type]
+        if request.GET.get("index"):
+            payload = job.export_result.index_payload
+            if payload is None:
+                raise Http404("No index available for this file!")
+            content_type = "application/octet-stream"
+            extension += ".tbi"
+    except ObjectDoesNotExist as e:
+        raise Http404("File has not been generated (yet)!") from e
+    response = HttpResponse(payload, content_type=content_type)
+    response["Content-Disposition"] = 'attachment; filename="%(name)s%(ext)s"' % {
+        "name": "varfish_%s_%s" % (timezone.now().strftime("%Y-%m-%d_%H:%M:%S.%f"), sodar_uuid),
+        "ext": extension,
+    }
+    return response
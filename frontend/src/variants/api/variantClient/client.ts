@@ -141,10 +141,15 @@ export class VariantClient extends ClientBase {
   }
 
   async listCaseVariantsUserAnnotated(caseUuid: string): Promise<any> {
-    return await this.fetchHelper(
-      `/variants/ajax/smallvariant/user-annotated-case/${caseUuid}/`,
-      'GET',
-    )
+    let nextUrl: string | null =
+      `/variants/ajax/smallvariant/user-annotated-case/${caseUuid}/`
+    const rows: any[] = []
+    while (nextUrl !== null) {
+      const resultJson = await this.fetchHelper(nextUrl, 'GET')
+      rows.push(...resultJson.rows)
+      nextUrl = resultJson.next
+    }
+    return { rows }
   }
 
   async listComment(